@@ -0,0 +1,35 @@
+"""Add key_lookup_hmac column to api_keys.
+
+Revision ID: 2026_10_17_0019
+Revises: 2026_10_17_0018
+Create Date: 2026-10-17
+
+Stores an HMAC-SHA256 of each API key so validation can find the row
+through a unique index instead of running Argon2id on every request.
+Existing keys stay NULL and are backfilled the first time they validate
+through the Argon2 path.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2026_10_17_0019"
+down_revision: str | None = "2026_10_17_0018"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add key_lookup_hmac column and unique index."""
+    op.add_column("api_keys", sa.Column("key_lookup_hmac", sa.LargeBinary(32), nullable=True))
+    op.create_index("idx_api_keys_lookup_hmac", "api_keys", ["key_lookup_hmac"], unique=True)
+
+
+def downgrade() -> None:
+    """Drop key_lookup_hmac column and index."""
+    op.drop_index("idx_api_keys_lookup_hmac", table_name="api_keys")
+    op.drop_column("api_keys", "key_lookup_hmac")
@@ -0,0 +1,45 @@
+"""Add partial index on credits.idempotency_key.
+
+Revision ID: 2026_10_17_0020
+Revises: 2026_10_17_0019
+Create Date: 2026-10-17
+
+Idempotency lookups filter on the key alone, which the composite
+uq_credit_idempotency (account_id, idempotency_key) cannot serve.
+Charges already have the equivalent idx_charges_idempotency_key. Built
+concurrently so credit writes are not blocked on large tables.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2026_10_17_0020"
+down_revision: str | None = "2026_10_17_0019"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create partial index on credits.idempotency_key."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_credits_idempotency_key",
+            "credits",
+            ["idempotency_key"],
+            postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop partial index on credits.idempotency_key."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_credits_idempotency_key",
+            table_name="credits",
+            postgresql_concurrently=True,
+        )
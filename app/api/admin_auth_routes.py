@@ -45,6 +45,7 @@ def get_admin_auth_service() -> AdminAuthService:
 async def google_login(
     request: Request,
     redirect_uri: str | None = None,
+    db: AsyncSession = Depends(get_write_db),
     auth_service: AdminAuthService = Depends(get_admin_auth_service),
 ) -> RedirectResponse:
     """
@@ -70,7 +71,7 @@ async def google_login(
 
     try:
         state, auth_url = await auth_service.initiate_oauth_flow(
-            redirect_uri=redirect_uri, callback_url=callback_url
+            redirect_uri=redirect_uri, callback_url=callback_url, db=db
         )
 
         logger.info(
@@ -16,7 +16,7 @@ from structlog import get_logger
 
 from app.api.admin_dependencies import get_current_admin, require_admin_role
 from app.db.models import Account, AdminUser, APIKey, Charge, Credit, LLMUsageLog, ProviderConfig
-from app.db.session import get_read_db, get_write_db
+from app.db.session import get_pool_status, get_read_db, get_write_db
 from app.services.api_key import APIKeyService
 from app.services.token_revocation import token_revocation_service
 
@@ -166,6 +166,16 @@ class TokenRevocationStatsResponse(BaseModel):
     cache_loaded: bool = Field(..., description="Whether cache has been loaded from DB")
 
 
+class PoolStatusResponse(BaseModel):
+    """Connection pool usage for one database engine."""
+
+    engine: str = Field(..., description="Engine name (write or read)")
+    size: int = Field(..., description="Configured pool size")
+    checked_in: int = Field(..., description="Idle connections in the pool")
+    checked_out: int = Field(..., description="Connections currently in use")
+    overflow: int = Field(..., description="Connections opened beyond pool size")
+
+
 class AnalyticsOverviewResponse(BaseModel):
     """Dashboard overview analytics."""
 
@@ -815,6 +825,29 @@ async def get_revocation_stats(
     )
 
 
+@router.get("/db/pool", response_model=list[PoolStatusResponse])
+async def get_db_pool_status(
+    admin: AdminUser = Depends(get_current_admin),  # Both admin and viewer
+) -> list[PoolStatusResponse]:
+    """
+    Get database connection pool usage.
+
+    Only engines that have been created in this process are reported.
+
+    Accessible by: admin, viewer
+    """
+    return [
+        PoolStatusResponse(
+            engine=pool.engine,
+            size=pool.size,
+            checked_in=pool.checked_in,
+            checked_out=pool.checked_out,
+            overflow=pool.overflow,
+        )
+        for pool in get_pool_status()
+    ]
+
+
 # ============================================================================
 # Analytics
 # ============================================================================
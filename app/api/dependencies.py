@@ -4,6 +4,7 @@ FastAPI Dependencies - Authentication and authorization.
 NO DICTIONARIES - All dependencies return typed objects.
 """
 
+import asyncio
 import secrets
 from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
@@ -726,6 +727,27 @@ async def get_user_from_oauth_token(
 # ============================================================================
 
 
+async def _validate_api_key(api_key_service: APIKeyService, x_api_key: str) -> APIKeyData:
+    """
+    Validate an API key, failing fast with 503 if the database is not responding.
+
+    Without a bound, requests queue on an exhausted connection pool for the
+    full pool timeout before failing.
+    """
+    try:
+        async with asyncio.timeout(settings.api_key_validation_timeout_seconds):
+            return await api_key_service.validate_api_key(x_api_key)
+    except TimeoutError as exc:
+        logger.error(
+            "api_key_validation_timeout",
+            timeout_seconds=settings.api_key_validation_timeout_seconds,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication temporarily unavailable",
+        ) from exc
+
+
 async def get_api_key(
     x_api_key: str = Header(..., description="Agent API key"),
     db: AsyncSession = Depends(get_write_db),
@@ -751,7 +773,7 @@ async def get_api_key(
     api_key_service = APIKeyService(db)
 
     try:
-        api_key_data = await api_key_service.validate_api_key(x_api_key)
+        api_key_data = await _validate_api_key(api_key_service, x_api_key)
         return api_key_data
     except AuthenticationError as exc:
         raise HTTPException(
@@ -841,7 +863,7 @@ async def get_api_key_or_jwt(
     if x_api_key:
         api_key_service = APIKeyService(db)
         try:
-            api_key_data = await api_key_service.validate_api_key(x_api_key)
+            api_key_data = await _validate_api_key(api_key_service, x_api_key)
             return CombinedAuth(auth_type="api_key", api_key=api_key_data)
         except AuthenticationError as exc:
             raise HTTPException(
@@ -1039,6 +1039,7 @@ async def google_play_webhook(
     """
     from structlog import get_logger
 
+    from app.config import settings
     from app.exceptions import WebhookVerificationError
     from app.services.google_play_provider import GooglePlayProvider
     from app.services.provider_config import ProviderConfigService
@@ -1062,7 +1063,12 @@ async def google_play_webhook(
             service_account_json=google_play_config["service_account_json"],
             package_name=google_play_config["package_name"],
         )
-        webhook_event = await provider.verify_webhook(payload)
+        webhook_event = await provider.verify_webhook(
+            payload,
+            authorization=request.headers.get("Authorization"),
+            audience=settings.GOOGLE_PLAY_PUBSUB_AUDIENCE or None,
+            service_account_email=settings.GOOGLE_PLAY_PUBSUB_SERVICE_ACCOUNT or None,
+        )
 
         logger.info(
             "google_play_webhook_received",
@@ -1378,7 +1384,7 @@ async def apple_storekit_webhook(
             environment=apple_config["environment"],
         )
         provider = AppleStoreKitProvider(storekit_config)
-        webhook_event = await provider.verify_webhook(payload)
+        webhook_event = await provider.verify_webhook(payload, include_renewal_info=False)
 
         logger.info(
             "apple_storekit_webhook_received",
@@ -27,6 +27,11 @@ class Settings(BaseSettings):
     database_max_overflow: int = 10
     database_pool_timeout: int = 30
     database_pool_recycle: int = 3600
+    database_pool_pre_ping: bool = True  # Detect connections dropped by the server before use
+    # Turn off JIT for this app's sessions (short OLTP queries never recoup compile time).
+    # Sent as a startup parameter: behind PgBouncer, add "jit" to ignore_startup_parameters
+    # or set it on the role instead (ALTER ROLE ... SET jit = off).
+    database_disable_jit: bool = False
 
     # Environment (accepts ENV or ENVIRONMENT)
     environment: str = Field(
@@ -43,12 +48,20 @@ class Settings(BaseSettings):
 
     # Security
     api_key: str | None = None  # Future: API key authentication
+    api_key_last_used_flush_seconds: float = 5.0  # How often buffered last_used_at is written
+    api_key_cache_ttl_seconds: float = 30.0  # Reuse a successful validation for this long (0 = off)
+    api_key_validation_timeout_seconds: float = 5.0  # Fail fast (503) when the DB pool is exhausted
 
     # Admin Authentication - Google OAuth
     GOOGLE_CLIENT_ID: str = ""  # Google OAuth client ID (web client)
     GOOGLE_CLIENT_IDS: str = ""  # Comma-separated list of valid client IDs (web + Android)
     GOOGLE_CLIENT_SECRET: str = ""  # Google OAuth client secret
     ADMIN_JWT_SECRET: str = ""  # JWT secret for admin tokens (generate with: openssl rand -hex 32)
+    API_KEY_HMAC_SECRET: str = ""  # HMAC key for API key lookup (openssl rand -hex 32)
+
+    # Google Play Real-Time Developer Notifications (Pub/Sub push authentication)
+    GOOGLE_PLAY_PUBSUB_AUDIENCE: str = ""  # Push token audience; empty = token not checked
+    GOOGLE_PLAY_PUBSUB_SERVICE_ACCOUNT: str = ""  # Expected push sender email (optional)
 
     # Test Authentication (for automated testing only - NEVER enable in production)
     CIRIS_TEST_AUTH_ENABLED: bool = False
@@ -107,8 +120,41 @@ class Settings(BaseSettings):
     tracing_enabled: bool = False
     otlp_endpoint: str = "http://otel-collector:4317"
     otlp_insecure: bool = True
+    otlp_compression: str = "gzip"  # gzip, deflate or none
+    otlp_timeout_seconds: int = 10  # Per-export deadline
     service_name: str = "ciris-billing-api"
 
+    # Per-query SQLAlchemy spans (very chatty; hot DB paths have manual spans instead)
+    otel_instrument_sql: bool = False
+
+    # Comma-separated URL patterns FastAPI instrumentation does not trace
+    otel_excluded_urls: str = "health,metrics,admin-ui"
+    # Comma-separated span attribute prefixes stripped before export
+    otel_drop_attribute_prefixes: str = "code."
+
+    # Span processor kind: "batch" (default) or "simple" (synchronous, non-production only)
+    otel_processor_kind: str = "batch"
+
+    # Observability - Tracing batch export (also settable via the standard OTEL_BSP_* vars)
+    otel_bsp_max_queue_size: int = Field(
+        default=4096,
+        validation_alias=AliasChoices("OTEL_BSP_MAX_QUEUE_SIZE", "otel_bsp_max_queue_size"),
+    )
+    otel_bsp_schedule_delay_ms: int = Field(
+        default=1000,
+        validation_alias=AliasChoices("OTEL_BSP_SCHEDULE_DELAY", "otel_bsp_schedule_delay_ms"),
+    )
+    otel_bsp_max_export_batch_size: int = Field(
+        default=256,
+        validation_alias=AliasChoices(
+            "OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "otel_bsp_max_export_batch_size"
+        ),
+    )
+    otel_bsp_export_timeout_ms: int = Field(
+        default=10000,
+        validation_alias=AliasChoices("OTEL_BSP_EXPORT_TIMEOUT", "otel_bsp_export_timeout_ms"),
+    )
+
     # Observability - Sampling
     trace_sample_rate: float = 1.0  # 1.0 means 100% sampling
 
@@ -127,6 +173,13 @@ class Settings(BaseSettings):
     # Android package name for integrity verification
     ANDROID_PACKAGE_NAME: str = ""  # e.g., "ai.ciris.agent"
 
+    # Re-read balances from the database after each write and check invariants
+    # (an extra SELECT per write; for debugging and staging)
+    verify_writes: bool = False
+
+    # How often buffered credit check audit rows are written (outside the request)
+    credit_check_flush_seconds: float = 1.0
+
     # Pricing Configuration (LLM usage - legacy)
     free_uses_per_account: int = 10  # Free interactions for new users
     paid_uses_per_purchase: int = 20
@@ -16,6 +16,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     Numeric,
     String,
     Text,
@@ -276,6 +277,11 @@ class Credit(Base):
         ),
         UniqueConstraint("account_id", "idempotency_key", name="uq_credit_idempotency"),
         Index("idx_credits_created_at", "created_at"),
+        Index(
+            "idx_credits_idempotency_key",
+            "idempotency_key",
+            postgresql_where=(idempotency_key.isnot(None)),
+        ),
         Index("idx_credits_transaction_type", "transaction_type"),
         Index(
             "idx_credits_external_transaction_id",
@@ -363,6 +369,8 @@ class APIKey(Base):
     # Key storage (hashed with Argon2id)
     key_hash: Mapped[str] = mapped_column(Text, nullable=False)
     key_prefix: Mapped[str] = mapped_column(String(20), nullable=False, unique=True)
+    # HMAC-SHA256 of the plaintext key for indexed lookup (NULL for legacy keys until first use)
+    key_lookup_hmac: Mapped[bytes | None] = mapped_column(LargeBinary(32), nullable=True)
 
     # Metadata
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -405,6 +413,7 @@ class APIKey(Base):
         CheckConstraint("environment IN ('test', 'live')", name="ck_api_keys_environment"),
         CheckConstraint("status IN ('active', 'rotating', 'revoked')", name="ck_api_keys_status"),
         Index("idx_api_keys_prefix_active", "key_prefix", postgresql_where=(status == "active")),
+        Index("idx_api_keys_lookup_hmac", "key_lookup_hmac", unique=True),
         Index("idx_api_keys_created_by", "created_by"),
         Index("idx_api_keys_status", "status"),
     )
@@ -465,6 +474,37 @@ class AdminUser(Base):
         )
 
 
+class AdminOAuthSession(Base):
+    """
+    ORM model for admin_oauth_sessions table.
+
+    Pending Google OAuth logins keyed by a hash of the OAuth state parameter.
+    Stored in the database (not process memory) so any API instance can
+    complete a login; rows are consumed on callback and expire after a few minutes.
+    """
+
+    __tablename__ = "admin_oauth_sessions"
+
+    # Primary Key - hash of the OAuth state (SHA256)
+    state_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    # Where to send the user after login, and the callback registered with Google
+    redirect_uri: Mapped[str] = mapped_column(Text, nullable=False)
+    callback_url: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utc_now
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (Index("idx_admin_oauth_sessions_expires_at", "expires_at"),)
+
+    def __repr__(self) -> str:
+        """String representation for debugging."""
+        return f"<AdminOAuthSession(hash={self.state_hash[:16]}..., expires_at={self.expires_at})>"
+
+
 class ProviderConfig(Base):
     """
     ORM model for provider_configs table.
@@ -6,6 +6,8 @@ Provides separate read and write database connections.
 
 from collections.abc import AsyncGenerator, AsyncIterator
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
 
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
@@ -13,6 +15,7 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import QueuePool
 
 from app.config import settings
 
@@ -25,6 +28,13 @@ _write_session_factory: async_sessionmaker[AsyncSession] | None = None
 _read_session_factory: async_sessionmaker[AsyncSession] | None = None
 
 
+def _connect_args() -> dict[str, Any]:
+    """asyncpg connect() arguments shared by both engines."""
+    if settings.database_disable_jit:
+        return {"server_settings": {"jit": "off"}}
+    return {}
+
+
 def get_write_engine() -> AsyncEngine:
     """Get or create the write database engine (primary)."""
     global _write_engine
@@ -35,6 +45,8 @@ def get_write_engine() -> AsyncEngine:
             max_overflow=settings.database_max_overflow,
             pool_timeout=settings.database_pool_timeout,
             pool_recycle=settings.database_pool_recycle,
+            pool_pre_ping=settings.database_pool_pre_ping,
+            connect_args=_connect_args(),
             echo=settings.log_level == "DEBUG",
         )
     return _write_engine
@@ -50,6 +62,8 @@ def get_read_engine() -> AsyncEngine:
             max_overflow=settings.database_max_overflow,
             pool_timeout=settings.database_pool_timeout,
             pool_recycle=settings.database_pool_recycle,
+            pool_pre_ping=settings.database_pool_pre_ping,
+            connect_args=_connect_args(),
             echo=settings.log_level == "DEBUG",
         )
     return _read_engine
@@ -150,6 +164,38 @@ async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+@dataclass(frozen=True)
+class PoolStatus:
+    """Connection pool counters for one engine."""
+
+    engine: str
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+
+
+def get_pool_status() -> list[PoolStatus]:
+    """Report pool usage for engines that have been created (does not create them)."""
+    statuses: list[PoolStatus] = []
+    for name, engine in (("write", _write_engine), ("read", _read_engine)):
+        if engine is None:
+            continue
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        statuses.append(
+            PoolStatus(
+                engine=name,
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+            )
+        )
+    return statuses
+
+
 async def close_engines() -> None:
     """Close all database engines (for graceful shutdown)."""
     global _write_engine, _read_engine
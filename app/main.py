@@ -3,14 +3,13 @@ Main Application - FastAPI application setup.
 """
 
 from collections.abc import AsyncIterator, Awaitable, Callable
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
-from prometheus_client import generate_latest
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.api.admin_auth_routes import router as admin_auth_router
@@ -20,9 +19,15 @@ from app.api.status_routes import router as status_router
 from app.api.tool_routes import router as tool_router
 from app.config import settings
 from app.db.migration_runner import run_migrations
-from app.db.session import close_engines
-from app.observability import get_logger, metrics, setup_logging, setup_tracing
+from app.db.session import close_engines, get_write_session
+from app.observability import get_logger, get_metrics, setup_logging, setup_tracing
+from app.observability.metrics import get_metrics_handler
 from app.observability.tracing import instrument_fastapi
+from app.services.api_key import flush_last_used, run_last_used_flusher
+from app.services.apple_storekit_provider import close_http_client as close_apple_http_client
+from app.services.billing import flush_credit_checks, run_credit_check_flusher
+from app.services.google_oauth import close_http_client as close_google_http_client
+from app.services.google_play_provider import close_http_client as close_play_http_client
 
 # Setup logging before anything else
 setup_logging()
@@ -57,10 +62,37 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         logger.error("database_migrations_failed", error=str(e))
         raise
 
+    last_used_flusher = asyncio.create_task(
+        run_last_used_flusher(settings.api_key_last_used_flush_seconds)
+    )
+    credit_check_flusher = asyncio.create_task(
+        run_credit_check_flusher(settings.credit_check_flush_seconds)
+    )
+
     yield
 
     # Shutdown
     logger.info("application_shutting_down")
+    last_used_flusher.cancel()
+    credit_check_flusher.cancel()
+    # Let flushes cut off mid-write requeue their batches before the final flushes
+    with suppress(asyncio.CancelledError):
+        await last_used_flusher
+    with suppress(asyncio.CancelledError):
+        await credit_check_flusher
+    try:
+        async with get_write_session() as session:
+            await flush_last_used(session)
+    except Exception as e:
+        logger.warning("api_key_last_used_final_flush_failed", error=str(e))
+    try:
+        async with get_write_session() as session:
+            await flush_credit_checks(session)
+    except Exception as e:
+        logger.warning("credit_check_final_flush_failed", error=str(e))
+    await close_apple_http_client()
+    await close_google_http_client()
+    await close_play_http_client()
     await close_engines()
     logger.info("database_engines_closed")
 
@@ -170,7 +202,9 @@ async def logging_middleware(
     # Track in-progress requests
     endpoint = request.url.path
     method = request.method
-    metrics.http_requests_in_progress.labels(endpoint=endpoint, method=method).inc()
+    metrics = get_metrics()
+    in_progress = metrics.http_requests_in_progress.labels(endpoint, method)
+    in_progress.inc()
 
     try:
         response = await call_next(request)
@@ -216,7 +250,7 @@ async def logging_middleware(
         )
         raise
     finally:
-        metrics.http_requests_in_progress.labels(endpoint=endpoint, method=method).dec()
+        in_progress.dec()
 
 
 # Register routes
@@ -304,6 +338,9 @@ async def root() -> dict[str, str]:
     }
 
 
+_render_metrics = get_metrics_handler()
+
+
 def _is_internal_ip(ip: str) -> bool:
     """Check if IP is localhost or private network."""
     return (
@@ -338,7 +375,7 @@ async def metrics_endpoint(request: Request) -> Response:
 
         if not _is_internal_ip(actual_ip):
             return JSONResponse(status_code=403, content={"detail": "Forbidden"})
-    return PlainTextResponse(generate_latest())
+    return PlainTextResponse(_render_metrics())
 
 
 if __name__ == "__main__":
@@ -169,6 +169,7 @@ class OAuthToken:
     token_type: str = "Bearer"
     expires_in: int | None = None
     refresh_token: str | None = None
+    id_token: str | None = None
 
 
 @dataclass(frozen=True)
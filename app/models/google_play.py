@@ -1,5 +1,5 @@
 """
-Google Play domain models - Immutable dataclasses for purchase verification.
+Google Play domain models - Immutable slotted dataclasses for purchase verification.
 
 NO DICTIONARIES - All data uses strongly typed models.
 """
@@ -7,7 +7,7 @@ NO DICTIONARIES - All data uses strongly typed models.
 from dataclasses import dataclass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GooglePlayPurchaseToken:
     """Validated Google Play purchase token."""
 
@@ -17,7 +17,7 @@ class GooglePlayPurchaseToken:
 
     def __post_init__(self) -> None:
         """Validate purchase token fields."""
-        if not self.token or len(self.token) < 10:
+        if len(self.token or "") < 10:
             raise ValueError("Invalid purchase token")
         if not self.product_id:
             raise ValueError("Product ID required")
@@ -25,7 +25,7 @@ class GooglePlayPurchaseToken:
             raise ValueError("Package name required")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GooglePlayPurchaseVerification:
     """Result of Google Play purchase verification."""
 
@@ -56,7 +56,7 @@ class GooglePlayPurchaseVerification:
         return self.consumption_state == 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GooglePlayWebhookEvent:
     """Provider-agnostic Google Play webhook event."""
 
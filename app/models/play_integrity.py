@@ -4,11 +4,10 @@ Play Integrity API Models.
 Models for Google Play Integrity verification requests and responses.
 """
 
-from datetime import datetime
 from enum import Enum
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import AwareDatetime, BaseModel, ConfigDict, Field
 
 
 class DeviceRecognitionVerdict(str, Enum):
@@ -39,6 +38,9 @@ class AppLicensingVerdict(str, Enum):
 # API Request/Response Models
 # ============================================================================
 
+# Hot-path verify/auth models are immutable and reject unknown fields
+_FROZEN_STRICT = ConfigDict(frozen=True, extra="forbid")
+
 
 class IntegrityNonceRequest(BaseModel):
     """Request for a new integrity nonce."""
@@ -54,12 +56,14 @@ class IntegrityNonceResponse(BaseModel):
     """Response with a new integrity nonce."""
 
     nonce: str = Field(..., description="Base64 URL-safe encoded nonce for integrity request")
-    expires_at: datetime = Field(..., description="When this nonce expires")
+    expires_at: AwareDatetime = Field(..., description="When this nonce expires")
 
 
 class IntegrityVerifyRequest(BaseModel):
     """Request to verify a Play Integrity token."""
 
+    model_config = _FROZEN_STRICT
+
     integrity_token: str = Field(..., description="The encrypted integrity token from Android")
     nonce: str = Field(..., description="The nonce that was used to request this token")
 
@@ -91,6 +95,8 @@ class AccountIntegrityResult(BaseModel):
 class IntegrityVerifyResponse(BaseModel):
     """Response from Play Integrity verification."""
 
+    model_config = _FROZEN_STRICT
+
     verified: bool = Field(..., description="Whether the integrity check passed")
     request_details: dict[str, str] | None = Field(None, description="Request metadata from token")
     device_integrity: DeviceIntegrityResult | None = None
@@ -114,6 +120,8 @@ class IntegrityAuthRequest(BaseModel):
     - Granting premium features
     """
 
+    model_config = _FROZEN_STRICT
+
     integrity_token: str = Field(..., description="Play Integrity token from Android")
     nonce: str = Field(..., description="Nonce used to request the integrity token")
 
@@ -121,6 +129,8 @@ class IntegrityAuthRequest(BaseModel):
 class IntegrityAuthResponse(BaseModel):
     """Response from combined auth + integrity verification."""
 
+    model_config = _FROZEN_STRICT
+
     authenticated: bool = Field(..., description="JWT authentication passed")
     integrity_verified: bool = Field(..., description="Play Integrity check passed")
     user_id: str | None = Field(None, description="Google user ID from JWT")
@@ -144,9 +154,9 @@ class IntegrityNonce(BaseModel):
     """Internal model for tracking nonces."""
 
     nonce: str
-    created_at: datetime
-    expires_at: datetime
+    created_at: AwareDatetime
+    expires_at: AwareDatetime
     context: str | None = None
     used: bool = False
-    used_at: datetime | None = None
+    used_at: AwareDatetime | None = None
     account_id: UUID | None = None  # If associated with a user
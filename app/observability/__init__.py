@@ -3,13 +3,13 @@ Observability module - Logging, Metrics, and Tracing.
 """
 
 from app.observability.logging import get_log_shipper_stats, get_logger, setup_logging
-from app.observability.metrics import metrics
+from app.observability.metrics import get_metrics
 from app.observability.tracing import setup_tracing
 
 __all__ = [
     "get_logger",
     "get_log_shipper_stats",
+    "get_metrics",
     "setup_logging",
-    "metrics",
     "setup_tracing",
 ]
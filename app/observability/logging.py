@@ -5,10 +5,19 @@ Provides JSON-formatted logs with correlation IDs and context.
 Ships logs to CIRISLens when CIRISLENS_TOKEN is configured.
 """
 
+import atexit
+import contextvars
+import functools
 import logging
+import logging.handlers
+import queue
 import sys
+import time
+from collections.abc import Mapping
+from datetime import UTC, datetime
 from typing import Any
 
+import orjson
 import structlog
 from structlog.types import EventDict, Processor
 
@@ -17,11 +26,58 @@ from app.config import settings
 # LogShipper instance (initialized when CIRISLENS_TOKEN is set)
 _log_shipper = None
 
+# Background listener draining the log queue into the LogShipper handler
+_log_listener: logging.handlers.QueueListener | None = None
+
+# Application context baked in at setup time (avoids settings lookups per event)
+_SERVICE_NAME: str = settings.service_name
+_API_VERSION: str = settings.api_version
+
 
 def add_app_context(logger: Any, method_name: str, event_dict: EventDict) -> EventDict:
     """Add application-level context to all log entries."""
-    event_dict["service"] = settings.service_name
-    event_dict["version"] = settings.api_version
+    event_dict["service"] = _SERVICE_NAME
+    event_dict["version"] = _API_VERSION
+    return event_dict
+
+
+# orjson renders dataclasses (e.g. GooglePlay* models), UUIDs and naive datetimes natively
+_ORJSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_DATACLASS
+    | orjson.OPT_SERIALIZE_UUID
+    | orjson.OPT_NAIVE_UTC
+    | orjson.OPT_NON_STR_KEYS
+)
+
+
+def _orjson_dumps(obj: Any, default: Any = None, option: int = 0) -> str:
+    """json.dumps-compatible serializer for structlog's JSONRenderer."""
+    return orjson.dumps(obj, default=default, option=option).decode()
+
+
+# Single-slot cache of the last rendered timestamp: (epoch millis, ISO string)
+_last_timestamp: tuple[int, str] = (-1, "")
+
+
+def fast_timestamp(logger: Any, method_name: str, event_dict: EventDict) -> EventDict:
+    """
+    Add an ISO-8601 UTC timestamp with millisecond precision.
+
+    Bursts of events within the same millisecond reuse the formatted string
+    instead of re-running datetime.isoformat() for each one.
+    """
+    global _last_timestamp
+
+    now_ms = time.time_ns() // 1_000_000
+    cached_ms, cached_str = _last_timestamp
+    if now_ms != cached_ms:
+        cached_str = (
+            datetime.fromtimestamp(now_ms / 1000, tz=UTC)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z")
+        )
+        _last_timestamp = (now_ms, cached_str)
+    event_dict["timestamp"] = cached_str
     return event_dict
 
 
@@ -33,7 +89,7 @@ def setup_logging() -> None:
     {
         "event": "message",
         "level": "info",
-        "timestamp": "2025-01-08T12:00:00.123456Z",
+        "timestamp": "2025-01-08T12:00:00.123Z",
         "logger": "app.services.billing",
         "service": "ciris-billing-api",
         "version": "0.1.0",
@@ -41,9 +97,14 @@ def setup_logging() -> None:
         ...additional context
     }
 
-    When CIRISLENS_TOKEN is set, logs are also shipped to CIRISLens.
+    When CIRISLENS_TOKEN is set, logs are also shipped to CIRISLens. Shipping
+    happens on a background QueueListener thread so request handlers only pay
+    for a non-blocking queue put.
     """
-    global _log_shipper
+    global _log_shipper, _log_listener, _SERVICE_NAME, _API_VERSION
+
+    _SERVICE_NAME = settings.service_name
+    _API_VERSION = settings.api_version
 
     # Configure standard library logging
     logging.basicConfig(
@@ -65,10 +126,16 @@ def setup_logging() -> None:
                 flush_interval=5.0,
             )
 
-            # Add handler to root logger
+            # Ship from a background thread; the root logger only enqueues records
             handler = LogShipperHandler(_log_shipper, min_level=logging.INFO)
             handler.setFormatter(logging.Formatter("%(message)s"))
-            logging.getLogger().addHandler(handler)
+            log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+            logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+            _log_listener = logging.handlers.QueueListener(
+                log_queue, handler, respect_handler_level=True
+            )
+            _log_listener.start()
+            atexit.register(_log_listener.stop)
 
             # Log that CIRISLens is enabled (this will also be shipped)
             logging.info(
@@ -80,11 +147,13 @@ def setup_logging() -> None:
 
     # Processors for structlog
     processors: list[Processor] = [
+        # Drop events below the configured level before any other processor runs
+        structlog.stdlib.filter_by_level,
         structlog.contextvars.merge_contextvars,
         structlog.stdlib.add_log_level,
         structlog.stdlib.add_logger_name,
         add_app_context,
-        structlog.processors.TimeStamper(fmt="iso", utc=True),
+        fast_timestamp,
         structlog.processors.StackInfoRenderer(),
     ]
 
@@ -96,7 +165,9 @@ def setup_logging() -> None:
 
     # Choose renderer based on format
     if settings.log_format == "json":
-        processors.append(structlog.processors.JSONRenderer())
+        processors.append(
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps, option=_ORJSON_OPTIONS)
+        )
     else:
         processors.append(structlog.dev.ConsoleRenderer(colors=True))
 
@@ -110,10 +181,14 @@ def setup_logging() -> None:
     )
 
 
+@functools.cache
 def get_logger(name: str) -> structlog.stdlib.BoundLogger:
     """
     Get a structured logger instance.
 
+    Loggers are cached per name, so calling this inside hot functions is a
+    dict hit rather than a fresh structlog proxy.
+
     Usage:
         logger = get_logger(__name__)
         logger.info("credit_check_performed", account_id=account_id, has_credit=True)
@@ -139,16 +214,16 @@ class log_context:
             # All logs within this context will include request_id and user_id
     """
 
+    __slots__ = ("context", "_tokens")
+
     def __init__(self, **kwargs: Any) -> None:
         self.context = kwargs
-        self.token = None
+        self._tokens: Mapping[str, contextvars.Token[Any]] = {}
 
     def __enter__(self) -> None:
         """Enter context - bind context variables."""
-        for key, value in self.context.items():
-            structlog.contextvars.bind_contextvars(**{key: value})
+        self._tokens = structlog.contextvars.bind_contextvars(**self.context)
 
     def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        """Exit context - clear context variables."""
-        for key in self.context.keys():
-            structlog.contextvars.unbind_contextvars(key)
+        """Exit context - restore context variables to their previous values."""
+        structlog.contextvars.reset_contextvars(**self._tokens)
@@ -4,8 +4,12 @@ Metrics Collection with Prometheus.
 Exposes business and system metrics for monitoring.
 """
 
+import functools
+import threading
+import time
 from collections.abc import Callable
 from enum import Enum
+from typing import Any
 
 from prometheus_client import Counter, Gauge, Histogram, Info
 
@@ -13,7 +17,12 @@ from app.config import settings
 
 
 class MetricLabels(str, Enum):
-    """Standard metric label names."""
+    """
+    Standard metric label names.
+
+    Documentation aid only - metric constructors take the plain strings so the
+    exported label names are exactly these values.
+    """
 
     ENDPOINT = "endpoint"
     METHOD = "method"
@@ -24,6 +33,15 @@ class MetricLabels(str, Enum):
     ERROR_TYPE = "error_type"
 
 
+# Boolean label values ("True"/"False") without a str() call per record
+_BOOL_STR: dict[bool, str] = {True: "True", False: "False"}
+
+
+def _child_cache(labels: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a metric's ``labels`` method in a bounded cache of resolved children."""
+    return functools.lru_cache(maxsize=256)(labels)
+
+
 class BillingMetrics:
     """
     Centralized metrics for CIRIS Billing API.
@@ -59,20 +77,20 @@ class BillingMetrics:
         self.http_requests_total = Counter(
             "billing_http_requests_total",
             "Total HTTP requests",
-            [MetricLabels.ENDPOINT, MetricLabels.METHOD, MetricLabels.STATUS_CODE],
+            ("endpoint", "method", "status_code"),
         )
 
         self.http_request_duration_seconds = Histogram(
             "billing_http_request_duration_seconds",
             "HTTP request duration in seconds",
-            [MetricLabels.ENDPOINT, MetricLabels.METHOD],
+            ("endpoint", "method"),
             buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
         )
 
         self.http_requests_in_progress = Gauge(
             "billing_http_requests_in_progress",
             "Number of HTTP requests currently being processed",
-            [MetricLabels.ENDPOINT, MetricLabels.METHOD],
+            ("endpoint", "method"),
         )
 
         # ====================================================================
@@ -81,7 +99,7 @@ class BillingMetrics:
         self.credit_checks_total = Counter(
             "billing_credit_checks_total",
             "Total credit checks performed",
-            ["has_credit", "reason"],
+            ("has_credit", "reason"),
         )
 
         self.credit_check_duration_seconds = Histogram(
@@ -96,7 +114,7 @@ class BillingMetrics:
         self.charges_total = Counter(
             "billing_charges_total",
             "Total charges created",
-            ["success", MetricLabels.ERROR_TYPE],
+            ("success", "error_type"),
         )
 
         self.charge_amount_minor = Histogram(
@@ -117,7 +135,7 @@ class BillingMetrics:
         self.credits_added_total = Counter(
             "billing_credits_added_total",
             "Total credits added to accounts",
-            [MetricLabels.TRANSACTION_TYPE, "success"],
+            ("transaction_type", "success"),
         )
 
         self.credit_amount_minor = Histogram(
@@ -137,7 +155,7 @@ class BillingMetrics:
         self.account_balance_minor = Gauge(
             "billing_account_balance_minor",
             "Current account balance in minor units (gauge - sample)",
-            [MetricLabels.ACCOUNT_STATUS],
+            ("account_status",),
         )
 
         # ====================================================================
@@ -146,13 +164,13 @@ class BillingMetrics:
         self.db_queries_total = Counter(
             "billing_db_queries_total",
             "Total database queries",
-            [MetricLabels.OPERATION, "success"],
+            ("operation", "success"),
         )
 
         self.db_query_duration_seconds = Histogram(
             "billing_db_query_duration_seconds",
             "Database query duration in seconds",
-            [MetricLabels.OPERATION],
+            ("operation",),
             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
         )
 
@@ -164,7 +182,16 @@ class BillingMetrics:
         self.db_write_verifications_total = Counter(
             "billing_db_write_verifications_total",
             "Total write verification checks",
-            ["success"],
+            ("success",),
+        )
+
+        # ====================================================================
+        # Admin OAuth Session Metrics
+        # ====================================================================
+        self.admin_oauth_session_lookups_total = Counter(
+            "billing_admin_oauth_session_lookups_total",
+            "Admin OAuth session lookups on callback (hit or miss)",
+            ("result",),
         )
 
         # ====================================================================
@@ -173,9 +200,24 @@ class BillingMetrics:
         self.errors_total = Counter(
             "billing_errors_total",
             "Total errors by type",
-            [MetricLabels.ERROR_TYPE, MetricLabels.OPERATION],
+            ("error_type", "operation"),
         )
 
+        # ====================================================================
+        # Labeled Child Caches
+        # ====================================================================
+        # Resolving a labeled child is a tuple hash + locked dict lookup inside
+        # prometheus_client; cache the bound children for the hot record_* paths.
+        # Positional args must follow each metric's label declaration order.
+        self._http_requests_child = _child_cache(self.http_requests_total.labels)
+        self._http_duration_child = _child_cache(self.http_request_duration_seconds.labels)
+        self._credit_checks_child = _child_cache(self.credit_checks_total.labels)
+        self._charges_child = _child_cache(self.charges_total.labels)
+        self._credits_added_child = _child_cache(self.credits_added_total.labels)
+        self._db_queries_child = _child_cache(self.db_queries_total.labels)
+        self._db_duration_child = _child_cache(self.db_query_duration_seconds.labels)
+        self._errors_child = _child_cache(self.errors_total.labels)
+
     # ========================================================================
     # Helper Methods
     # ========================================================================
@@ -184,25 +226,19 @@ class BillingMetrics:
         self, endpoint: str, method: str, status_code: int, duration: float
     ) -> None:
         """Record HTTP request metrics."""
-        self.http_requests_total.labels(
-            endpoint=endpoint, method=method, status_code=status_code
-        ).inc()
-        self.http_request_duration_seconds.labels(endpoint=endpoint, method=method).observe(
-            duration
-        )
+        self._http_requests_child(endpoint, method, status_code).inc()
+        self._http_duration_child(endpoint, method).observe(duration)
 
     def record_credit_check(self, has_credit: bool, reason: str | None, duration: float) -> None:
         """Record credit check metrics."""
-        self.credit_checks_total.labels(
-            has_credit=str(has_credit), reason=reason or "success"
-        ).inc()
+        self._credit_checks_child(_BOOL_STR[has_credit], reason or "success").inc()
         self.credit_check_duration_seconds.observe(duration)
 
     def record_charge(
         self, success: bool, amount_minor: int, duration: float, error_type: str | None = None
     ) -> None:
         """Record charge creation metrics."""
-        self.charges_total.labels(success=str(success), error_type=error_type or "none").inc()
+        self._charges_child(_BOOL_STR[success], error_type or "none").inc()
         if success:
             self.charge_amount_minor.observe(amount_minor)
         self.charge_duration_seconds.observe(duration)
@@ -214,24 +250,38 @@ class BillingMetrics:
         amount_minor: int,
     ) -> None:
         """Record credit addition metrics."""
-        self.credits_added_total.labels(
-            transaction_type=transaction_type, success=str(success)
-        ).inc()
+        self._credits_added_child(transaction_type, _BOOL_STR[success]).inc()
         if success:
             self.credit_amount_minor.observe(amount_minor)
 
     def record_db_query(self, operation: str, success: bool, duration: float) -> None:
         """Record database query metrics."""
-        self.db_queries_total.labels(operation=operation, success=str(success)).inc()
-        self.db_query_duration_seconds.labels(operation=operation).observe(duration)
+        self._db_queries_child(operation, _BOOL_STR[success]).inc()
+        self._db_duration_child(operation).observe(duration)
 
     def record_error(self, error_type: str, operation: str) -> None:
         """Record error occurrence."""
-        self.errors_total.labels(error_type=error_type, operation=operation).inc()
+        self._errors_child(error_type, operation).inc()
+
+    def record_oauth_session_lookup(self, hit: bool) -> None:
+        """Record whether an OAuth callback found its pending session."""
+        self.admin_oauth_session_lookups_total.labels("hit" if hit else "miss").inc()
+
+
+# Global metrics instance, created on first access so importing this module
+# does not register collectors with the Prometheus registry.
+_metrics: BillingMetrics | None = None
+_metrics_lock = threading.Lock()
 
 
-# Global metrics instance
-metrics = BillingMetrics()
+def get_metrics() -> BillingMetrics:
+    """Return the global metrics instance, creating it on first use."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = BillingMetrics()
+    return _metrics
 
 
 # Context managers for automatic metric recording
@@ -245,11 +295,14 @@ class track_http_request:
             tracker.set_status_code(201)
     """
 
+    __slots__ = ("endpoint", "method", "status_code", "start_time", "_in_progress")
+
     def __init__(self, endpoint: str, method: str) -> None:
         self.endpoint = endpoint
         self.method = method
         self.status_code = 200
         self.start_time: float = 0.0
+        self._in_progress: Any = None
 
     def set_status_code(self, status_code: int) -> None:
         """Set the response status code."""
@@ -257,34 +310,45 @@ class track_http_request:
 
     def __enter__(self) -> "track_http_request":
         """Start tracking."""
-        import time
-
-        self.start_time = time.time()
-        metrics.http_requests_in_progress.labels(endpoint=self.endpoint, method=self.method).inc()
+        self.start_time = time.perf_counter()
+        # Resolve the labeled gauge once; __exit__ reuses it for the matching dec()
+        self._in_progress = get_metrics().http_requests_in_progress.labels(
+            self.endpoint, self.method
+        )
+        self._in_progress.inc()
         return self
 
     def __exit__(self, exc_type: type, exc_val: Exception, exc_tb: object) -> None:
         """Record metrics."""
-        import time
-
-        duration = time.time() - self.start_time
+        duration = time.perf_counter() - self.start_time
         if exc_type is not None:
             self.status_code = 500  # Default to 500 on exception
-        metrics.record_http_request(self.endpoint, self.method, self.status_code, duration)
-        metrics.http_requests_in_progress.labels(endpoint=self.endpoint, method=self.method).dec()
+        get_metrics().record_http_request(self.endpoint, self.method, self.status_code, duration)
+        self._in_progress.dec()
 
 
-def get_metrics_handler() -> Callable[[], bytes]:
+def get_metrics_handler(ttl_seconds: float = 0.5) -> Callable[[], bytes]:
     """
     Get Prometheus metrics handler for FastAPI.
 
+    The rendered exposition is cached for ``ttl_seconds`` so concurrent or
+    back-to-back scrapes share one serialization pass over the registry.
+
     Usage:
-        from prometheus_client import generate_latest
-        return get_metrics_handler()
+        render_metrics = get_metrics_handler()
+        return PlainTextResponse(render_metrics())
     """
     from prometheus_client import REGISTRY, generate_latest
 
+    last_rendered_at = float("-inf")
+    last_output = b""
+
     def metrics_endpoint() -> bytes:
-        return generate_latest(REGISTRY)
+        nonlocal last_rendered_at, last_output
+        now = time.monotonic()
+        if now - last_rendered_at >= ttl_seconds:
+            last_output = generate_latest(REGISTRY)
+            last_rendered_at = now
+        return last_output
 
     return metrics_endpoint
@@ -4,18 +4,124 @@ Distributed Tracing with OpenTelemetry.
 Provides end-to-end request tracing across services and databases.
 """
 
-from typing import Any
-
+import functools
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractContextManager
+from types import TracebackType
+from typing import Any, ParamSpec, TypeVar
+
+import orjson
+from grpc import Compression  # type: ignore[import-untyped]
 from opentelemetry import trace
+from opentelemetry.context import Context
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+)
 from opentelemetry.trace import Span, Status, StatusCode, Tracer
 
-from app.config import settings
+from app.config import ConfigurationError, settings
+from app.observability.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+_OTLP_COMPRESSION = {
+    "gzip": Compression.Gzip,
+    "deflate": Compression.Deflate,
+    "none": Compression.NoCompression,
+}
+
+
+def _otlp_compression() -> Compression:
+    """Resolve the configured OTLP gRPC compression codec."""
+    try:
+        return _OTLP_COMPRESSION[settings.otlp_compression.lower()]
+    except KeyError:
+        raise ConfigurationError(f"Unknown OTLP_COMPRESSION: {settings.otlp_compression}") from None
+
+
+def _build_span_processor(exporter: SpanExporter) -> SpanProcessor:
+    """
+    Build the span processor for the OTLP exporter.
+
+    Batch export is the default. Synchronous (simple) export blocks every
+    request on the exporter round-trip, so it is refused in production and
+    only allowed elsewhere with a warning.
+    """
+    kind = settings.otel_processor_kind.lower()
+    if kind == "simple":
+        if settings.environment.lower() == "production":
+            raise ConfigurationError("OTEL_PROCESSOR_KIND=simple is not allowed in production")
+        logger.warning("tracing_simple_span_processor_enabled")
+        return SimpleSpanProcessor(exporter)
+    if kind != "batch":
+        raise ConfigurationError(f"Unknown OTEL_PROCESSOR_KIND: {settings.otel_processor_kind}")
+
+    return BatchSpanProcessor(
+        exporter,
+        max_queue_size=settings.otel_bsp_max_queue_size,
+        schedule_delay_millis=settings.otel_bsp_schedule_delay_ms,
+        max_export_batch_size=settings.otel_bsp_max_export_batch_size,
+        export_timeout_millis=settings.otel_bsp_export_timeout_ms,
+    )
+
+
+class _AttributeFilteringProcessor(SpanProcessor):
+    """
+    Span processor that strips attributes by key prefix before export.
+
+    Wraps the exporting processor. Spans without matching attributes are
+    passed through untouched; the rest are re-created without them, since
+    ended spans are immutable.
+    """
+
+    def __init__(self, inner: SpanProcessor, drop_prefixes: tuple[str, ...]) -> None:
+        self._inner = inner
+        self._drop_prefixes = drop_prefixes
+
+    def on_start(self, span: Any, parent_context: Context | None = None) -> None:
+        self._inner.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        attributes = span.attributes
+        if attributes and any(key.startswith(self._drop_prefixes) for key in attributes):
+            span = ReadableSpan(
+                name=span.name,
+                context=span.context,
+                parent=span.parent,
+                resource=span.resource,
+                attributes={
+                    key: value
+                    for key, value in attributes.items()
+                    if not key.startswith(self._drop_prefixes)
+                },
+                events=span.events,
+                links=span.links,
+                kind=span.kind,
+                status=span.status,
+                start_time=span.start_time,
+                end_time=span.end_time,
+                instrumentation_scope=span.instrumentation_scope,
+            )
+        self._inner.on_end(span)
+
+    def shutdown(self) -> None:
+        self._inner.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._inner.force_flush(timeout_millis)
+
+
+def _split_csv(value: str) -> tuple[str, ...]:
+    """Split a comma-separated setting into non-empty, stripped items."""
+    return tuple(item.strip() for item in value.split(",") if item.strip())
 
 
 def setup_tracing() -> None:
@@ -24,9 +130,9 @@ def setup_tracing() -> None:
 
     Sets up:
     - TracerProvider with service resource
-    - OTLP exporter to collector
+    - OTLP exporter to collector, batched with tunable queue/batch sizes
+    - Attribute filtering (otel_drop_attribute_prefixes) before export
     - FastAPI auto-instrumentation
-    - SQLAlchemy auto-instrumentation
     """
     if not settings.tracing_enabled:
         return
@@ -43,12 +149,18 @@ def setup_tracing() -> None:
     # Create tracer provider
     provider = TracerProvider(resource=resource)
 
-    # Add OTLP exporter
+    # Add OTLP exporter (one long-lived gRPC channel; batches are compressed)
     otlp_exporter = OTLPSpanExporter(
         endpoint=settings.otlp_endpoint,
         insecure=settings.otlp_insecure,
+        compression=_otlp_compression(),
+        timeout=settings.otlp_timeout_seconds,
     )
-    provider.add_span_processor(BatchSpanProcessor(otlp_exporter))
+    processor = _build_span_processor(otlp_exporter)
+    drop_prefixes = _split_csv(settings.otel_drop_attribute_prefixes)
+    if drop_prefixes:
+        processor = _AttributeFilteringProcessor(processor, drop_prefixes)
+    provider.add_span_processor(processor)
 
     # Set as global tracer provider
     trace.set_tracer_provider(provider)
@@ -58,30 +170,38 @@ def instrument_fastapi(app: Any) -> None:
     """
     Instrument FastAPI application for automatic tracing.
 
-    Must be called after app creation.
+    Must be called after app creation. Health checks, metrics scrapes and
+    static admin UI assets (otel_excluded_urls) are not traced.
     """
     if not settings.tracing_enabled:
         return
 
-    FastAPIInstrumentor.instrument_app(app)
+    FastAPIInstrumentor.instrument_app(app, excluded_urls=settings.otel_excluded_urls)
 
 
 def instrument_sqlalchemy(engine: Any) -> None:
     """
     Instrument SQLAlchemy engine for automatic query tracing.
 
-    Must be called for each database engine.
+    Creates a span per query, so it is off unless otel_instrument_sql is set;
+    hot DB paths are covered by @traced spans instead. Must be called for
+    each database engine.
     """
-    if not settings.tracing_enabled:
+    if not settings.tracing_enabled or not settings.otel_instrument_sql:
         return
 
     SQLAlchemyInstrumentor().instrument(engine=engine.sync_engine)
 
 
+@functools.cache
 def get_tracer(name: str) -> Tracer:
     """
     Get a tracer instance for manual span creation.
 
+    Tracers are cached per name. Before setup_tracing() runs the global API
+    hands out proxy tracers that start delegating once a provider is set, so
+    caching them is safe.
+
     Usage:
         tracer = get_tracer(__name__)
         with tracer.start_as_current_span("operation_name") as span:
@@ -91,6 +211,30 @@ def get_tracer(name: str) -> Tracer:
     return trace.get_tracer(name)
 
 
+# Attribute value types OpenTelemetry accepts as-is; anything else is stringified
+_PRIM_TYPES = (str, int, float, bool)
+
+# Containers are rendered as JSON rather than Python repr
+_JSON_TYPES = (dict, list, tuple)
+
+
+def _attribute_value(value: Any) -> Any:
+    """Pass primitives through; render containers as JSON and other objects with str()."""
+    if isinstance(value, _PRIM_TYPES):
+        return value
+    if isinstance(value, _JSON_TYPES):
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass  # contains values orjson cannot serialize
+    return str(value)
+
+
+def _span_attributes(attributes: dict[str, Any]) -> dict[str, Any]:
+    """Drop None values and normalize the rest in one pass."""
+    return {key: _attribute_value(value) for key, value in attributes.items() if value is not None}
+
+
 def add_span_attributes(span: Span, **attributes: Any) -> None:
     """
     Add attributes to the current span.
@@ -103,13 +247,7 @@ def add_span_attributes(span: Span, **attributes: Any) -> None:
             has_credit=has_credit
         )
     """
-    for key, value in attributes.items():
-        if value is not None:
-            # Convert to string for non-primitive types
-            if isinstance(value, (str, int, float, bool)):
-                span.set_attribute(key, value)
-            else:
-                span.set_attribute(key, str(value))
+    span.set_attributes(_span_attributes(attributes))
 
 
 def add_span_event(span: Span, name: str, **attributes: Any) -> None:
@@ -124,7 +262,7 @@ def add_span_event(span: Span, name: str, **attributes: Any) -> None:
             balance_after=900
         )
     """
-    span.add_event(name, attributes=attributes)
+    span.add_event(name, attributes=_span_attributes(attributes))
 
 
 def set_span_error(span: Span, error: Exception) -> None:
@@ -142,6 +280,18 @@ def set_span_error(span: Span, error: Exception) -> None:
     span.record_exception(error)
 
 
+# Tracer shared by all trace_operation spans
+_OPS_TRACER: Tracer | None = None
+
+
+def _ops_tracer() -> Tracer:
+    """Return the shared ``app.operations`` tracer, resolving it on first use."""
+    global _OPS_TRACER
+    if _OPS_TRACER is None:
+        _OPS_TRACER = get_tracer("app.operations")
+    return _OPS_TRACER
+
+
 # Context manager for manual span creation
 class trace_operation:
     """
@@ -155,23 +305,53 @@ class trace_operation:
 
     def __init__(self, operation_name: str, **attributes: Any) -> None:
         self.operation_name = operation_name
-        self.attributes = attributes
+        # Normalized once so attributes are passed at span creation
+        self.attributes = _span_attributes(attributes)
         self.span: Span | None = None
-        self.context: Any = None
-        self.tracer = get_tracer("app.operations")
+        self.tracer = _ops_tracer()
+        self._cm: AbstractContextManager[Span] | None = None
 
     def __enter__(self) -> Span:
-        """Start span."""
-        self.span = self.tracer.start_span(self.operation_name)
-        if self.span:
-            add_span_attributes(self.span, **self.attributes)
-        # Store context for cleanup (context is immutable, no enter/exit needed)
-        self.context = trace.set_span_in_context(self.span)
+        """Start span and make it current."""
+        self._cm = self.tracer.start_as_current_span(
+            self.operation_name,
+            attributes=self.attributes,
+            record_exception=False,
+            set_status_on_exception=False,
+        )
+        self.span = self._cm.__enter__()
         return self.span
 
-    def __exit__(self, exc_type: type, exc_val: Exception, exc_tb: object) -> None:
-        """End span and record any errors."""
-        if self.span:
-            if exc_val:
-                set_span_error(self.span, exc_val)
-            self.span.end()
+    def __exit__(self, exc_type: type, exc_val: Exception, exc_tb: TracebackType | None) -> None:
+        """Record any errors, then end span and restore the previous context."""
+        if self.span and exc_val:
+            set_span_error(self.span, exc_val)
+        if self._cm is not None:
+            self._cm.__exit__(exc_type, exc_val, exc_tb)
+
+
+_P = ParamSpec("_P")
+_R = TypeVar("_R")
+
+
+def traced(
+    operation_name: str,
+) -> Callable[[Callable[_P, Awaitable[_R]]], Callable[_P, Awaitable[_R]]]:
+    """
+    Decorator wrapping an async function in a trace_operation span.
+
+    Usage:
+        @traced("db.api_key.validate")
+        async def validate_api_key(self, ...):
+            ...
+    """
+
+    def decorator(func: Callable[_P, Awaitable[_R]]) -> Callable[_P, Awaitable[_R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+            with trace_operation(operation_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
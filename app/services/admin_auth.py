@@ -1,24 +1,35 @@
 """
 Admin authentication service using Google OAuth.
 
-Simplified from CIRISManager - stores admin users in PostgreSQL.
+Simplified from CIRISManager - stores admin users and pending OAuth sessions in PostgreSQL.
 """
 
+import hashlib
 import secrets
 from datetime import UTC, datetime, timedelta
 from uuid import UUID, uuid4
 
 import jwt
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from structlog import get_logger
 
-from app.db.models import AdminUser
+from app.db.models import AdminOAuthSession, AdminUser
 from app.models.domain import OAuthSession, OAuthToken, OAuthUser
+from app.observability.metrics import get_metrics
+from app.observability.tracing import traced
 from app.services.google_oauth import GoogleOAuthProvider
 
 logger = get_logger(__name__)
 
+# Pending OAuth logins must complete within this window
+OAUTH_SESSION_TTL = timedelta(minutes=10)
+
+
+def _hash_state(state: str) -> str:
+    """Hash the OAuth state so raw state tokens are never stored."""
+    return hashlib.sha256(state.encode()).hexdigest()
+
 
 class AdminAuthService:
     """Admin authentication service."""
@@ -32,24 +43,35 @@ class AdminAuthService:
         self.oauth_provider = oauth_provider
         self.jwt_secret = jwt_secret
         self.jwt_expire_hours = jwt_expire_hours
-        self._sessions: dict[str, OAuthSession] = {}  # In-memory session store
 
-    async def initiate_oauth_flow(self, redirect_uri: str, callback_url: str) -> tuple[str, str]:
+    async def initiate_oauth_flow(
+        self, redirect_uri: str, callback_url: str, db: AsyncSession
+    ) -> tuple[str, str]:
         """
         Initiate OAuth flow.
 
+        The pending session is stored in the database so the callback can be
+        handled by any API instance. Expired sessions are purged here.
+
         Returns:
             (state, auth_url) tuple
         """
         state = secrets.token_urlsafe(32)
-        session = OAuthSession(
-            redirect_uri=redirect_uri,
-            callback_url=callback_url,
-            created_at=datetime.now(UTC).isoformat(),
+        now = datetime.now(UTC)
+
+        await db.execute(delete(AdminOAuthSession).where(AdminOAuthSession.expires_at <= now))
+        db.add(
+            AdminOAuthSession(
+                state_hash=_hash_state(state),
+                redirect_uri=redirect_uri,
+                callback_url=callback_url,
+                created_at=now,
+                expires_at=now + OAUTH_SESSION_TTL,
+            )
         )
+        await db.commit()
 
-        self._sessions[state] = session
-        auth_url = await self.oauth_provider.get_authorization_url(state, callback_url)
+        auth_url = self.oauth_provider.get_authorization_url(state, callback_url)
 
         logger.info(
             "oauth_flow_initiated",
@@ -68,8 +90,8 @@ class AdminAuthService:
         Returns:
             dict with access_token, redirect_uri, user
         """
-        # Get session
-        session = self._sessions.get(state)
+        # Consume session (atomic read + delete)
+        session = await self._consume_session(db, state)
         if not session:
             logger.warning("invalid_oauth_state", state=state[:8])
             raise ValueError("Invalid OAuth state")
@@ -79,24 +101,24 @@ class AdminAuthService:
             code, session.callback_url
         )
 
-        # Get user info
-        user: OAuthUser = await self.oauth_provider.get_user_info(token.access_token)
+        # Get user info, from the ID token when Google returned one
+        user: OAuthUser
+        if token.id_token:
+            user = await self.oauth_provider.verify_id_token(token.id_token)
+        else:
+            user = await self.oauth_provider.get_user_info(token.access_token)
 
         logger.info("oauth_user_info_received", email=user.email)
 
-        # Create or update admin user in database
+        # Create or update admin user, stamp last login, and consume the
+        # session in a single commit
         admin_user = await self._get_or_create_admin_user(db, user)
-
-        # Update last login
         admin_user.last_login_at = datetime.now(UTC)
         await db.commit()
 
         # Generate JWT
         jwt_token = self._create_jwt_token(admin_user)
 
-        # Clean up session
-        del self._sessions[state]
-
         logger.info(
             "oauth_login_success",
             email=admin_user.email,
@@ -116,8 +138,38 @@ class AdminAuthService:
             },
         }
 
+    async def _consume_session(self, db: AsyncSession, state: str) -> OAuthSession | None:
+        """Delete and return the pending session for a state, if it exists and is unexpired."""
+        stmt = (
+            delete(AdminOAuthSession)
+            .where(
+                AdminOAuthSession.state_hash == _hash_state(state),
+                AdminOAuthSession.expires_at > datetime.now(UTC),
+            )
+            .returning(
+                AdminOAuthSession.redirect_uri,
+                AdminOAuthSession.callback_url,
+                AdminOAuthSession.created_at,
+            )
+        )
+        row = (await db.execute(stmt)).one_or_none()
+        get_metrics().record_oauth_session_lookup(hit=row is not None)
+        if row is None:
+            return None
+
+        return OAuthSession(
+            redirect_uri=row.redirect_uri,
+            callback_url=row.callback_url,
+            created_at=row.created_at.isoformat(),
+        )
+
+    @traced("db.admin_user.get_or_create")
     async def _get_or_create_admin_user(self, db: AsyncSession, oauth_user: OAuthUser) -> AdminUser:
-        """Get existing admin user or create if doesn't exist."""
+        """
+        Get existing admin user or create if doesn't exist.
+
+        Does not commit - the caller commits once after stamping last_login_at.
+        """
         stmt = select(AdminUser).where(AdminUser.email == oauth_user.email)
         result = await db.execute(stmt)
         admin_user = result.scalar_one_or_none()
@@ -138,24 +190,24 @@ class AdminAuthService:
 
             return admin_user
 
-        # Check if first user (eric@ciris.ai) or new user
-        stmt_count = select(AdminUser)
-        result_count = await db.execute(stmt_count)
-        user_count = len(result_count.scalars().all())
+        # Check if first user (eric@ciris.ai) or new user - only existence matters
+        any_user = await db.execute(select(AdminUser.id).limit(1))
+        is_first_user = any_user.first() is None
 
         # Determine role: eric@ciris.ai is always admin, others are viewer by default
         role = "admin" if oauth_user.email == "eric@ciris.ai" else "viewer"
 
         # If this is the first user and it's eric@ciris.ai, make them admin
-        if user_count == 0 and oauth_user.email == "eric@ciris.ai":
+        if is_first_user and oauth_user.email == "eric@ciris.ai":
             logger.info("creating_first_admin_user", email=oauth_user.email)
             role = "admin"
-        elif user_count == 0:
+        elif is_first_user:
             # First user but not eric@ciris.ai - shouldn't happen, but make them viewer
             logger.warning("first_user_not_eric", email=oauth_user.email)
             role = "viewer"
 
         # Create new admin user
+        now = datetime.now(UTC)
         new_admin = AdminUser(
             id=uuid4(),
             email=oauth_user.email,
@@ -164,11 +216,11 @@ class AdminAuthService:
             picture_url=oauth_user.picture,
             role=role,
             is_active=True,
+            created_at=now,
+            last_login_at=now,
         )
 
         db.add(new_admin)
-        await db.commit()
-        await db.refresh(new_admin)
 
         logger.info(
             "new_admin_user_created",
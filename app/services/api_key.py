@@ -4,22 +4,51 @@ API Key Service - Generation and validation of agent API keys.
 NO DICTIONARIES - All data uses typed models/dataclasses.
 """
 
+import asyncio
 import base64
+import hashlib
+import hmac
 import secrets
+import time
 from datetime import UTC, datetime, timedelta
 from uuid import UUID
 
 from argon2 import PasswordHasher
 from argon2.exceptions import InvalidHashError, VerifyMismatchError
-from sqlalchemy import select
+from sqlalchemy import case, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from structlog import get_logger
 
+from app.config import settings
 from app.db.models import APIKey
+from app.db.session import get_write_session
 from app.exceptions import AuthenticationError
+from app.observability.tracing import traced
 
 logger = get_logger(__name__)
 
+# key_id -> most recent use, written to api_keys by flush_last_used()
+_last_used_buffer: dict[UUID, datetime] = {}
+
+# Recently validated keys (per process)
+# Key: sha256(plaintext key), Value: (monotonic deadline, key data)
+_validated_cache: dict[bytes, tuple[float, "APIKeyData"]] = {}
+_MAX_VALIDATED_CACHE_SIZE = 1024
+
+
+def compute_lookup_hmac(plaintext_key: str) -> bytes | None:
+    """
+    HMAC-SHA256 of an API key used for indexed lookup.
+
+    Returns None when API_KEY_HMAC_SECRET is not configured, in which case
+    validation falls back to prefix lookup + Argon2id.
+    """
+    if not settings.API_KEY_HMAC_SECRET:
+        return None
+    return hmac.new(
+        settings.API_KEY_HMAC_SECRET.encode(), plaintext_key.encode(), hashlib.sha256
+    ).digest()
+
 
 class APIKeyData:
     """Data class for API key information (NO DICTIONARIES)."""
@@ -85,7 +114,8 @@ class APIKeyService:
         Returns:
             tuple: (plaintext_key, key_hash, key_prefix)
         """
-        # Generate cryptographically secure random bytes
+        # Generate cryptographically secure random bytes (straight from the OS CSPRNG;
+        # do not pre-buffer: a buffer copied across forked workers would repeat keys)
         random_bytes = secrets.token_bytes(32)
 
         # Encode as URL-safe base64
@@ -128,8 +158,10 @@ class APIKeyService:
         if permissions is None:
             permissions = ["billing:read", "billing:write"]
 
-        # Generate key
-        plaintext_key, key_hash, key_prefix = self.generate_api_key(environment)
+        # Generate key (Argon2id hashing is CPU-bound, keep it off the event loop)
+        plaintext_key, key_hash, key_prefix = await asyncio.to_thread(
+            self.generate_api_key, environment
+        )
 
         # Calculate expiration
         expires_at = None
@@ -140,6 +172,7 @@ class APIKeyService:
         api_key = APIKey(
             key_hash=key_hash,
             key_prefix=key_prefix,
+            key_lookup_hmac=compute_lookup_hmac(plaintext_key),
             name=name,
             description=description,
             environment=environment,
@@ -172,6 +205,7 @@ class APIKeyService:
             expires_at=expires_at,
         )
 
+    @traced("db.api_key.validate")
     async def validate_api_key(
         self, provided_key: str, update_last_used: bool = True
     ) -> APIKeyData:
@@ -193,24 +227,31 @@ class APIKeyService:
             logger.warning("api_key_invalid_format", prefix=provided_key[:10])
             raise AuthenticationError("Invalid API key format")
 
-        # Extract prefix for lookup
-        key_prefix = provided_key[:20]
-
-        # Look up by prefix
-        stmt = select(APIKey).where(APIKey.key_prefix == key_prefix, APIKey.status == "active")
-        result = await self.db.execute(stmt)
-        api_key = result.scalar_one_or_none()
-
-        if not api_key:
-            logger.warning("api_key_not_found", prefix=key_prefix)
-            raise AuthenticationError("Invalid API key")
+        cache_key = hashlib.sha256(provided_key.encode()).digest()
+        cached = _get_cached_key(cache_key)
+        if cached is not None:
+            if update_last_used:
+                cached.last_used_at = datetime.now(UTC)
+                _last_used_buffer[cached.key_id] = cached.last_used_at
+            return cached
+
+        # Fast path: exact match on the HMAC lookup index, no Argon2 needed
+        lookup_hmac = compute_lookup_hmac(provided_key)
+        api_key = None
+        if lookup_hmac is not None:
+            stmt = select(APIKey).where(
+                APIKey.key_lookup_hmac == lookup_hmac, APIKey.status == "active"
+            )
+            result = await self.db.execute(stmt.limit(1))
+            api_key = result.scalar_one_or_none()
 
-        # Verify hash
-        try:
-            self.password_hasher.verify(api_key.key_hash, provided_key)
-        except (VerifyMismatchError, InvalidHashError):
-            logger.warning("api_key_hash_mismatch", key_id=str(api_key.id))
-            raise AuthenticationError("Invalid API key")
+        backfill_hmac = False
+        if api_key is None:
+            api_key = await self._verify_legacy_key(provided_key, lookup_hmac)
+            if lookup_hmac is not None:
+                # One-time (re)keying: later requests take the fast path
+                api_key.key_lookup_hmac = lookup_hmac
+                backfill_hmac = True
 
         # Check expiration
         if api_key.expires_at and datetime.now(UTC) > api_key.expires_at:
@@ -220,15 +261,17 @@ class APIKeyService:
             logger.warning("api_key_expired", key_id=str(api_key.id), expired_at=api_key.expires_at)
             raise AuthenticationError("API key expired")
 
-        # Update last_used_at (async, non-blocking if desired)
+        # Buffer last_used_at; run_last_used_flusher() writes it in batches
+        last_used_at = api_key.last_used_at
         if update_last_used:
-            api_key.last_used_at = datetime.now(UTC)
-            # Note: Could make this async background task for performance
+            last_used_at = datetime.now(UTC)
+            _last_used_buffer[api_key.id] = last_used_at
+        if backfill_hmac:
             await self.db.commit()
 
         logger.debug("api_key_validated", key_id=str(api_key.id), name=api_key.name)
 
-        return APIKeyData(
+        key_data = APIKeyData(
             key_id=api_key.id,
             name=api_key.name,
             key_prefix=api_key.key_prefix,
@@ -237,8 +280,42 @@ class APIKeyService:
             status=api_key.status,
             created_at=api_key.created_at,
             expires_at=api_key.expires_at,
-            last_used_at=api_key.last_used_at,
+            last_used_at=last_used_at,
         )
+        _cache_key(cache_key, key_data)
+        return key_data
+
+    async def _verify_legacy_key(self, provided_key: str, lookup_hmac: bytes | None) -> APIKey:
+        """
+        Find a key by prefix and verify it with Argon2id.
+
+        Used for keys created before key_lookup_hmac existed, keys whose
+        lookup hash was computed with a previous API_KEY_HMAC_SECRET, and
+        deployments with no HMAC secret configured. With HMAC enabled, rows
+        whose stored hash already matches are skipped: the fast path would
+        have found them, so a miss there means the key is not theirs.
+        """
+        key_prefix = provided_key[:20]
+
+        stmt = select(APIKey).where(APIKey.key_prefix == key_prefix, APIKey.status == "active")
+        if lookup_hmac is not None:
+            # Missing or stale (rotated secret) lookup hash
+            stmt = stmt.where(APIKey.key_lookup_hmac.is_distinct_from(lookup_hmac))
+        result = await self.db.execute(stmt.limit(1))
+        api_key = result.scalar_one_or_none()
+
+        if not api_key:
+            logger.warning("api_key_not_found", prefix=key_prefix)
+            raise AuthenticationError("Invalid API key")
+
+        # Verify hash in a worker thread so the event loop keeps serving requests
+        try:
+            await asyncio.to_thread(self.password_hasher.verify, api_key.key_hash, provided_key)
+        except (VerifyMismatchError, InvalidHashError):
+            logger.warning("api_key_hash_mismatch", key_id=str(api_key.id))
+            raise AuthenticationError("Invalid API key")
+
+        return api_key
 
     async def revoke_api_key(self, key_id: UUID) -> None:
         """Revoke an API key."""
@@ -251,6 +328,7 @@ class APIKeyService:
 
         api_key.status = "revoked"
         await self.db.commit()
+        invalidate_cached_key(key_id)
 
         logger.info("api_key_revoked", key_id=str(key_id), name=api_key.name)
 
@@ -294,6 +372,7 @@ class APIKeyService:
             ).isoformat(),
         }
         await self.db.commit()
+        invalidate_cached_key(key_id)
 
         logger.info(
             "api_key_rotated",
@@ -304,6 +383,7 @@ class APIKeyService:
 
         return new_key
 
+    @traced("db.api_key.list")
     async def list_api_keys(self) -> list[APIKeyData]:
         """List all API keys (excluding revoked)."""
         stmt = select(APIKey).where(APIKey.status.in_(["active", "rotating"]))
@@ -324,3 +404,88 @@ class APIKeyService:
             )
             for key in api_keys
         ]
+
+
+def _get_cached_key(cache_key: bytes) -> APIKeyData | None:
+    """Return cached key data if still fresh and the key has not expired."""
+    entry = _validated_cache.get(cache_key)
+    if entry is None:
+        return None
+
+    deadline, key_data = entry
+    if time.monotonic() >= deadline or (
+        key_data.expires_at and datetime.now(UTC) > key_data.expires_at
+    ):
+        # Expired keys fall through to the database path, which revokes them
+        _validated_cache.pop(cache_key, None)
+        return None
+    return key_data
+
+
+def _cache_key(cache_key: bytes, key_data: APIKeyData) -> None:
+    """Remember a successful validation for api_key_cache_ttl_seconds."""
+    ttl = settings.api_key_cache_ttl_seconds
+    if ttl <= 0:
+        return
+
+    now = time.monotonic()
+    if len(_validated_cache) >= _MAX_VALIDATED_CACHE_SIZE:
+        for k in [k for k, (deadline, _) in _validated_cache.items() if deadline <= now]:
+            del _validated_cache[k]
+        if len(_validated_cache) >= _MAX_VALIDATED_CACHE_SIZE:
+            _validated_cache.clear()
+    _validated_cache[cache_key] = (now + ttl, key_data)
+
+
+def invalidate_cached_key(key_id: UUID) -> None:
+    """
+    Drop cached validations for a key in this process.
+
+    Other workers keep their entry until it ages out, so revocation takes
+    effect everywhere within api_key_cache_ttl_seconds.
+    """
+    for k in [k for k, (_, data) in _validated_cache.items() if data.key_id == key_id]:
+        del _validated_cache[k]
+
+
+async def flush_last_used(db: AsyncSession) -> int:
+    """
+    Write buffered last_used_at timestamps in a single UPDATE.
+
+    Returns:
+        Number of keys updated
+    """
+    if not _last_used_buffer:
+        return 0
+
+    pending = dict(_last_used_buffer)
+    _last_used_buffer.clear()
+
+    stmt = (
+        update(APIKey)
+        .where(APIKey.id.in_(pending))
+        .values(last_used_at=case(pending, value=APIKey.id))
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        await db.execute(stmt)
+        await db.commit()
+    except BaseException:
+        # Put timestamps back unless a newer use was recorded meanwhile (also when
+        # the flusher task is cancelled mid-write at shutdown)
+        for key_id, used_at in pending.items():
+            _last_used_buffer.setdefault(key_id, used_at)
+        raise
+
+    return len(pending)
+
+
+async def run_last_used_flusher(interval_seconds: float) -> None:
+    """Background task: flush buffered last_used_at every interval_seconds."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with get_write_session() as session:
+                await flush_last_used(session)
+        except Exception as e:
+            logger.warning("api_key_last_used_flush_failed", error=str(e))
@@ -5,7 +5,9 @@ Maps App Store product IDs to credit amounts.
 Product IDs must match those configured in App Store Connect.
 """
 
+from collections.abc import Mapping
 from dataclasses import dataclass
+from types import MappingProxyType
 
 
 @dataclass(frozen=True)
@@ -30,7 +32,7 @@ class AppleStoreKitProduct:
 # Product IDs typically follow reverse-domain format: com.company.app.product
 # Pricing: Exactly $0.10 per credit with NO volume discounts
 # Credits = floor(price / $0.10) to ensure users always pay at least $0.10/credit
-APPLE_STOREKIT_PRODUCTS: dict[str, AppleStoreKitProduct] = {
+_PRODUCTS: dict[str, AppleStoreKitProduct] = {
     "ai.ciris.mobile.credits_100_v1": AppleStoreKitProduct(
         product_id="ai.ciris.mobile.credits_100_v1",
         credits=99,  # $9.99 / $0.10 = 99 credits (no discount)
@@ -48,6 +50,9 @@ APPLE_STOREKIT_PRODUCTS: dict[str, AppleStoreKitProduct] = {
     ),
 }
 
+# Read-only view: the catalog cannot be mutated at runtime
+APPLE_STOREKIT_PRODUCTS: Mapping[str, AppleStoreKitProduct] = MappingProxyType(_PRODUCTS)
+
 
 def get_product(product_id: str) -> AppleStoreKitProduct:
     """
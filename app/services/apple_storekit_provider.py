@@ -7,13 +7,22 @@ Uses Apple App Store Server API v2 for transaction verification.
 https://developer.apple.com/documentation/appstoreserverapi
 """
 
+import asyncio
 import base64
+import functools
+import operator
+import random
 import time
-from datetime import UTC, datetime
+from collections.abc import Mapping
+from datetime import UTC, datetime, timedelta
+from types import MappingProxyType
 from typing import Any
 
 import httpx
 import jwt
+import orjson
+from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePrivateKey
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
 from structlog import get_logger
 
 from app.exceptions import PaymentProviderError, WebhookVerificationError
@@ -31,6 +40,118 @@ _apple_root_certs: dict[str, object] = {}
 _apple_certs_fetched_at: float = 0
 _APPLE_CERTS_CACHE_TTL = 3600  # Refresh every hour
 
+# Signed API tokens per configuration: config -> (token, refresh_at on the monotonic clock).
+# Module-level for the same reason as the HTTP client below.
+_api_tokens: dict[AppleStoreKitConfig, tuple[str, float]] = {}
+_API_TOKEN_LIFETIME = 3600  # Apple allows up to 60 minutes
+_API_TOKEN_REFRESH_BUFFER = 300  # Re-sign 5 minutes before expiry
+
+# Shared HTTP client: providers are created per request, the connection pool is not
+_http_client: httpx.AsyncClient | None = None
+_HTTP_TIMEOUT = 30.0
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_HTTP_CONNECT_RETRIES = 3  # Transport-level retries for failed connection attempts
+
+# Transaction fields Apple always includes (a missing one is a KeyError, as before)
+_REQUIRED_TRANSACTION_FIELDS = operator.itemgetter(
+    "transactionId", "originalTransactionId", "productId", "bundleId"
+)
+
+# Stand-in for a notification without a "data" object (shared, never mutated)
+_EMPTY_DATA: Mapping[str, Any] = MappingProxyType({})
+
+# Error messages for non-retryable status codes with a specific meaning
+_STATUS_ERRORS = {
+    401: "Invalid API credentials",
+    404: "Transaction not found",
+}
+
+# Transient statuses retried (for GET requests) with backoff, honoring Retry-After
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRIES = 3
+_RETRY_BASE_DELAY = 0.5
+_RETRY_MAX_DELAY = 8.0
+
+
+def _get_shared_http_client() -> httpx.AsyncClient:
+    """Get (or create) the process-wide App Store Server API client."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=_HTTP_TIMEOUT,
+            transport=httpx.AsyncHTTPTransport(retries=_HTTP_CONNECT_RETRIES, limits=_HTTP_LIMITS),
+        )
+    return _http_client
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After if given, else jittered backoff."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None and retry_after.isdigit():
+        return min(float(retry_after), _RETRY_MAX_DELAY)
+    backoff = min(_RETRY_BASE_DELAY * 2.0**attempt, _RETRY_MAX_DELAY)
+    return backoff * random.uniform(0.5, 1.0)
+
+
+@functools.lru_cache(maxsize=1024)
+def _decode_jws_payload(signed_data: str) -> dict[str, Any]:
+    """
+    Decode a JWS payload, memoized on the signed string.
+
+    The same signed blobs recur across webhook redelivery, retries and
+    history pagination. Callers share the returned dict and must not
+    modify it.
+
+    The signature is not checked, so only the payload segment is parsed
+    rather than running PyJWT's header and algorithm handling.
+
+    Raises:
+        ValueError: If the data is not a compact JWS with a JSON object payload
+    """
+    _, payload_b64, _ = signed_data.split(".", 2)
+    payload = orjson.loads(base64.urlsafe_b64decode(payload_b64 + "=" * (-len(payload_b64) % 4)))
+    if not isinstance(payload, dict):
+        raise ValueError("JWS payload is not a JSON object")
+    return payload
+
+
+@functools.lru_cache(maxsize=8)
+def _load_signing_key(private_key: str) -> EllipticCurvePrivateKey:
+    """
+    Load the App Store Connect ES256 key once per configured key string.
+
+    Accepts the .p8 contents either as PEM text or base64-encoded PEM.
+    """
+    if private_key.lstrip().startswith("-----BEGIN"):
+        pem = private_key.encode("utf-8")
+    else:
+        # Lenient decode: tolerates line-wrapped or pasted base64 with whitespace
+        pem = base64.b64decode(private_key)
+
+    key = load_pem_private_key(pem, password=None)
+    if not isinstance(key, EllipticCurvePrivateKey):
+        raise PaymentProviderError("StoreKit private key must be an EC (ES256) key")
+    return key
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def _ms_to_datetime(ms: int) -> datetime:
+    """Convert an Apple millisecond epoch timestamp to an aware UTC datetime.
+
+    Integer timedelta arithmetic is exact, unlike ``fromtimestamp(ms / 1000)``.
+    """
+    return _EPOCH + timedelta(milliseconds=ms)
+
+
+async def close_http_client() -> None:
+    """Close the shared App Store Server API client (for graceful shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class AppleStoreKitProvider:
     """
@@ -39,16 +160,28 @@ class AppleStoreKitProvider:
     Handles purchase verification, transaction lookup, and webhook processing.
     """
 
-    def __init__(self, config: AppleStoreKitConfig) -> None:
+    def __init__(
+        self,
+        config: AppleStoreKitConfig,
+        http_client: httpx.AsyncClient | None = None,
+    ) -> None:
         """
         Initialize Apple StoreKit provider.
 
         Args:
             config: StoreKit configuration with API credentials
+            http_client: Optional HTTP client (defaults to the shared pooled client)
         """
         self.config = config
-        self._jwt_token: str | None = None
-        self._jwt_expires_at: float = 0
+        self._http_client = http_client
+
+        # Token claims and headers that never change for this configuration
+        self._jwt_static_claims = {
+            "iss": config.issuer_id,
+            "aud": "appstoreconnect-v1",
+            "bid": config.bundle_id,
+        }
+        self._jwt_headers = {"kid": config.key_id}
 
         logger.info(
             "apple_storekit_provider_initialized",
@@ -62,45 +195,38 @@ class AppleStoreKitProvider:
 
         The JWT is valid for up to 60 minutes.
         """
-        now = time.time()
-
-        # Reuse cached token if still valid (with 5 min buffer)
-        if self._jwt_token and now < (self._jwt_expires_at - 300):
-            return self._jwt_token
+        # Reuse cached token until 5 min before expiry. The monotonic clock keeps
+        # wall-clock jumps (NTP adjustments) from invalidating or extending it.
+        cached = _api_tokens.get(self.config)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
 
-        # Decode private key if base64 encoded
-        private_key = self.config.private_key
-        try:
-            # Try to decode as base64
-            decoded = base64.b64decode(private_key)
-            private_key = decoded.decode("utf-8")
-        except Exception:
-            # Already plain text
-            pass
-
-        # Build JWT payload
-        expires_at = now + 3600  # 1 hour
+        now = time.time()
         payload = {
-            "iss": self.config.issuer_id,
+            **self._jwt_static_claims,
             "iat": int(now),
-            "exp": int(expires_at),
-            "aud": "appstoreconnect-v1",
-            "bid": self.config.bundle_id,
+            "exp": int(now + _API_TOKEN_LIFETIME),
         }
 
         # Sign JWT with ES256 (Apple requires this algorithm)
         token = jwt.encode(
             payload,
-            private_key,
+            _load_signing_key(self.config.private_key),
             algorithm="ES256",
-            headers={"kid": self.config.key_id},
+            headers=self._jwt_headers,
         )
 
-        self._jwt_token = token
-        self._jwt_expires_at = expires_at
-
+        refresh_at = time.monotonic() + _API_TOKEN_LIFETIME - _API_TOKEN_REFRESH_BUFFER
+        _api_tokens[self.config] = (token, refresh_at)
         return token
 
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Get HTTP client (keep-alive connections are reused across requests)."""
+        if self._http_client is None:
+            return _get_shared_http_client()
+        return self._http_client
+
     async def _make_request(
         self,
         method: str,
@@ -114,30 +240,48 @@ class AppleStoreKitProvider:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
+        for attempt in range(_MAX_RETRIES + 1):
+            response = await self.http_client.request(
                 method,
                 url,
                 headers=headers,
-                timeout=30.0,
                 **kwargs,  # type: ignore[arg-type]
             )
+            if (
+                response.status_code not in _RETRY_STATUSES
+                or method != "GET"
+                or attempt == _MAX_RETRIES
+            ):
+                break
+
+            delay = _retry_delay(response, attempt)
+            logger.warning(
+                "apple_storekit_api_retry",
+                status=response.status_code,
+                attempt=attempt + 1,
+                delay_seconds=round(delay, 2),
+            )
+            await asyncio.sleep(delay)
 
+        if response.status_code >= 400:
             if response.status_code == 401:
-                raise PaymentProviderError("Invalid API credentials")
-            elif response.status_code == 404:
-                raise PaymentProviderError("Transaction not found")
-            elif response.status_code >= 400:
-                error_body = response.text
-                logger.error(
-                    "apple_storekit_api_error",
-                    status=response.status_code,
-                    error=error_body,
-                )
-                raise PaymentProviderError(f"API error: {response.status_code}")
+                # Force a fresh token next time (e.g. after key rotation)
+                _api_tokens.pop(self.config, None)
+            message = _STATUS_ERRORS.get(response.status_code)
+            if message:
+                raise PaymentProviderError(message)
+            logger.error(
+                "apple_storekit_api_error",
+                status=response.status_code,
+                error=response.text,
+            )
+            raise PaymentProviderError(f"API error: {response.status_code}")
 
-            result: dict[str, Any] = response.json()
-            return result
+        try:
+            result: dict[str, Any] = orjson.loads(response.content)
+        except orjson.JSONDecodeError as exc:
+            raise PaymentProviderError("Invalid API response") from exc
+        return result
 
     def _decode_jws(self, signed_data: str) -> dict[str, Any]:
         """
@@ -150,46 +294,51 @@ class AppleStoreKitProvider:
         try:
             # Decode without verification for data extraction
             # (the HTTPS connection to Apple provides integrity)
-            payload: dict[str, Any] = jwt.decode(
-                signed_data,
-                options={"verify_signature": False},
-            )
-            return payload
-        except jwt.exceptions.DecodeError as e:
+            return _decode_jws_payload(signed_data)
+        except ValueError as e:
             raise PaymentProviderError(f"Invalid JWS data: {e}")
 
     def _parse_transaction_info(self, data: dict[str, Any]) -> AppleTransactionInfo:
         """Parse transaction info from decoded JWS payload."""
-
-        def parse_timestamp(ms: int | None) -> datetime:
-            if ms is None:
-                return datetime.now(UTC)
-            return datetime.fromtimestamp(ms / 1000, tz=UTC)
+        get = data.get
+        transaction_id, original_transaction_id, product_id, bundle_id = (
+            _REQUIRED_TRANSACTION_FIELDS(data)
+        )
 
         return AppleTransactionInfo(
-            transaction_id=data["transactionId"],
-            original_transaction_id=data["originalTransactionId"],
-            product_id=data["productId"],
-            bundle_id=data["bundleId"],
-            purchase_date=parse_timestamp(data.get("purchaseDate")),
-            original_purchase_date=parse_timestamp(data.get("originalPurchaseDate")),
-            quantity=data.get("quantity", 1),
-            type=data.get("type", "Consumable"),
-            environment=data.get("environment", "Production"),
-            storefront=data.get("storefront", ""),
-            storefront_id=data.get("storefrontId", ""),
-            app_account_token=data.get("appAccountToken"),
-            in_app_ownership_type=data.get("inAppOwnershipType"),
-            expires_date=parse_timestamp(data.get("expiresDate"))
-            if data.get("expiresDate")
-            else None,
-            revocation_date=parse_timestamp(data.get("revocationDate"))
-            if data.get("revocationDate")
-            else None,
-            revocation_reason=data.get("revocationReason"),
-            is_upgraded=data.get("isUpgraded", False),
+            transaction_id=transaction_id,
+            original_transaction_id=original_transaction_id,
+            product_id=product_id,
+            bundle_id=bundle_id,
+            purchase_date=(
+                _ms_to_datetime(ms)
+                if (ms := get("purchaseDate")) is not None
+                else datetime.now(UTC)
+            ),
+            original_purchase_date=(
+                _ms_to_datetime(ms)
+                if (ms := get("originalPurchaseDate")) is not None
+                else datetime.now(UTC)
+            ),
+            quantity=get("quantity", 1),
+            type=get("type", "Consumable"),
+            environment=get("environment", "Production"),
+            storefront=get("storefront", ""),
+            storefront_id=get("storefrontId", ""),
+            app_account_token=get("appAccountToken"),
+            in_app_ownership_type=get("inAppOwnershipType"),
+            expires_date=_ms_to_datetime(ms) if (ms := get("expiresDate")) else None,
+            revocation_date=_ms_to_datetime(ms) if (ms := get("revocationDate")) else None,
+            revocation_reason=get("revocationReason"),
+            is_upgraded=get("isUpgraded", False),
         )
 
+    def _parse_signed_transactions(self, signed_list: list[str]) -> list[AppleTransactionInfo]:
+        """Decode and parse a page of signed transactions."""
+        decode = self._decode_jws
+        parse = self._parse_transaction_info
+        return [parse(decode(signed_data)) for signed_data in signed_list]
+
     async def get_transaction_info(
         self,
         transaction_id: str,
@@ -262,26 +411,27 @@ class AppleStoreKitProvider:
         )
 
         transactions: list[AppleTransactionInfo] = []
-        revision: str | None = None
+        endpoint = f"/inApps/v1/history/{original_transaction_id}"
+        next_page: asyncio.Task[dict[str, Any]] | None = None
 
         try:
+            result = await self._make_request("GET", endpoint)
             while True:
-                endpoint = f"/inApps/v1/history/{original_transaction_id}"
-                if revision:
-                    endpoint += f"?revision={revision}"
-
-                result = await self._make_request("GET", endpoint)
+                # Fetch the next page while this one is decoded
+                revision = result.get("revision")
+                if result.get("hasMore", False) and revision:
+                    next_page = asyncio.create_task(
+                        self._make_request("GET", f"{endpoint}?revision={revision}")
+                    )
 
-                # Parse signed transactions
-                signed_transactions = result.get("signedTransactions", [])
-                for signed_data in signed_transactions:
-                    tx_data = self._decode_jws(signed_data)
-                    transactions.append(self._parse_transaction_info(tx_data))
+                transactions.extend(
+                    self._parse_signed_transactions(result.get("signedTransactions", []))
+                )
 
-                # Check for more pages
-                if not result.get("hasMore", False):
+                if next_page is None:
                     break
-                revision = result.get("revision")
+                result = await next_page
+                next_page = None
 
             logger.info(
                 "apple_transaction_history_retrieved",
@@ -296,16 +446,23 @@ class AppleStoreKitProvider:
         except Exception as exc:
             logger.exception("apple_transaction_history_failed")
             raise PaymentProviderError(f"History lookup failed: {exc}") from exc
+        finally:
+            # Don't leave a prefetch running if decoding failed
+            if next_page is not None:
+                next_page.cancel()
 
     async def verify_webhook(
         self,
         payload: bytes,
+        include_renewal_info: bool = True,
     ) -> AppleStoreKitWebhookEvent:
         """
         Verify and parse App Store Server Notification V2.
 
         Args:
             payload: Raw webhook payload (JWS signed)
+            include_renewal_info: Decode the nested renewal info JWS; callers that
+                never read ``renewal_info`` can skip it
 
         Returns:
             Parsed webhook event
@@ -313,31 +470,30 @@ class AppleStoreKitProvider:
         Raises:
             WebhookVerificationError: If verification fails
         """
-        import json
-
         try:
             logger.info("verifying_apple_storekit_webhook")
 
             # Parse the outer JWS
-            body = json.loads(payload)
+            body = orjson.loads(payload)
             signed_payload = body.get("signedPayload")
             if not signed_payload:
                 raise WebhookVerificationError("No signedPayload in webhook")
 
             # Decode the notification (contains nested JWS for transaction/renewal)
             notification = self._decode_jws(signed_payload)
+            data = notification.get("data") or _EMPTY_DATA
 
             # Parse transaction info if present
             transaction_info: AppleTransactionInfo | None = None
-            signed_transaction = notification.get("data", {}).get("signedTransactionInfo")
+            signed_transaction = data.get("signedTransactionInfo")
             if signed_transaction:
                 tx_data = self._decode_jws(signed_transaction)
                 transaction_info = self._parse_transaction_info(tx_data)
 
             # Parse renewal info if present
             renewal_info: AppleRenewalInfo | None = None
-            signed_renewal = notification.get("data", {}).get("signedRenewalInfo")
-            if signed_renewal:
+            signed_renewal = data.get("signedRenewalInfo")
+            if signed_renewal and include_renewal_info:
                 renewal_data = self._decode_jws(signed_renewal)
                 renewal_info = AppleRenewalInfo(
                     original_transaction_id=renewal_data.get("originalTransactionId", ""),
@@ -352,8 +508,7 @@ class AppleStoreKitProvider:
                 )
 
             # Parse signed date
-            signed_date_ms = notification.get("signedDate", 0)
-            signed_date = datetime.fromtimestamp(signed_date_ms / 1000, tz=UTC)
+            signed_date = _ms_to_datetime(notification.get("signedDate", 0))
 
             event = AppleStoreKitWebhookEvent(
                 notification_type=notification.get("notificationType", ""),
@@ -362,7 +517,7 @@ class AppleStoreKitProvider:
                 version=notification.get("version", "2.0"),
                 signed_date=signed_date,
                 transaction_info=transaction_info,
-                environment=notification.get("data", {}).get("environment", "Production"),
+                environment=data.get("environment", "Production"),
                 renewal_info=renewal_info,
             )
 
@@ -375,7 +530,7 @@ class AppleStoreKitProvider:
 
             return event
 
-        except json.JSONDecodeError as exc:
+        except orjson.JSONDecodeError as exc:
             logger.error("apple_storekit_webhook_invalid_json", error=str(exc))
             raise WebhookVerificationError("Invalid JSON payload") from exc
         except WebhookVerificationError:
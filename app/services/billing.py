@@ -4,18 +4,26 @@ Billing Service - Core business logic with write verification.
 NO DICTIONARIES - All operations use strongly typed domain models.
 """
 
+import asyncio
 import logging
-from datetime import UTC, datetime, timedelta
+from dataclasses import asdict, dataclass
+from datetime import UTC, date, datetime, time, timedelta
+from typing import Any
+from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Row, case, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError, MultipleResultsFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.models import Account, Charge, Credit, CreditCheck
+from app.db.session import get_write_session
 from app.exceptions import (
     AccountClosedError,
     AccountNotFoundError,
     AccountSuspendedError,
+    BillingError,
     DataIntegrityError,
     IdempotencyConflictError,
     InsufficientCreditsError,
@@ -36,30 +44,89 @@ from app.models.domain import (
     CreditData,
     CreditIntent,
 )
+from app.services.product_inventory import PRODUCT_CONFIGS, ProductInventoryService
 
 logger = logging.getLogger(__name__)
 
 
+# Account columns re-read by write verification
+_BALANCE_COLUMNS = ("paid_credits", "free_uses_remaining", "daily_free_uses_remaining")
+
+# Account columns read by check_credit (a projection instead of the full entity)
+_CREDIT_CHECK_COLUMNS = (
+    Account.id,
+    Account.status,
+    Account.plan_name,
+    Account.paid_credits,
+    Account.free_uses_remaining,
+    Account.total_uses,
+    Account.daily_free_uses_remaining,
+    Account.daily_free_uses_limit,
+    Account.daily_free_uses_reset_at,
+)
+
+# An Account entity, or a row of _CREDIT_CHECK_COLUMNS
+_CreditCheckAccount = Account | Row[Any]
+
+# (UTC day, following midnight) from the last _get_next_reset_time() computation
+_next_reset_cache: tuple[date, datetime] = (date.min, datetime.min.replace(tzinfo=UTC))
+
+
+@dataclass(frozen=True, slots=True)
+class _PendingCreditCheck:
+    """A credit_checks row waiting for flush_credit_checks() (fields are column names)."""
+
+    account_id: UUID | None
+    oauth_provider: str
+    external_id: str
+    wa_id: str | None
+    tenant_id: str | None
+    has_credit: bool
+    credits_remaining: int | None
+    plan_name: str | None
+    denial_reason: str | None
+    context_agent_id: str | None
+    context_channel_id: str | None
+    context_request_id: str | None
+    created_at: datetime
+
+
+# Credit check audit rows, written to credit_checks by flush_credit_checks()
+_credit_check_buffer: list[_PendingCreditCheck] = []
+_MAX_CREDIT_CHECK_BUFFER = 10_000
+
+
 def _utc_now() -> datetime:
     """Get current UTC timestamp."""
     return datetime.now(UTC)
 
 
-def _get_next_reset_time() -> datetime:
-    """Get the next daily reset time (midnight UTC)."""
-    now = _utc_now()
-    tomorrow = now.date() + timedelta(days=1)
-    return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=UTC)
+def _get_next_reset_time(now: datetime | None = None) -> datetime:
+    """Get the next daily reset time (midnight UTC) after now (default: current time)."""
+    global _next_reset_cache
+
+    if now is None:
+        now = _utc_now()
+    today = now.date()
+    cached_day, cached_reset = _next_reset_cache
+    if today == cached_day:
+        return cached_reset
 
+    next_reset = datetime.combine(today + timedelta(days=1), time.min, tzinfo=UTC)
+    _next_reset_cache = (today, next_reset)  # Single assignment; readers see old or new pair
+    return next_reset
 
-def _should_reset_daily_uses(reset_at: datetime | None) -> bool:
-    """Check if daily free uses should be reset."""
+
+def _should_reset_daily_uses(reset_at: datetime | None, now: datetime | None = None) -> bool:
+    """Check if daily free uses should be reset as of now (default: current time)."""
     if reset_at is None:
         return True
-    return _utc_now() >= reset_at
+    if now is None:
+        now = _utc_now()
+    return now >= reset_at
 
 
-def _build_suspended_response(account: "Account") -> CreditCheckResponse:
+def _build_suspended_response(account: _CreditCheckAccount) -> CreditCheckResponse:
     """Build response for suspended account."""
     return CreditCheckResponse(
         has_credit=False,
@@ -73,7 +140,7 @@ def _build_suspended_response(account: "Account") -> CreditCheckResponse:
     )
 
 
-def _build_closed_response(account: "Account") -> CreditCheckResponse:
+def _build_closed_response(account: _CreditCheckAccount) -> CreditCheckResponse:
     """Build response for closed account."""
     return CreditCheckResponse(
         has_credit=False,
@@ -113,8 +180,7 @@ class BillingService:
     All write operations follow the pattern:
     1. Execute write
     2. Flush to database
-    3. Read back and verify
-    4. Validate invariants
+    3. Read back and validate invariants (when settings.verify_writes is on)
     """
 
     def __init__(self, session: AsyncSession) -> None:
@@ -135,73 +201,43 @@ class BillingService:
         Check if account has sufficient credits (free or paid).
 
         Auto-creates new accounts with free credits on first check.
-        Logs the check for audit purposes.
+        Buffers an audit row for the check (written by run_credit_check_flusher()).
         """
-        from app.config import settings
-        from app.services.product_inventory import PRODUCT_CONFIGS, ProductInventoryService
+        # One timestamp for the whole request
+        now = _utc_now()
 
-        # Find account
-        account = await self._find_account_by_identity(identity)
+        # Find account (read-only projection; writes below go through UPDATE)
+        account: _CreditCheckAccount | None = await self._find_account_row_for_check(identity)
+        needs_commit = False
 
         # Account doesn't exist - create with free credits
         if account is None:
-            # Create new account with free uses
-            new_account = Account(
-                oauth_provider=identity.oauth_provider,
-                external_id=identity.external_id,
-                wa_id=identity.wa_id,
-                tenant_id=identity.tenant_id,
+            # Create new account with free uses (None if a concurrent request won)
+            new_account = await self._insert_account_if_absent(
+                identity,
                 customer_email=customer_email,
                 balance_minor=0,
                 currency="USD",
                 plan_name="free",
                 free_uses_remaining=settings.free_uses_per_account,
                 total_uses=0,
+                daily_free_uses_reset_at=_get_next_reset_time(now),
                 marketing_opt_in=marketing_opt_in,
-                marketing_opt_in_at=_utc_now() if marketing_opt_in else None,
+                marketing_opt_in_at=now if marketing_opt_in else None,
                 marketing_opt_in_source=marketing_opt_in_source,
                 user_role=user_role,
                 agent_id=agent_id,
             )
-            # Set status explicitly after creation to avoid enum conversion issues
-            new_account.status = "active"
-
-            self.session.add(new_account)
 
-            try:
-                await self.session.flush()
-                await self.session.commit()
-            except IntegrityError as e:
-                # Race condition - account created by another request
-                # This is expected when multiple requests try to create the same account
-                await self.session.rollback()
-                # Expire all to clear any cached state after rollback
-                self.session.expire_all()
-                # Re-query for the account that was created by the competing request
-                account = await self._find_account_by_identity(identity)
-                if account is None:
-                    # Very rare: competing insert also failed or rolled back
-                    logger.error(
-                        "account_creation_race_condition_unrecoverable error=%s identity=%s",
-                        str(e),
-                        str(identity),
-                    )
-                    raise WriteVerificationError("Account creation failed due to race condition")
-                logger.info(
-                    "account_creation_race_condition_resolved account_id=%s identity=%s",
-                    str(account.id),
-                    str(identity),
-                )
+            if new_account is None:
+                account = await self._find_account_after_conflict(identity)
             else:
-                # Successfully created
                 account = new_account
+                needs_commit = True
 
                 # Initialize product inventories (web_search, etc.) with free credits
                 # This ensures tools get free credits the same way LLM usage does
-                product_service = ProductInventoryService(self.session)
-                for product_type in PRODUCT_CONFIGS:
-                    await product_service.get_or_create_inventory(account.id, product_type)
-                await self.session.commit()
+                ProductInventoryService(self.session).add_initial_inventories(account.id)
 
                 logger.info(
                     "account_product_inventories_initialized account_id=%s products=%s",
@@ -209,8 +245,8 @@ class BillingService:
                     list(PRODUCT_CONFIGS.keys()),
                 )
 
-        # Log credit check for auditing
-        await self._log_credit_check(identity, context, account)
+        # Log credit check for auditing (outside this transaction)
+        self._log_credit_check(identity, context, account, now)
 
         # Check account status - early exit for suspended/closed
         if account.status == AccountStatus.SUSPENDED:
@@ -221,12 +257,27 @@ class BillingService:
 
         # Reset daily uses if needed
         daily_free_uses = account.daily_free_uses_remaining
-        if _should_reset_daily_uses(account.daily_free_uses_reset_at):
+        if _should_reset_daily_uses(account.daily_free_uses_reset_at, now):
             daily_free_uses = account.daily_free_uses_limit
-            # Update the account with reset values (will be saved lazily)
-            account.daily_free_uses_remaining = daily_free_uses
-            account.daily_free_uses_reset_at = _get_next_reset_time()
-            await self.session.flush()
+            # Guarded on the reset time we read, so a concurrent charge's reset
+            # (and the use it consumed) is not overwritten
+            await self.session.execute(
+                update(Account)
+                .where(
+                    Account.id == account.id,
+                    Account.daily_free_uses_reset_at.is_not_distinct_from(
+                        account.daily_free_uses_reset_at
+                    ),
+                )
+                .values(
+                    daily_free_uses_remaining=daily_free_uses,
+                    daily_free_uses_reset_at=_get_next_reset_time(now),
+                )
+            )
+            needs_commit = True
+
+        # Account creation, inventories and reset commit together
+        if needs_commit:
             await self.session.commit()
 
         # Check if account has credit (daily free, one-time free, or paid)
@@ -269,20 +320,30 @@ class BillingService:
             InsufficientCreditsError: Insufficient balance
             IdempotencyConflictError: Duplicate idempotency key
         """
-        # Check for duplicate idempotency key first
+        # Lock account row for update (checking the idempotency key in the same query)
         if intent.idempotency_key:
-            existing_charge = await self._find_charge_by_idempotency(intent.idempotency_key)
-            if existing_charge:
-                raise IdempotencyConflictError(existing_charge.id)
+            raw_account, existing_charge_id = await self._lock_account_checking_idempotency(
+                intent.account_identity, Charge, intent.idempotency_key
+            )
+            if existing_charge_id is not None:
+                await self.session.rollback()  # Release the row lock
+                raise IdempotencyConflictError(existing_charge_id)
+        else:
+            raw_account = await self._lock_account_for_update(intent.account_identity)
 
-        # Lock account row for update and validate
-        raw_account = await self._lock_account_for_update(intent.account_identity)
-        account = _validate_charge_account(raw_account, intent)
+        # Validate the locked account
+        try:
+            account = _validate_charge_account(raw_account, intent)
+        except BillingError:
+            # Release the row lock now rather than when the request's session closes
+            await self.session.rollback()
+            raise
 
         # Reset daily uses if needed (before checking availability)
-        if _should_reset_daily_uses(account.daily_free_uses_reset_at):
+        now = _utc_now()
+        if _should_reset_daily_uses(account.daily_free_uses_reset_at, now):
             account.daily_free_uses_remaining = account.daily_free_uses_limit
-            account.daily_free_uses_reset_at = _get_next_reset_time()
+            account.daily_free_uses_reset_at = _get_next_reset_time(now)
 
         # Determine what type of credit to use (priority: daily free > one-time free > paid)
         using_daily_free = account.daily_free_uses_remaining > 0
@@ -305,9 +366,18 @@ class BillingService:
         else:
             # Use paid credits - deduct from paid_credits
             if account.paid_credits < intent.amount_minor:
-                raise InsufficientCreditsError(account.paid_credits, intent.amount_minor)
+                paid_credits = account.paid_credits
+                await self.session.rollback()  # Release the row lock
+                raise InsufficientCreditsError(paid_credits, intent.amount_minor)
             credits_after = credits_before - intent.amount_minor
 
+        # Update account balances and total uses (flushed together with the charge)
+        account.paid_credits = credits_after
+        account.balance_minor = credits_after  # Keep balance_minor in sync
+        account.free_uses_remaining = free_uses_after
+        account.daily_free_uses_remaining = daily_free_after
+        account.total_uses = account.total_uses + 1
+
         # Create charge record
         charge = Charge(
             account_id=account.id,
@@ -337,58 +407,17 @@ class BillingService:
             # Re-raise if it's a different constraint or no idempotency key
             raise
 
-        # Verify charge was written
-        verified_charge = await self.session.get(Charge, charge.id)
-        if verified_charge is None:
-            raise WriteVerificationError(f"Charge {charge.id} not found after insert")
-
-        # Update account balances and total uses
-        account.paid_credits = credits_after
-        account.balance_minor = credits_after  # Keep balance_minor in sync
-        account.free_uses_remaining = free_uses_after
-        account.daily_free_uses_remaining = daily_free_after
-        account.total_uses = account.total_uses + 1
-        await self.session.flush()
-
-        # Verify account was updated
-        verified_account = await self.session.get(Account, account.id)
-        if verified_account is None:
-            raise WriteVerificationError(f"Account {account.id} disappeared after update")
-
-        if verified_account.paid_credits != credits_after:
-            raise DataIntegrityError(
-                f"Paid credits mismatch: expected {credits_after}, got {verified_account.paid_credits}"
-            )
-
-        if verified_account.free_uses_remaining != free_uses_after:
-            raise DataIntegrityError(
-                f"Free uses mismatch: expected {free_uses_after}, got {verified_account.free_uses_remaining}"
-            )
-
-        if verified_account.daily_free_uses_remaining != daily_free_after:
-            raise DataIntegrityError(
-                f"Daily free uses mismatch: expected {daily_free_after}, got {verified_account.daily_free_uses_remaining}"
-            )
+        await self._verify_account_write(
+            account,
+            paid_credits=credits_after,
+            free_uses_remaining=free_uses_after,
+            daily_free_uses_remaining=daily_free_after,
+        )
 
         # Commit transaction
         await self.session.commit()
 
-        return ChargeData(
-            charge_id=verified_charge.id,
-            account_id=verified_charge.account_id,
-            amount_minor=verified_charge.amount_minor,
-            currency=verified_charge.currency,
-            balance_before=verified_charge.balance_before,
-            balance_after=verified_charge.balance_after,
-            description=verified_charge.description,
-            metadata=ChargeMetadata(
-                message_id=verified_charge.metadata_message_id,
-                agent_id=verified_charge.metadata_agent_id,
-                channel_id=verified_charge.metadata_channel_id,
-                request_id=verified_charge.metadata_request_id,
-            ),
-            created_at=verified_charge.created_at,
-        )
+        return self._charge_to_domain(charge)
 
     async def add_credits(self, intent: CreditIntent) -> CreditData:
         """
@@ -403,28 +432,36 @@ class BillingService:
             AccountNotFoundError: Account doesn't exist
             IdempotencyConflictError: Duplicate idempotency key
         """
-        # Check for duplicate idempotency key first
+        # Lock account row for update (checking the idempotency key in the same query)
         if intent.idempotency_key:
-            existing_credit = await self._find_credit_by_idempotency(intent.idempotency_key)
-            if existing_credit:
-                raise IdempotencyConflictError(existing_credit.id)
-
-        # Lock account row for update
-        account = await self._lock_account_for_update(intent.account_identity)
+            account, existing_credit_id = await self._lock_account_checking_idempotency(
+                intent.account_identity, Credit, intent.idempotency_key
+            )
+            if existing_credit_id is not None:
+                await self.session.rollback()  # Release the row lock
+                raise IdempotencyConflictError(existing_credit_id)
+        else:
+            account = await self._lock_account_for_update(intent.account_identity)
 
         if account is None:
             raise AccountNotFoundError(intent.account_identity)
 
         # Verify currency matches
         if account.currency != intent.currency:
+            account_currency = account.currency
+            await self.session.rollback()  # Release the row lock
             raise DataIntegrityError(
-                f"Currency mismatch: account={account.currency}, credit={intent.currency}"
+                f"Currency mismatch: account={account_currency}, credit={intent.currency}"
             )
 
         # Calculate new paid credits balance
         credits_before = account.paid_credits
         credits_after = credits_before + intent.amount_minor
 
+        # Update account paid credits (flushed together with the credit)
+        account.paid_credits = credits_after
+        account.balance_minor = credits_after  # Keep balance_minor in sync
+
         # Create credit record
         credit = Credit(
             account_id=account.id,
@@ -453,41 +490,12 @@ class BillingService:
             # Re-raise if it's a different constraint or no idempotency key
             raise
 
-        # Verify credit was written
-        verified_credit = await self.session.get(Credit, credit.id)
-        if verified_credit is None:
-            raise WriteVerificationError(f"Credit {credit.id} not found after insert")
-
-        # Update account paid credits
-        account.paid_credits = credits_after
-        account.balance_minor = credits_after  # Keep balance_minor in sync
-        await self.session.flush()
-
-        # Verify paid credits was updated
-        verified_account = await self.session.get(Account, account.id)
-        if verified_account is None:
-            raise WriteVerificationError(f"Account {account.id} disappeared after update")
-
-        if verified_account.paid_credits != credits_after:
-            raise DataIntegrityError(
-                f"Paid credits mismatch: expected {credits_after}, got {verified_account.paid_credits}"
-            )
+        await self._verify_account_write(account, paid_credits=credits_after)
 
         # Commit transaction
         await self.session.commit()
 
-        return CreditData(
-            credit_id=verified_credit.id,
-            account_id=verified_credit.account_id,
-            amount_minor=verified_credit.amount_minor,
-            currency=verified_credit.currency,
-            balance_before=verified_credit.balance_before,
-            balance_after=verified_credit.balance_after,
-            transaction_type=verified_credit.transaction_type,
-            description=verified_credit.description,
-            external_transaction_id=verified_credit.external_transaction_id,
-            created_at=verified_credit.created_at,
-        )
+        return self._credit_to_domain(credit)
 
     async def get_or_create_account(
         self,
@@ -507,80 +515,46 @@ class BillingService:
 
         Returns existing account if found, otherwise creates new one.
         """
+        now = _utc_now()
+
         # Try to find existing account
         account = await self._find_account_by_identity(identity)
 
         if account is not None:
             # Account exists - return it
-            return self._account_to_domain(account)
+            return self._account_to_domain(account, now)
 
-        # Create new account
-        new_account = Account(
-            oauth_provider=identity.oauth_provider,
-            external_id=identity.external_id,
-            wa_id=identity.wa_id,
-            tenant_id=identity.tenant_id,
+        # Create new account (None if a concurrent request won)
+        new_account = await self._insert_account_if_absent(
+            identity,
             customer_email=customer_email,
             display_name=display_name,
             balance_minor=initial_balance_minor,
             currency=currency,
             plan_name=plan_name,
-            status=AccountStatus.ACTIVE,
             marketing_opt_in=marketing_opt_in,
-            marketing_opt_in_at=_utc_now() if marketing_opt_in else None,
+            marketing_opt_in_at=now if marketing_opt_in else None,
             marketing_opt_in_source=marketing_opt_in_source,
             user_role=user_role,
             agent_id=agent_id,
         )
 
-        self.session.add(new_account)
-
-        try:
-            await self.session.flush()
-        except IntegrityError as e:
-            # Race condition - account created by another request
-            # This is expected when multiple requests try to create the same account
-            await self.session.rollback()
-            # Expire all to clear any cached state after rollback
-            self.session.expire_all()
-            # Re-query for the account that was created by the competing request
-            account = await self._find_account_by_identity(identity)
-            if account is None:
-                # Very rare: competing insert also failed or rolled back
-                logger.error(
-                    "account_creation_race_condition_unrecoverable error=%s identity=%s",
-                    str(e),
-                    str(identity),
-                )
-                raise WriteVerificationError("Account creation failed due to race condition")
-            logger.info(
-                "account_creation_race_condition_resolved account_id=%s identity=%s",
-                str(account.id),
-                str(identity),
-            )
-            return self._account_to_domain(account)
-
-        # Verify account was written
-        verified_account = await self.session.get(Account, new_account.id)
-        if verified_account is None:
-            raise WriteVerificationError(f"Account {new_account.id} not found after insert")
+        if new_account is None:
+            account = await self._find_account_after_conflict(identity)
+            return self._account_to_domain(account, now)
 
         # Initialize product inventories (web_search, etc.) with free credits
-        from app.services.product_inventory import PRODUCT_CONFIGS, ProductInventoryService
-
-        product_service = ProductInventoryService(self.session)
-        for product_type in PRODUCT_CONFIGS:
-            await product_service.get_or_create_inventory(verified_account.id, product_type)
+        ProductInventoryService(self.session).add_initial_inventories(new_account.id)
 
         await self.session.commit()
 
         logger.info(
             "account_created_with_product_inventories account_id=%s products=%s",
-            str(verified_account.id),
+            str(new_account.id),
             list(PRODUCT_CONFIGS.keys()),
         )
 
-        return self._account_to_domain(verified_account)
+        return self._account_to_domain(new_account, now)
 
     async def get_account(self, identity: AccountIdentity) -> AccountData:
         """
@@ -607,65 +581,79 @@ class BillingService:
         """
         Update account metadata fields if provided.
 
-        Only updates fields that are not None.
+        Only updates fields that are not None. Runs as a single UPDATE on the
+        oldest account for the identity, which matches no rows (and commits
+        nothing) when every provided field is already current or the account
+        does not exist.
         """
-        from structlog import get_logger
-
-        logger = get_logger(__name__)
-        logger.debug(
-            "update_account_metadata_called",
-            oauth_provider=identity.oauth_provider,
-            external_id=identity.external_id,
-            customer_email=customer_email,
-            display_name=display_name,
-            marketing_opt_in=marketing_opt_in,
-            user_role=user_role,
-            agent_id=agent_id,
-        )
-
-        account = await self._find_account_by_identity(identity)
-        if account is None:
-            logger.warning("update_account_metadata_no_account", identity=str(identity))
-            return  # Account doesn't exist, nothing to update
-
-        updated = False
-
-        # Update each field if provided and changed
-        if customer_email is not None and account.customer_email != customer_email:
-            account.customer_email = customer_email
-            updated = True
-
-        if display_name is not None and account.display_name != display_name:
-            account.display_name = display_name
-            updated = True
-
-        if marketing_opt_in is not None and account.marketing_opt_in != marketing_opt_in:
-            account.marketing_opt_in = marketing_opt_in
-            account.marketing_opt_in_at = _utc_now() if marketing_opt_in else None
-            account.marketing_opt_in_source = marketing_opt_in_source  # May be None
-            updated = True
+        # Provided fields, applied in one UPDATE that only matches if one of them differs
+        values: dict[str, Any] = {}
+        changed: list[ColumnElement[bool]] = []
+        for column, value in (
+            (Account.customer_email, customer_email),
+            (Account.display_name, display_name),
+            (Account.user_role, user_role),
+            (Account.agent_id, agent_id),
+        ):
+            if value is not None:
+                values[column.key] = value
+                changed.append(column.is_distinct_from(value))
+
+        if marketing_opt_in is not None:
+            # Opt-in timestamp and source only move when the opt-in itself changes
+            opt_in_changed = Account.marketing_opt_in.is_distinct_from(marketing_opt_in)
+            opt_in_at = _utc_now() if marketing_opt_in else None
+            values["marketing_opt_in"] = marketing_opt_in
+            values["marketing_opt_in_at"] = case(
+                (opt_in_changed, literal(opt_in_at, Account.marketing_opt_in_at.type)),
+                else_=Account.marketing_opt_in_at,
+            )
+            values["marketing_opt_in_source"] = case(
+                (
+                    opt_in_changed,
+                    literal(marketing_opt_in_source, Account.marketing_opt_in_source.type),
+                ),
+                else_=Account.marketing_opt_in_source,
+            )
+            changed.append(opt_in_changed)
 
-        if user_role is not None and account.user_role != user_role:
-            account.user_role = user_role
-            updated = True
+        if not values:
+            return  # Nothing provided, nothing to update
 
-        if agent_id is not None and account.agent_id != agent_id:
-            account.agent_id = agent_id
-            updated = True
+        # Duplicate accounts resolve to the oldest, as in _find_account_by_identity
+        oldest_id = (
+            select(Account.id)
+            .where(
+                Account.oauth_provider == identity.oauth_provider,
+                Account.external_id == identity.external_id,
+            )
+            .order_by(Account.created_at.asc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Account)
+            .where(Account.id == oldest_id, or_(*changed))
+            .values(**values)
+            .returning(Account.id)
+            .execution_options(synchronize_session="fetch")
+        )
+        result = await self.session.execute(stmt)
 
-        if updated:
-            await self.session.flush()
+        if result.first() is not None:
             await self.session.commit()
             logger.info(
-                "update_account_metadata_committed",
-                oauth_provider=identity.oauth_provider,
-                external_id=identity.external_id,
+                "update_account_metadata_committed oauth_provider=%s external_id=%s fields=%s",
+                identity.oauth_provider,
+                identity.external_id,
+                list(values),
             )
         else:
+            # No account, or every provided field already matches
             logger.debug(
-                "update_account_metadata_no_changes",
-                oauth_provider=identity.oauth_provider,
-                external_id=identity.external_id,
+                "update_account_metadata_no_changes oauth_provider=%s external_id=%s",
+                identity.oauth_provider,
+                identity.external_id,
             )
 
     async def add_purchased_uses(
@@ -766,9 +754,72 @@ class BillingService:
             result_ordered = await self.session.execute(stmt_ordered)
             return result_ordered.scalar_one_or_none()
 
+    async def _find_account_row_for_check(self, identity: AccountIdentity) -> Row[Any] | None:
+        """
+        Load the columns check_credit needs (_CREDIT_CHECK_COLUMNS) without the entity.
+
+        Duplicate accounts resolve to the oldest, as in _find_account_by_identity.
+        """
+        stmt = (
+            select(*_CREDIT_CHECK_COLUMNS)
+            .where(
+                Account.oauth_provider == identity.oauth_provider,
+                Account.external_id == identity.external_id,
+            )
+            .order_by(Account.created_at.asc())
+            .limit(1)
+        )
+        result = await self.session.execute(stmt)
+        return result.first()
+
+    async def _insert_account_if_absent(
+        self, identity: AccountIdentity, **values: object
+    ) -> Account | None:
+        """
+        Insert an active account unless one exists for oauth_provider + external_id.
+
+        Uses INSERT ... ON CONFLICT DO NOTHING RETURNING, so losing a creation
+        race returns None instead of raising IntegrityError and rolling back
+        everything else pending in the session.
+        """
+        stmt = (
+            pg_insert(Account)
+            .values(
+                oauth_provider=identity.oauth_provider,
+                external_id=identity.external_id,
+                wa_id=identity.wa_id,
+                tenant_id=identity.tenant_id,
+                status=AccountStatus.ACTIVE.value,
+                **values,
+            )
+            .on_conflict_do_nothing(index_elements=["oauth_provider", "external_id"])
+            .returning(Account)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def _find_account_after_conflict(self, identity: AccountIdentity) -> Account:
+        """Load the account a concurrent request created while we tried to insert it."""
+        account = await self._find_account_by_identity(identity)
+        if account is None:
+            # Very rare: the conflicting row was removed before it could be read
+            logger.error("account_creation_race_condition_unrecoverable identity=%s", str(identity))
+            raise WriteVerificationError("Account creation failed due to race condition")
+        logger.info(
+            "account_creation_race_condition_resolved account_id=%s identity=%s",
+            str(account.id),
+            str(identity),
+        )
+        return account
+
     async def _lock_account_for_update(self, identity: AccountIdentity) -> Account | None:
         """
-        Lock account row for update (SELECT FOR UPDATE).
+        Lock account row for update (SELECT ... FOR NO KEY UPDATE).
+
+        NO KEY UPDATE is the lock Postgres itself takes for an UPDATE that leaves
+        the key alone: it still serializes balance writers, but unlike FOR UPDATE
+        it does not block other transactions inserting rows that reference the
+        account (foreign key checks take KEY SHARE).
 
         Primary match: oauth_provider + external_id (these uniquely identify a user)
         Optional fields: wa_id and tenant_id are ignored for lookup
@@ -781,7 +832,7 @@ class BillingService:
                 Account.oauth_provider == identity.oauth_provider,
                 Account.external_id == identity.external_id,
             )
-            .with_for_update()
+            .with_for_update(of=Account, key_share=True)
         )
         result = await self.session.execute(stmt)
         try:
@@ -803,24 +854,105 @@ class BillingService:
                 )
                 .order_by(Account.created_at.asc())
                 .limit(1)
-                .with_for_update()
+                .with_for_update(of=Account, key_share=True)
             )
             result_ordered = await self.session.execute(stmt_ordered)
             return result_ordered.scalar_one_or_none()
 
+    async def _lock_account_checking_idempotency(
+        self,
+        identity: AccountIdentity,
+        ledger: type[Charge] | type[Credit],
+        idempotency_key: str,
+    ) -> tuple[Account | None, UUID | None]:
+        """
+        Lock the account row and look up an existing ledger entry in one round trip.
+
+        A single AsyncSession cannot run the two lookups concurrently, so the
+        idempotency check rides along as a scalar subquery; only the account row
+        is locked. Duplicate accounts resolve to the oldest, as in
+        _lock_account_for_update.
+
+        Returns:
+            The locked account (or None) and the ID of an existing entry with the key
+        """
+        existing_id = (
+            select(ledger.id)
+            .where(ledger.idempotency_key == idempotency_key)
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(Account, existing_id)
+            .where(
+                Account.oauth_provider == identity.oauth_provider,
+                Account.external_id == identity.external_id,
+            )
+            .order_by(Account.created_at.asc())
+            .limit(1)
+            .with_for_update(of=Account, key_share=True)
+        )
+        row = (await self.session.execute(stmt)).one_or_none()
+        if row is None:
+            return None, None
+        return row[0], row[1]
+
     async def _find_charge_by_idempotency(self, idempotency_key: str) -> Charge | None:
         """Find charge by idempotency key."""
-        stmt = select(Charge).where(Charge.idempotency_key == idempotency_key)
+        stmt = select(Charge).where(Charge.idempotency_key == idempotency_key).limit(1)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
     async def _find_credit_by_idempotency(self, idempotency_key: str) -> Credit | None:
         """Find credit by idempotency key."""
-        stmt = select(Credit).where(Credit.idempotency_key == idempotency_key)
+        stmt = select(Credit).where(Credit.idempotency_key == idempotency_key).limit(1)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    def _get_denial_reason(self, account: Account | None) -> str | None:
+    async def _verify_account_write(
+        self,
+        account: Account,
+        paid_credits: int,
+        free_uses_remaining: int | None = None,
+        daily_free_uses_remaining: int | None = None,
+    ) -> None:
+        """
+        Re-read a flushed account row and check it holds the expected balances.
+
+        Skipped unless settings.verify_writes is enabled; the flushed ORM object
+        already carries the values that were written.
+
+        Raises:
+            DataIntegrityError: Stored balances differ from the expected values
+        """
+        if not settings.verify_writes:
+            return
+
+        # Only the balance columns; the UPDATE's matched-row count is already
+        # checked by the flush (StaleDataError)
+        await self.session.refresh(account, attribute_names=_BALANCE_COLUMNS)
+
+        if account.paid_credits != paid_credits:
+            raise DataIntegrityError(
+                f"Paid credits mismatch: expected {paid_credits}, got {account.paid_credits}"
+            )
+
+        if free_uses_remaining is not None and account.free_uses_remaining != free_uses_remaining:
+            raise DataIntegrityError(
+                f"Free uses mismatch: expected {free_uses_remaining}, "
+                f"got {account.free_uses_remaining}"
+            )
+
+        if (
+            daily_free_uses_remaining is not None
+            and account.daily_free_uses_remaining != daily_free_uses_remaining
+        ):
+            raise DataIntegrityError(
+                f"Daily free uses mismatch: expected {daily_free_uses_remaining}, "
+                f"got {account.daily_free_uses_remaining}"
+            )
+
+    def _get_denial_reason(self, account: _CreditCheckAccount | None) -> str | None:
         """Get denial reason for credit check logging."""
         if account is None:
             return "Account not found"
@@ -828,14 +960,23 @@ class BillingService:
             return None
         return "Insufficient credits"
 
-    async def _log_credit_check(
+    def _log_credit_check(
         self,
         identity: AccountIdentity,
         context: CreditCheckContext | None,
-        account: Account | None,
+        account: _CreditCheckAccount | None,
+        checked_at: datetime,
     ) -> None:
-        """Log credit check for auditing."""
-        check = CreditCheck(
+        """Buffer credit check audit row; run_credit_check_flusher() writes it in batches."""
+        if len(_credit_check_buffer) >= _MAX_CREDIT_CHECK_BUFFER:
+            logger.warning(
+                "credit_check_buffer_full dropping audit row oauth_provider=%s external_id=%s",
+                identity.oauth_provider,
+                identity.external_id,
+            )
+            return
+
+        check = _PendingCreditCheck(
             account_id=account.id if account else None,
             oauth_provider=identity.oauth_provider,
             external_id=identity.external_id,
@@ -848,18 +989,25 @@ class BillingService:
             context_agent_id=context.agent_id if context else None,
             context_channel_id=context.channel_id if context else None,
             context_request_id=context.request_id if context else None,
+            created_at=checked_at,
         )
-        self.session.add(check)
-        # Don't wait for flush - this is fire-and-forget logging
+        _credit_check_buffer.append(check)
+
+    def _account_to_domain(self, account: Account, now: datetime | None = None) -> AccountData:
+        """
+        Convert ORM account to domain model.
+
+        Pass now to evaluate the daily reset against the caller's request timestamp.
+        """
+        if now is None:
+            now = _utc_now()
 
-    def _account_to_domain(self, account: Account) -> AccountData:
-        """Convert ORM account to domain model."""
         # Check if daily free uses need reset
         daily_free_uses = account.daily_free_uses_remaining
         daily_reset_at = account.daily_free_uses_reset_at
-        if _should_reset_daily_uses(daily_reset_at):
+        if _should_reset_daily_uses(daily_reset_at, now):
             daily_free_uses = account.daily_free_uses_limit
-            daily_reset_at = _get_next_reset_time()
+            daily_reset_at = _get_next_reset_time(now)
 
         return AccountData(
             account_id=account.id,
@@ -917,3 +1065,43 @@ class BillingService:
             external_transaction_id=credit.external_transaction_id,
             created_at=credit.created_at,
         )
+
+
+async def flush_credit_checks(db: AsyncSession) -> int:
+    """
+    Write buffered credit check audit rows in one batched INSERT.
+
+    Uses a Core executemany rather than ORM objects: the rows are never read
+    back, so there is no identity map or unit-of-work bookkeeping per row.
+
+    Returns:
+        Number of rows written
+    """
+    if not _credit_check_buffer:
+        return 0
+
+    pending = _credit_check_buffer.copy()
+    _credit_check_buffer.clear()
+
+    try:
+        await db.execute(insert(CreditCheck), [asdict(check) for check in pending])
+        await db.commit()
+    except BaseException:
+        # Requeue ahead of newer rows, within the buffer cap (also when the
+        # flusher task is cancelled mid-write at shutdown)
+        room = max(_MAX_CREDIT_CHECK_BUFFER - len(_credit_check_buffer), 0)
+        _credit_check_buffer[:0] = pending[:room]
+        raise
+
+    return len(pending)
+
+
+async def run_credit_check_flusher(interval_seconds: float) -> None:
+    """Background task: flush buffered credit checks every interval_seconds."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with get_write_session() as session:
+                await flush_credit_checks(session)
+        except Exception as e:
+            logger.warning("credit_check_flush_failed error=%s", str(e))
@@ -0,0 +1,66 @@
+"""
+Google's JWT signing keys, cached per process.
+
+Used to verify Google-issued JWTs locally: admin login ID tokens and
+Pub/Sub push authentication tokens.
+"""
+
+import asyncio
+import time
+
+import httpx
+import jwt
+
+JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ["https://accounts.google.com", "accounts.google.com"]
+
+# (monotonic fetch time, key set); refetched after the TTL, or earlier when a
+# token names an unknown kid, but never more often than the minimum interval.
+# Unknown kids come from unauthenticated callers, so they must not be able to
+# drive fetches to Google.
+_jwks: tuple[float, jwt.PyJWKSet] | None = None
+_jwks_lock = asyncio.Lock()
+_JWKS_TTL = 300.0
+_MIN_REFETCH_INTERVAL = 60.0
+
+
+def _find_key(key_set: jwt.PyJWKSet, kid: str) -> jwt.PyJWK | None:
+    """Look up a key by kid, or None if the set does not have it."""
+    try:
+        return key_set[kid]
+    except KeyError:
+        return None
+
+
+async def get_signing_key(kid: str, http_client: httpx.AsyncClient) -> jwt.PyJWK:
+    """
+    Get a Google signing key by kid, refetching the JWKS when stale or rotated.
+
+    Concurrent misses share one fetch.
+
+    Raises:
+        KeyError: If Google does not publish the key
+        httpx.HTTPError: If the JWKS cannot be fetched
+    """
+    global _jwks
+    if _jwks is not None and time.monotonic() - _jwks[0] < _JWKS_TTL:
+        key = _find_key(_jwks[1], kid)
+        if key is not None:
+            return key
+
+    async with _jwks_lock:
+        # Another request may have refetched while this one waited
+        if _jwks is not None:
+            age = time.monotonic() - _jwks[0]
+            if age < _JWKS_TTL:
+                key = _find_key(_jwks[1], kid)
+                if key is not None:
+                    return key
+                if age < _MIN_REFETCH_INTERVAL:
+                    raise KeyError(f"keyset has no key for kid: {kid}")
+
+        response = await http_client.get(JWKS_URL)
+        response.raise_for_status()
+        key_set = jwt.PyJWKSet.from_dict(response.json())
+        _jwks = (time.monotonic(), key_set)
+        return key_set[kid]
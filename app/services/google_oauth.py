@@ -4,13 +4,38 @@ Google OAuth provider for admin authentication.
 Adapted from CIRISManager implementation for CIRIS Billing.
 """
 
+from urllib.parse import quote_plus, urlencode
+
 import httpx
+import jwt
 from structlog import get_logger
 
 from app.models.domain import OAuthToken, OAuthUser
+from app.services.google_jwks import GOOGLE_ISSUERS, get_signing_key
 
 logger = get_logger(__name__)
 
+# Process-wide client so Google connections are pooled across provider instances
+_http_client: httpx.AsyncClient | None = None
+_HTTP_TIMEOUT = 10.0
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+
+
+def _get_shared_http_client() -> httpx.AsyncClient:
+    """Get (or create) the process-wide Google OAuth client."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared Google OAuth client (for graceful shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class GoogleOAuthProvider:
     """Google OAuth provider implementation."""
@@ -18,6 +43,7 @@ class GoogleOAuthProvider:
     AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
     TOKEN_URL = "https://oauth2.googleapis.com/token"
     USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo"
+    ALLOWED_SUFFIXES = ("@ciris.ai",)
 
     def __init__(
         self,
@@ -31,30 +57,31 @@ class GoogleOAuthProvider:
         self.hd_domain = hd_domain
         self._http_client = http_client
 
+        # Only state and redirect_uri vary per login
+        self._auth_url_prefix = f"{self.AUTH_URL}?" + urlencode(
+            {
+                "client_id": client_id,
+                "response_type": "code",
+                "scope": "openid email profile",
+                "access_type": "offline",
+                "prompt": "select_account",
+                "hd": hd_domain,  # Restrict to ciris.ai domain
+            }
+        )
+
     @property
     def http_client(self) -> httpx.AsyncClient:
-        """Get HTTP client."""
+        """Get HTTP client (the shared client unless one was injected)."""
         if self._http_client is None:
-            self._http_client = httpx.AsyncClient()
+            return _get_shared_http_client()
         return self._http_client
 
-    async def get_authorization_url(self, state: str, redirect_uri: str) -> str:
+    def get_authorization_url(self, state: str, redirect_uri: str) -> str:
         """Get OAuth authorization URL."""
-        from urllib.parse import urlencode
-
-        params = {
-            "client_id": self.client_id,
-            "redirect_uri": redirect_uri,
-            "response_type": "code",
-            "scope": "openid email profile",
-            "state": state,
-            "access_type": "offline",
-            "prompt": "select_account",
-            "hd": self.hd_domain,  # Restrict to ciris.ai domain
-        }
-
-        query_string = urlencode(params)
-        return f"{self.AUTH_URL}?{query_string}"
+        return (
+            f"{self._auth_url_prefix}&redirect_uri={quote_plus(redirect_uri, safe='')}"
+            f"&state={quote_plus(state, safe='')}"
+        )
 
     async def exchange_code_for_token(self, code: str, redirect_uri: str) -> OAuthToken:
         """Exchange authorization code for access token."""
@@ -76,6 +103,7 @@ class GoogleOAuthProvider:
                 token_type=token_data.get("token_type", "Bearer"),
                 expires_in=token_data.get("expires_in"),
                 refresh_token=token_data.get("refresh_token"),
+                id_token=token_data.get("id_token"),
             )
 
         except httpx.HTTPStatusError as e:
@@ -87,6 +115,53 @@ class GoogleOAuthProvider:
             logger.error("token_exchange_error", error=str(e))
             raise ValueError("Failed to exchange authorization code")
 
+    async def verify_id_token(self, id_token: str) -> OAuthUser:
+        """
+        Get user information from an ID token, verified locally.
+
+        Replaces the userinfo round trip at login; only Google's signing keys
+        are fetched, and those are cached.
+        """
+        try:
+            # Reject other Workspace domains (or consumer accounts) before any key fetch
+            hd = jwt.decode(id_token, options={"verify_signature": False}).get("hd")
+            if hd != self.hd_domain:
+                logger.warning("unauthorized_domain_attempt", hd=hd)
+                raise ValueError(f"Only @{self.hd_domain} accounts are allowed")
+
+            kid = jwt.get_unverified_header(id_token).get("kid", "")
+            signing_key = await get_signing_key(kid, self.http_client)
+            claims = jwt.decode(
+                id_token,
+                signing_key.key,
+                algorithms=["RS256"],
+                audience=self.client_id,
+                issuer=GOOGLE_ISSUERS,
+            )
+        except (jwt.PyJWTError, KeyError) as e:
+            logger.warning("id_token_invalid", error=str(e))
+            raise ValueError("Invalid ID token")
+        except httpx.HTTPError as e:
+            logger.error("jwks_fetch_failed", error=str(e))
+            raise ValueError("Failed to verify ID token")
+
+        # Verify user is from @ciris.ai domain
+        email = claims.get("email", "")
+        if (
+            claims.get("hd") != self.hd_domain
+            or not claims.get("email_verified")
+            or not email.endswith(self.ALLOWED_SUFFIXES)
+        ):
+            logger.warning("unauthorized_domain_attempt", email=email)
+            raise ValueError(f"Only @ciris.ai emails are allowed. Got: {email}")
+
+        return OAuthUser(
+            id=claims["sub"],
+            email=email,
+            name=claims.get("name"),
+            picture=claims.get("picture"),
+        )
+
     async def get_user_info(self, access_token: str) -> OAuthUser:
         """Get user information from Google."""
         try:
@@ -98,7 +173,7 @@ class GoogleOAuthProvider:
 
             # Verify user is from @ciris.ai domain
             email = user_data.get("email", "")
-            if not email.endswith("@ciris.ai"):
+            if not email.endswith(self.ALLOWED_SUFFIXES):
                 logger.warning("unauthorized_domain_attempt", email=email)
                 raise ValueError(f"Only @ciris.ai emails are allowed. Got: {email}")
 
@@ -122,6 +197,6 @@ class GoogleOAuthProvider:
             raise ValueError("Failed to get user information")
 
     async def close(self) -> None:
-        """Close HTTP client."""
+        """Close an injected HTTP client (the shared one is closed at shutdown)."""
         if self._http_client:
             await self._http_client.aclose()
@@ -4,10 +4,12 @@ Google Play product catalog configuration.
 Maps Google Play product IDs to credit amounts.
 """
 
+from collections.abc import Mapping
 from dataclasses import dataclass
+from types import MappingProxyType
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GooglePlayProduct:
     """Google Play product configuration."""
 
@@ -28,7 +30,7 @@ class GooglePlayProduct:
 # Product catalog (must match Google Play Console configuration)
 # Pricing: Exactly $0.10 per credit with NO volume discounts
 # Credits = floor(price / $0.10) to ensure users always pay at least $0.10/credit
-GOOGLE_PLAY_PRODUCTS: dict[str, GooglePlayProduct] = {
+_PRODUCTS: dict[str, GooglePlayProduct] = {
     "credits_100": GooglePlayProduct(
         product_id="credits_100",
         credits=99,  # $9.99 / $0.10 = 99 credits (no discount)
@@ -46,6 +48,9 @@ GOOGLE_PLAY_PRODUCTS: dict[str, GooglePlayProduct] = {
     ),
 }
 
+# Read-only view: the catalog cannot be mutated at runtime
+GOOGLE_PLAY_PRODUCTS: Mapping[str, GooglePlayProduct] = MappingProxyType(_PRODUCTS)
+
 
 def get_product(product_id: str) -> GooglePlayProduct:
     """
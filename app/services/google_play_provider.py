@@ -4,9 +4,18 @@ Google Play Provider Implementation.
 NO DICTIONARIES - All data uses strongly typed models.
 """
 
+import asyncio
+import base64
+import hashlib
+from collections.abc import Mapping
+from types import MappingProxyType
+from urllib.parse import quote
+
+import httpx
+import jwt
+import orjson
+from google.auth.transport import requests as google_requests
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from structlog import get_logger
 
 from app.exceptions import PaymentProviderError, WebhookVerificationError
@@ -15,9 +24,82 @@ from app.models.google_play import (
     GooglePlayPurchaseVerification,
     GooglePlayWebhookEvent,
 )
+from app.services.google_jwks import GOOGLE_ISSUERS, get_signing_key
 
 logger = get_logger(__name__)
 
+_SCOPES = ["https://www.googleapis.com/auth/androidpublisher"]
+_API_BASE = "https://androidpublisher.googleapis.com/androidpublisher/v3/applications"
+
+# OneTimeProductNotification.notificationType -> event type
+_EVENT_TYPES: Mapping[int, str] = MappingProxyType(
+    {
+        1: "product_purchased",
+        2: "product_canceled",
+    }
+)
+
+# Credentials (with the lock guarding their token refresh) keyed by service
+# account fingerprint, so per-request providers skip key parsing and share
+# one bearer token
+_credentials: dict[str, tuple[service_account.Credentials, asyncio.Lock]] = {}
+_MAX_CACHED_CREDENTIALS = 8
+
+# Process-wide client so Play API connections are pooled across providers
+_http_client: httpx.AsyncClient | None = None
+_HTTP_TIMEOUT = 30.0
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+
+def _credentials_id(service_account_json: str | dict[str, str]) -> str:
+    """Stable cache key: the file path, or a digest of the credentials dict."""
+    if isinstance(service_account_json, str):
+        return service_account_json
+    return hashlib.sha256(
+        orjson.dumps(service_account_json, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def _get_credentials(
+    service_account_json: str | dict[str, str],
+) -> tuple[service_account.Credentials, asyncio.Lock]:
+    """Get (or load) the service account credentials and refresh lock for an account."""
+    creds_id = _credentials_id(service_account_json)
+    cached = _credentials.get(creds_id)
+    if cached is not None:
+        return cached
+
+    # Load service account credentials
+    if isinstance(service_account_json, str):
+        credentials = service_account.Credentials.from_service_account_file(  # type: ignore[no-untyped-call]
+            service_account_json, scopes=_SCOPES
+        )
+    else:
+        credentials = service_account.Credentials.from_service_account_info(  # type: ignore[no-untyped-call]
+            service_account_json, scopes=_SCOPES
+        )
+
+    if len(_credentials) >= _MAX_CACHED_CREDENTIALS:
+        _credentials.clear()
+    _credentials[creds_id] = (credentials, asyncio.Lock())
+    return _credentials[creds_id]
+
+
+def _get_shared_http_client() -> httpx.AsyncClient:
+    """Get (or create) the process-wide Play API client."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared Play API client (for graceful shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class GooglePlayProvider:
     """
@@ -30,6 +112,7 @@ class GooglePlayProvider:
         self,
         service_account_json: str | dict[str, str],
         package_name: str,
+        http_client: httpx.AsyncClient | None = None,
     ) -> None:
         """
         Initialize Google Play provider.
@@ -37,27 +120,52 @@ class GooglePlayProvider:
         Args:
             service_account_json: Path to service account JSON or dict with credentials
             package_name: Android package name (e.g., 'ai.ciris.agent')
+            http_client: Optional HTTP client (defaults to the shared client)
         """
         self.package_name = package_name
+        self.credentials, self._refresh_lock = _get_credentials(service_account_json)
+        self._http_client = http_client
 
-        # Load service account credentials
-        if isinstance(service_account_json, str):
-            self.credentials = service_account.Credentials.from_service_account_file(  # type: ignore[no-untyped-call]
-                service_account_json,
-                scopes=["https://www.googleapis.com/auth/androidpublisher"],
-            )
-        else:
-            self.credentials = service_account.Credentials.from_service_account_info(  # type: ignore[no-untyped-call]
-                service_account_json,
-                scopes=["https://www.googleapis.com/auth/androidpublisher"],
-            )
+        logger.info("google_play_provider_initialized", package_name=package_name)
 
-        # Build API client
-        self.service = build(
-            "androidpublisher", "v3", credentials=self.credentials, cache_discovery=False
-        )
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Get HTTP client (the shared client unless one was injected)."""
+        if self._http_client is None:
+            return _get_shared_http_client()
+        return self._http_client
 
-        logger.info("google_play_provider_initialized", package_name=package_name)
+    async def _bearer_token(self) -> str:
+        """
+        Get the account's bearer token, refreshing it only near expiry.
+
+        Concurrent requests that find the token stale share one refresh.
+        """
+        if not self.credentials.valid:
+            async with self._refresh_lock:
+                if not self.credentials.valid:  # Another request may have refreshed it
+                    # google-auth refreshes synchronously; keep it off the event loop
+                    await asyncio.to_thread(
+                        self.credentials.refresh,
+                        google_requests.Request(),  # type: ignore[no-untyped-call]
+                    )
+        return str(self.credentials.token)
+
+    async def _request(self, method: str, url: str) -> httpx.Response:
+        """Make an authorized Android Publisher API request; raises HTTPStatusError."""
+        response = await self.http_client.request(
+            method, url, headers={"Authorization": f"Bearer {await self._bearer_token()}"}
+        )
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _purchase_url(package_name: str, product_id: str, token: str) -> str:
+        """URL of a one-time product purchase resource."""
+        return (
+            f"{_API_BASE}/{quote(package_name, safe='')}/purchases/products/"
+            f"{quote(product_id, safe='')}/tokens/{quote(token, safe='')}"
+        )
 
     async def verify_purchase(
         self,
@@ -83,16 +191,10 @@ class GooglePlayProvider:
             )
 
             # Call Google Play API
-            result = (
-                self.service.purchases()
-                .products()
-                .get(
-                    packageName=purchase_token.package_name,
-                    productId=purchase_token.product_id,
-                    token=purchase_token.token,
-                )
-                .execute()
+            url = self._purchase_url(
+                purchase_token.package_name, purchase_token.product_id, purchase_token.token
             )
+            result = orjson.loads((await self._request("GET", url)).content)
 
             # purchaseType: None=real purchase, 0=test, 1=promo, 2=rewarded
             purchase_type = result.get("purchaseType")
@@ -120,17 +222,17 @@ class GooglePlayProvider:
                 purchase_type=purchase_type,
             )
 
-        except HttpError as exc:
-            error_content = exc.content.decode("utf-8") if exc.content else str(exc)
+        except httpx.HTTPStatusError as exc:
+            error_content = exc.response.text or str(exc)
             logger.error(
                 "google_play_verification_failed",
-                status=exc.resp.status,
+                status=exc.response.status_code,
                 error=error_content,
             )
 
-            if exc.resp.status == 404:
+            if exc.response.status_code == 404:
                 raise PaymentProviderError("Purchase not found or invalid token") from exc
-            elif exc.resp.status == 410:
+            elif exc.response.status_code == 410:
                 raise PaymentProviderError("Purchase token expired") from exc
             else:
                 raise PaymentProviderError(f"Google Play API error: {error_content}") from exc
@@ -157,16 +259,13 @@ class GooglePlayProvider:
         try:
             logger.info("consuming_google_play_purchase", product_id=product_id)
 
-            self.service.purchases().products().consume(
-                packageName=self.package_name,
-                productId=product_id,
-                token=purchase_token,
-            ).execute()
+            url = self._purchase_url(self.package_name, product_id, purchase_token)
+            await self._request("POST", f"{url}:consume")
 
             logger.info("google_play_purchase_consumed", product_id=product_id)
 
-        except HttpError as exc:
-            error_content = exc.content.decode("utf-8") if exc.content else str(exc)
+        except httpx.HTTPStatusError as exc:
+            error_content = exc.response.text or str(exc)
             logger.error(
                 "google_play_consumption_failed",
                 product_id=product_id,
@@ -192,16 +291,13 @@ class GooglePlayProvider:
         try:
             logger.info("acknowledging_google_play_purchase", product_id=product_id)
 
-            self.service.purchases().products().acknowledge(
-                packageName=self.package_name,
-                productId=product_id,
-                token=purchase_token,
-            ).execute()
+            url = self._purchase_url(self.package_name, product_id, purchase_token)
+            await self._request("POST", f"{url}:acknowledge")
 
             logger.info("google_play_purchase_acknowledged", product_id=product_id)
 
-        except HttpError as exc:
-            error_content = exc.content.decode("utf-8") if exc.content else str(exc)
+        except httpx.HTTPStatusError as exc:
+            error_content = exc.response.text or str(exc)
             logger.error(
                 "google_play_acknowledgement_failed",
                 product_id=product_id,
@@ -209,15 +305,60 @@ class GooglePlayProvider:
             )
             raise PaymentProviderError(f"Acknowledgement failed: {error_content}") from exc
 
+    async def _verify_push_token(
+        self,
+        authorization: str | None,
+        audience: str,
+        service_account_email: str | None,
+    ) -> None:
+        """
+        Verify the Pub/Sub push authentication JWT against Google's cached keys.
+
+        Raises:
+            WebhookVerificationError: If the token is missing or invalid
+        """
+        if not authorization or not authorization.startswith("Bearer "):
+            raise WebhookVerificationError("Missing Pub/Sub authentication token")
+        token = authorization[len("Bearer ") :]
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid", "")
+            signing_key = await get_signing_key(kid, self.http_client)
+            claims = jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=["RS256"],
+                audience=audience,
+                issuer=GOOGLE_ISSUERS,
+            )
+        except (jwt.PyJWTError, KeyError) as exc:
+            logger.warning("google_play_webhook_invalid_token", error=str(exc))
+            raise WebhookVerificationError("Invalid Pub/Sub authentication token") from exc
+        except httpx.HTTPError as exc:
+            logger.error("google_play_webhook_jwks_fetch_failed", error=str(exc))
+            raise WebhookVerificationError("Could not verify Pub/Sub authentication token") from exc
+
+        if service_account_email and (
+            claims.get("email") != service_account_email or not claims.get("email_verified")
+        ):
+            logger.warning("google_play_webhook_unexpected_sender", email=claims.get("email"))
+            raise WebhookVerificationError("Pub/Sub token not from the configured service account")
+
     async def verify_webhook(
         self,
         payload: bytes,
+        authorization: str | None = None,
+        audience: str | None = None,
+        service_account_email: str | None = None,
     ) -> GooglePlayWebhookEvent:
         """
         Verify Google Play Real-Time Developer Notification webhook.
 
         Args:
             payload: Raw webhook payload (JSON from Pub/Sub)
+            authorization: Authorization header of the Pub/Sub push request
+            audience: Expected push token audience; the token is only checked when set
+            service_account_email: Expected push token sender (optional)
 
         Returns:
             Parsed webhook event
@@ -225,23 +366,22 @@ class GooglePlayProvider:
         Raises:
             WebhookVerificationError: If verification fails
         """
-        import base64
-        import json
+        if audience:
+            await self._verify_push_token(authorization, audience, service_account_email)
 
         try:
             logger.info("verifying_google_play_webhook")
 
             # Parse Pub/Sub message
-            pubsub_message = json.loads(payload)
+            pubsub_message = orjson.loads(payload)
 
             # Extract base64-encoded message data
             message_data = pubsub_message.get("message", {}).get("data")
             if not message_data:
                 raise WebhookVerificationError("No message data in webhook")
 
-            # Decode base64
-            decoded_data = base64.b64decode(message_data).decode("utf-8")
-            notification = json.loads(decoded_data)
+            # Decode base64 (orjson parses the UTF-8 bytes directly)
+            notification = orjson.loads(base64.b64decode(message_data))
 
             logger.info(
                 "google_play_webhook_verified",
@@ -265,7 +405,7 @@ class GooglePlayProvider:
                 event_time_millis=int(notification.get("eventTimeMillis", 0)),
             )
 
-        except json.JSONDecodeError as exc:
+        except orjson.JSONDecodeError as exc:
             logger.error("google_play_webhook_invalid_json", error=str(exc))
             raise WebhookVerificationError("Invalid JSON payload") from exc
         except Exception as exc:
@@ -274,8 +414,4 @@ class GooglePlayProvider:
 
     def _get_event_type(self, notification_type: int) -> str:
         """Map notification type to event type string."""
-        event_types = {
-            1: "product_purchased",
-            2: "product_canceled",
-        }
-        return event_types.get(notification_type, f"unknown_{notification_type}")
+        return _EVENT_TYPES.get(notification_type) or f"unknown_{notification_type}"
@@ -8,7 +8,7 @@ from dataclasses import dataclass
 from typing import Protocol
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, kw_only=True)
 class PaymentIntent:
     """
     Provider-agnostic payment intent.
@@ -26,7 +26,7 @@ class PaymentIntent:
     idempotency_key: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, kw_only=True)
 class PaymentResult:
     """
     Provider-agnostic payment result.
@@ -41,7 +41,7 @@ class PaymentResult:
     currency: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, kw_only=True)
 class WebhookEvent:
     """
     Provider-agnostic webhook event.
@@ -115,10 +115,11 @@ class PlayIntegrityService:
         Returns:
             Tuple of (is_valid, error_message)
         """
-        if nonce not in _nonce_cache:
+        entry = _nonce_cache.get(nonce)
+        if entry is None:
             return False, "Nonce not found or already expired"
 
-        _, expires_at, _, used = _nonce_cache[nonce]
+        _, expires_at, _, used = entry
 
         if used:
             return False, "Nonce already used"
@@ -131,8 +132,9 @@ class PlayIntegrityService:
 
     def mark_nonce_used(self, nonce: str) -> None:
         """Mark a nonce as used to prevent replay attacks."""
-        if nonce in _nonce_cache:
-            created_at, expires_at, context, _ = _nonce_cache[nonce]
+        entry = _nonce_cache.get(nonce)
+        if entry is not None:
+            created_at, expires_at, context, _ = entry
             _nonce_cache[nonce] = (created_at, expires_at, context, True)
 
     async def verify_token(
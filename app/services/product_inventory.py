@@ -156,6 +156,29 @@ class ProductInventoryService:
                 return account
             raise ResourceNotFoundError(f"Failed to create account for identity: {identity}")
 
+    def add_initial_inventories(self, account_id: UUID) -> None:
+        """
+        Stage free-credit inventories for every product on a newly created account.
+
+        Issues no queries: the rows go out with the caller's next flush, batched
+        into one multi-row INSERT. Only valid for accounts that cannot have
+        inventories yet; use get_or_create_inventory otherwise.
+        """
+        now = datetime.now(UTC)
+        self.session.add_all(
+            [
+                ProductInventory(
+                    account_id=account_id,
+                    product_type=product_type,
+                    free_remaining=config.free_initial,
+                    paid_credits=0,
+                    last_daily_refresh=now,
+                    total_uses=0,
+                )
+                for product_type, config in PRODUCT_CONFIGS.items()
+            ]
+        )
+
     async def get_or_create_inventory(
         self, account_id: UUID, product_type: str
     ) -> ProductInventory:
@@ -4,6 +4,7 @@ Tests for Admin Authentication Service and Routes.
 Tests OAuth flow, JWT token management, and admin user handling.
 """
 
+import hashlib
 from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock
 from uuid import uuid4
@@ -11,9 +12,9 @@ from uuid import uuid4
 import jwt
 import pytest
 
-from app.db.models import AdminUser
+from app.db.models import AdminOAuthSession, AdminUser
 from app.models.domain import OAuthToken, OAuthUser
-from app.services.admin_auth import AdminAuthService
+from app.services.admin_auth import OAUTH_SESSION_TTL, AdminAuthService
 
 
 class TestAdminAuthService:
@@ -23,7 +24,7 @@ class TestAdminAuthService:
     def mock_oauth_provider(self):
         """Create mock OAuth provider."""
         provider = MagicMock()
-        provider.get_authorization_url = AsyncMock(
+        provider.get_authorization_url = MagicMock(
             return_value="https://accounts.google.com/oauth?..."
         )
         return provider
@@ -37,23 +38,50 @@ class TestAdminAuthService:
             jwt_expire_hours=24,
         )
 
+    @staticmethod
+    def _session_result(redirect_uri="https://example.com/admin", found=True):
+        """Mock result of consuming a pending OAuth session (DELETE ... RETURNING)."""
+        result = MagicMock()
+        if found:
+            row = MagicMock()
+            row.redirect_uri = redirect_uri
+            row.callback_url = "https://example.com/callback"
+            row.created_at = datetime.now(UTC)
+            result.one_or_none.return_value = row
+        else:
+            result.one_or_none.return_value = None
+        return result
+
     @pytest.mark.asyncio
     async def test_initiate_oauth_flow_creates_session(self, auth_service):
-        """initiate_oauth_flow creates session and returns auth URL."""
+        """initiate_oauth_flow stores a hashed session row and returns auth URL."""
+        db = AsyncMock()
+        db.add = MagicMock()
+
         state, auth_url = await auth_service.initiate_oauth_flow(
             redirect_uri="https://example.com/admin",
             callback_url="https://example.com/admin/oauth/callback",
+            db=db,
         )
 
         assert len(state) > 0
         assert auth_url == "https://accounts.google.com/oauth?..."
-        assert state in auth_service._sessions
-        assert auth_service._sessions[state].redirect_uri == "https://example.com/admin"
+
+        db.add.assert_called_once()
+        session = db.add.call_args.args[0]
+        assert isinstance(session, AdminOAuthSession)
+        assert session.state_hash == hashlib.sha256(state.encode()).hexdigest()
+        assert session.redirect_uri == "https://example.com/admin"
+        assert session.expires_at - session.created_at == OAUTH_SESSION_TTL
+        # Expired sessions are purged in the same transaction
+        db.execute.assert_awaited_once()
+        db.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_handle_oauth_callback_invalid_state(self, auth_service):
         """handle_oauth_callback raises for invalid state."""
         db = AsyncMock()
+        db.execute = AsyncMock(return_value=self._session_result(found=False))
 
         with pytest.raises(ValueError, match="Invalid OAuth state"):
             await auth_service.handle_oauth_callback(
@@ -67,12 +95,6 @@ class TestAdminAuthService:
         """handle_oauth_callback completes flow and returns JWT."""
         db = AsyncMock()
 
-        # Create a session first
-        state, _ = await auth_service.initiate_oauth_flow(
-            redirect_uri="https://example.com/admin",
-            callback_url="https://example.com/callback",
-        )
-
         # Mock token exchange
         mock_token = OAuthToken(
             access_token="google_access_token",
@@ -103,34 +125,62 @@ class TestAdminAuthService:
 
         result = MagicMock()
         result.scalar_one_or_none.return_value = mock_admin
-        db.execute = AsyncMock(return_value=result)
+        db.execute = AsyncMock(side_effect=[self._session_result(), result])
         db.commit = AsyncMock()
 
         response = await auth_service.handle_oauth_callback(
             code="auth_code",
-            state=state,
+            state="state123",
             db=db,
         )
 
         assert "access_token" in response
-        assert "redirect_uri" in response
+        assert response["redirect_uri"] == "https://example.com/admin"
         assert "user" in response
         assert response["user"]["email"] == "admin@ciris.ai"
+        assert mock_admin.last_login_at is not None
+        db.commit.assert_awaited_once()
+        mock_oauth_provider.exchange_code_for_token.assert_awaited_once_with(
+            "auth_code", "https://example.com/callback"
+        )
 
-        # Session should be cleaned up
-        assert state not in auth_service._sessions
+    @pytest.mark.asyncio
+    async def test_handle_oauth_callback_uses_id_token(self, auth_service, mock_oauth_provider):
+        """handle_oauth_callback verifies the ID token instead of calling userinfo."""
+        db = AsyncMock()
+
+        mock_oauth_provider.exchange_code_for_token = AsyncMock(
+            return_value=OAuthToken(access_token="token", id_token="id.token.jwt")
+        )
+        mock_oauth_provider.verify_id_token = AsyncMock(
+            return_value=OAuthUser(id="google_123", email="admin@ciris.ai")
+        )
+        mock_oauth_provider.get_user_info = AsyncMock()
+
+        mock_admin = MagicMock(spec=AdminUser)
+        mock_admin.id = uuid4()
+        mock_admin.email = "admin@ciris.ai"
+        mock_admin.full_name = None
+        mock_admin.picture_url = None
+        mock_admin.role = "admin"
+        mock_admin.is_active = True
+
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = mock_admin
+        db.execute = AsyncMock(side_effect=[self._session_result(), result])
+        db.commit = AsyncMock()
+
+        response = await auth_service.handle_oauth_callback(code="c", state="s", db=db)
+
+        assert response["user"]["email"] == "admin@ciris.ai"
+        mock_oauth_provider.verify_id_token.assert_awaited_once_with("id.token.jwt")
+        mock_oauth_provider.get_user_info.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_handle_oauth_callback_inactive_user(self, auth_service, mock_oauth_provider):
         """handle_oauth_callback raises for inactive user."""
         db = AsyncMock()
 
-        # Create session
-        state, _ = await auth_service.initiate_oauth_flow(
-            redirect_uri="https://example.com/admin",
-            callback_url="https://example.com/callback",
-        )
-
         # Mock token and user
         mock_oauth_provider.exchange_code_for_token = AsyncMock(
             return_value=OAuthToken(
@@ -154,12 +204,12 @@ class TestAdminAuthService:
         mock_admin.is_active = False
         result = MagicMock()
         result.scalar_one_or_none.return_value = mock_admin
-        db.execute = AsyncMock(return_value=result)
+        db.execute = AsyncMock(side_effect=[self._session_result(), result])
 
         with pytest.raises(ValueError, match="deactivated"):
             await auth_service.handle_oauth_callback(
                 code="auth_code",
-                state=state,
+                state="state123",
                 db=db,
             )
 
@@ -168,12 +218,6 @@ class TestAdminAuthService:
         """handle_oauth_callback creates new user if not exists."""
         db = AsyncMock()
 
-        # Create session
-        state, _ = await auth_service.initiate_oauth_flow(
-            redirect_uri="https://example.com/admin",
-            callback_url="https://example.com/callback",
-        )
-
         # Mock token and user
         mock_oauth_provider.exchange_code_for_token = AsyncMock(
             return_value=OAuthToken(
@@ -193,32 +237,28 @@ class TestAdminAuthService:
         )
 
         # First query returns None (user not found)
-        # Second query returns empty list (count = 0)
+        # Second query finds no existing admin users (first user)
         first_result = MagicMock()
         first_result.scalar_one_or_none.return_value = None
 
         second_result = MagicMock()
-        second_result.scalars.return_value.all.return_value = []
+        second_result.first.return_value = None
 
-        db.execute = AsyncMock(side_effect=[first_result, second_result])
+        db.execute = AsyncMock(side_effect=[self._session_result(), first_result, second_result])
         db.add = MagicMock()
         db.commit = AsyncMock()
 
-        # Mock refresh to set ID
-        async def mock_refresh(obj):
-            if not hasattr(obj, "id") or obj.id is None:
-                obj.id = uuid4()
-
-        db.refresh = mock_refresh
-
         response = await auth_service.handle_oauth_callback(
             code="auth_code",
-            state=state,
+            state="state123",
             db=db,
         )
 
-        # Should create new user
+        # Should create new user, stamped with its first login, in one commit
         db.add.assert_called_once()
+        new_admin = db.add.call_args.args[0]
+        assert new_admin.last_login_at is not None
+        db.commit.assert_awaited_once()
         assert "access_token" in response
 
     def test_create_jwt_token(self, auth_service):
@@ -344,6 +384,7 @@ class TestAdminAuthRoutes:
         response = await google_login(
             request=request,
             redirect_uri=None,
+            db=AsyncMock(),
             auth_service=mock_auth_service,
         )
 
@@ -368,6 +409,7 @@ class TestAdminAuthRoutes:
         await google_login(
             request=request,
             redirect_uri="https://custom.com/callback",
+            db=AsyncMock(),
             auth_service=mock_auth_service,
         )
 
@@ -395,6 +437,7 @@ class TestAdminAuthRoutes:
             await google_login(
                 request=request,
                 redirect_uri=None,
+                db=AsyncMock(),
                 auth_service=mock_auth_service,
             )
 
@@ -687,6 +687,20 @@ class TestTokenRevocation:
         assert result.active_revocations == 5
         assert result.cache_loaded is True
 
+    @pytest.mark.asyncio
+    async def test_get_db_pool_status(self, mock_admin):
+        """get_db_pool_status reports pool counters per engine."""
+        from app.api.admin_routes import get_db_pool_status
+        from app.db.session import PoolStatus
+
+        status = PoolStatus(engine="write", size=25, checked_in=20, checked_out=5, overflow=0)
+        with patch("app.api.admin_routes.get_pool_status", return_value=[status]):
+            result = await get_db_pool_status(admin=mock_admin)
+
+        assert len(result) == 1
+        assert result[0].engine == "write"
+        assert result[0].checked_out == 5
+
 
 class TestAnalytics:
     """Tests for analytics endpoints."""
@@ -4,8 +4,10 @@ Tests for API Key Service.
 Tests key generation, validation, and management.
 """
 
+import asyncio
+import threading
 from datetime import UTC, datetime, timedelta
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
@@ -13,7 +15,25 @@ from argon2 import PasswordHasher
 
 from app.db.models import APIKey
 from app.exceptions import AuthenticationError
-from app.services.api_key import APIKeyData, APIKeyService, GeneratedAPIKey
+from app.services.api_key import (
+    APIKeyData,
+    APIKeyService,
+    GeneratedAPIKey,
+    _last_used_buffer,
+    _validated_cache,
+    compute_lookup_hmac,
+    flush_last_used,
+)
+
+HMAC_SECRET = "a" * 64
+
+
+@pytest.fixture(autouse=True)
+def _clear_validated_cache():
+    """Keep cached validations from leaking between tests."""
+    _validated_cache.clear()
+    yield
+    _validated_cache.clear()
 
 
 class TestAPIKeyData:
@@ -310,10 +330,11 @@ class TestAPIKeyServiceValidation:
         session.commit = AsyncMock()
 
         service = APIKeyService(session)
-        await service.validate_api_key(test_key, update_last_used=True)
+        result = await service.validate_api_key(test_key, update_last_used=True)
 
-        assert mock_key.last_used_at is not None
-        session.commit.assert_called()
+        assert result.last_used_at is not None
+        assert _last_used_buffer[mock_key.id] == result.last_used_at
+        session.commit.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_valid_key_skip_last_used_update(self):
@@ -342,10 +363,310 @@ class TestAPIKeyServiceValidation:
         session.commit = AsyncMock()
 
         service = APIKeyService(session)
-        await service.validate_api_key(test_key, update_last_used=False)
+        result = await service.validate_api_key(test_key, update_last_used=False)
 
         # last_used_at should not be set
-        assert mock_key.last_used_at is None
+        assert result.last_used_at is None
+        assert mock_key.id not in _last_used_buffer
+
+    @pytest.mark.asyncio
+    async def test_argon2_verify_runs_off_event_loop(self):
+        """Argon2id verification runs in a worker thread."""
+        test_key = "cbk_live_threadkey12345678"
+        mock_key = MagicMock(spec=APIKey)
+        mock_key.id = uuid4()
+        mock_key.key_hash = "hash"
+        mock_key.expires_at = None
+
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none = MagicMock(return_value=mock_key)
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=mock_result)
+
+        verify_threads = []
+        service = APIKeyService(session)
+        service.password_hasher = MagicMock()
+        service.password_hasher.verify.side_effect = lambda *_: verify_threads.append(
+            threading.get_ident()
+        )
+
+        await service.validate_api_key(test_key, update_last_used=False)
+
+        assert verify_threads and verify_threads[0] != threading.get_ident()
+
+
+class TestFlushLastUsed:
+    """Tests for batched last_used_at writes."""
+
+    @pytest.fixture(autouse=True)
+    def _empty_buffer(self):
+        _last_used_buffer.clear()
+        yield
+        _last_used_buffer.clear()
+
+    @pytest.mark.asyncio
+    async def test_empty_buffer_is_noop(self):
+        """Nothing buffered means no query."""
+        session = AsyncMock()
+
+        assert await flush_last_used(session) == 0
+        session.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_one_statement(self):
+        """Buffered timestamps are written in one UPDATE and cleared."""
+        session = AsyncMock()
+        _last_used_buffer[uuid4()] = datetime.now(UTC)
+        _last_used_buffer[uuid4()] = datetime.now(UTC)
+
+        assert await flush_last_used(session) == 2
+        session.execute.assert_awaited_once()
+        session.commit.assert_awaited_once()
+        assert _last_used_buffer == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_newer_timestamps(self):
+        """Failed writes are requeued without clobbering newer uses."""
+        key_id = uuid4()
+        old = datetime.now(UTC) - timedelta(minutes=1)
+        newer = datetime.now(UTC)
+        _last_used_buffer[key_id] = old
+
+        session = AsyncMock()
+
+        async def fail(_stmt):
+            _last_used_buffer[key_id] = newer
+            raise RuntimeError("db down")
+
+        session.execute = fail
+
+        with pytest.raises(RuntimeError):
+            await flush_last_used(session)
+
+        assert _last_used_buffer[key_id] == newer
+
+    @pytest.mark.asyncio
+    async def test_cancelled_flush_requeues_timestamps(self):
+        """A flush cancelled mid-write (e.g. at shutdown) puts its batch back."""
+        key_id = uuid4()
+        used_at = datetime.now(UTC)
+        _last_used_buffer[key_id] = used_at
+
+        session = AsyncMock()
+        session.execute.side_effect = asyncio.CancelledError
+
+        with pytest.raises(asyncio.CancelledError):
+            await flush_last_used(session)
+
+        assert _last_used_buffer == {key_id: used_at}
+
+
+class TestAPIKeyServiceHMACLookup:
+    """Tests for the HMAC lookup fast path."""
+
+    @staticmethod
+    def _mock_key(test_key: str, lookup_hmac: bytes | None) -> MagicMock:
+        mock_key = MagicMock(spec=APIKey)
+        mock_key.id = uuid4()
+        mock_key.key_hash = PasswordHasher().hash(test_key)
+        mock_key.key_prefix = test_key[:20]
+        mock_key.key_lookup_hmac = lookup_hmac
+        mock_key.name = "Test"
+        mock_key.environment = "live"
+        mock_key.permissions = []
+        mock_key.status = "active"
+        mock_key.created_at = datetime.now(UTC)
+        mock_key.expires_at = None
+        mock_key.last_used_at = None
+        return mock_key
+
+    @staticmethod
+    def _result(value) -> MagicMock:
+        result = MagicMock()
+        result.scalar_one_or_none = MagicMock(return_value=value)
+        return result
+
+    def test_lookup_hmac_disabled_without_secret(self):
+        """No secret configured means no lookup hash."""
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", ""):
+            assert compute_lookup_hmac("cbk_live_anything") is None
+
+    def test_lookup_hmac_is_keyed(self):
+        """Lookup hash is deterministic per secret."""
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", HMAC_SECRET):
+            first = compute_lookup_hmac("cbk_live_anything")
+            assert first == compute_lookup_hmac("cbk_live_anything")
+            assert len(first) == 32
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", "b" * 64):
+            assert compute_lookup_hmac("cbk_live_anything") != first
+
+    @pytest.mark.asyncio
+    async def test_hmac_match_skips_argon2(self):
+        """A lookup hash hit is accepted without an Argon2 verify."""
+        test_key = "cbk_live_hmackey1234567890"
+        session = AsyncMock()
+
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", HMAC_SECRET):
+            mock_key = self._mock_key(test_key, compute_lookup_hmac(test_key))
+            session.execute = AsyncMock(return_value=self._result(mock_key))
+            service = APIKeyService(session)
+            service.password_hasher = MagicMock()
+
+            result = await service.validate_api_key(test_key, update_last_used=False)
+
+        assert result.key_id == mock_key.id
+        service.password_hasher.verify.assert_not_called()
+        session.execute.assert_awaited_once()
+        session.commit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_legacy_key_backfills_hmac(self):
+        """Legacy keys verify with Argon2 once and get their lookup hash stored."""
+        test_key = "cbk_live_legacykey12345678"
+        session = AsyncMock()
+
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", HMAC_SECRET):
+            mock_key = self._mock_key(test_key, None)
+            session.execute = AsyncMock(side_effect=[self._result(None), self._result(mock_key)])
+            service = APIKeyService(session)
+
+            await service.validate_api_key(test_key, update_last_used=False)
+
+            assert mock_key.key_lookup_hmac == compute_lookup_hmac(test_key)
+        assert session.execute.await_count == 2
+        session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_rotated_secret_rekeys_existing_key(self):
+        """After the HMAC secret changes, existing keys still authenticate and are re-keyed."""
+        test_key = "cbk_live_rotatedkey1234567"
+        session = AsyncMock()
+
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", HMAC_SECRET):
+            mock_key = self._mock_key(test_key, compute_lookup_hmac(test_key))
+
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", "b" * 64):
+            new_hmac = compute_lookup_hmac(test_key)
+            # The stored hash no longer matches, so the fast path misses
+            session.execute = AsyncMock(side_effect=[self._result(None), self._result(mock_key)])
+            service = APIKeyService(session)
+
+            result = await service.validate_api_key(test_key, update_last_used=False)
+
+        assert result.key_id == mock_key.id
+        assert mock_key.key_lookup_hmac == new_hmac
+        session.commit.assert_awaited_once()
+        fallback_sql = str(session.execute.await_args_list[1].args[0])
+        assert "key_lookup_hmac IS DISTINCT FROM" in fallback_sql
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_rejected(self):
+        """Keys matching neither the lookup hash nor a legacy row are rejected."""
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=self._result(None))
+
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", HMAC_SECRET):
+            service = APIKeyService(session)
+            with pytest.raises(AuthenticationError, match="Invalid API key"):
+                await service.validate_api_key("cbk_live_unknownkey1234567")
+
+    @pytest.mark.asyncio
+    async def test_create_stores_lookup_hmac(self):
+        """New keys are stored with their lookup hash."""
+        session = AsyncMock()
+        session.add = MagicMock()
+
+        async def mock_refresh(obj):
+            obj.id = uuid4()
+            obj.created_at = datetime.now(UTC)
+
+        session.refresh = mock_refresh
+
+        with patch("app.services.api_key.settings.API_KEY_HMAC_SECRET", HMAC_SECRET):
+            service = APIKeyService(session)
+            result = await service.create_api_key(name="Key", created_by=uuid4())
+            stored = session.add.call_args.args[0]
+            assert stored.key_lookup_hmac == compute_lookup_hmac(result.plaintext_key)
+
+
+class TestValidatedKeyCache:
+    """Tests for the in-process cache of validated keys."""
+
+    @staticmethod
+    def _session_for(test_key: str, expires_at: datetime | None = None) -> AsyncMock:
+        mock_key = MagicMock(spec=APIKey)
+        mock_key.id = uuid4()
+        mock_key.key_hash = PasswordHasher().hash(test_key)
+        mock_key.key_prefix = test_key[:20]
+        mock_key.name = "Cached"
+        mock_key.environment = "live"
+        mock_key.permissions = ["billing:read"]
+        mock_key.status = "active"
+        mock_key.created_at = datetime.now(UTC)
+        mock_key.expires_at = expires_at
+        mock_key.last_used_at = None
+
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none = MagicMock(return_value=mock_key)
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=mock_result)
+        return session
+
+    @pytest.mark.asyncio
+    async def test_repeat_validation_skips_database(self):
+        """Second validation of the same key is served from cache."""
+        test_key = "cbk_live_cachedkey12345678"
+        session = self._session_for(test_key)
+        service = APIKeyService(session)
+
+        first = await service.validate_api_key(test_key)
+        second = await service.validate_api_key(test_key)
+
+        assert second.key_id == first.key_id
+        session.execute.assert_awaited_once()
+        assert _last_used_buffer[first.key_id] == second.last_used_at
+
+    @pytest.mark.asyncio
+    async def test_cache_disabled_with_zero_ttl(self):
+        """A zero TTL turns caching off."""
+        test_key = "cbk_live_nocachekey1234567"
+        session = self._session_for(test_key)
+        service = APIKeyService(session)
+
+        with patch("app.services.api_key.settings.api_key_cache_ttl_seconds", 0):
+            await service.validate_api_key(test_key, update_last_used=False)
+            await service.validate_api_key(test_key, update_last_used=False)
+
+        assert session.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_revoke_invalidates_cache(self):
+        """Revoking a key drops its cached validation."""
+        test_key = "cbk_live_revokedkey1234567"
+        session = self._session_for(test_key)
+        service = APIKeyService(session)
+
+        data = await service.validate_api_key(test_key, update_last_used=False)
+        await service.revoke_api_key(data.key_id)
+
+        assert _validated_cache == {}
+
+    @pytest.mark.asyncio
+    async def test_expired_key_not_served_from_cache(self):
+        """A key that expires while cached goes back to the database."""
+        test_key = "cbk_live_expiringkey123456"
+        session = self._session_for(test_key, datetime.now(UTC) + timedelta(hours=1))
+        service = APIKeyService(session)
+        await service.validate_api_key(test_key, update_last_used=False)
+
+        # Key expires while its validation is still cached
+        expired = datetime.now(UTC) - timedelta(seconds=1)
+        ((_, cached),) = _validated_cache.values()
+        cached.expires_at = expired
+        session.execute.return_value.scalar_one_or_none.return_value.expires_at = expired
+
+        with pytest.raises(AuthenticationError, match="API key expired"):
+            await service.validate_api_key(test_key, update_last_used=False)
 
 
 class TestAPIKeyServiceRevoke:
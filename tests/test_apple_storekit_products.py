@@ -0,0 +1,47 @@
+"""
+Tests for Apple StoreKit product catalog.
+"""
+
+import pytest
+
+from app.services.apple_storekit_products import (
+    APPLE_STOREKIT_PRODUCTS,
+    get_credits_for_product,
+    get_product,
+)
+from app.services.google_play_products import GOOGLE_PLAY_PRODUCTS
+
+
+class TestAppleStoreKitCatalog:
+    """Tests for the product catalog itself."""
+
+    def test_keys_match_product_ids(self):
+        """Each catalog key is the product's own ID."""
+        for product_id, product in APPLE_STOREKIT_PRODUCTS.items():
+            assert product.product_id == product_id
+
+    def test_catalog_is_read_only(self):
+        """The catalog cannot be modified at runtime."""
+        with pytest.raises(TypeError):
+            APPLE_STOREKIT_PRODUCTS["ai.ciris.mobile.free"] = None  # type: ignore[index]
+
+    def test_credits_match_google_play_tiers(self):
+        """Same price tier grants the same credits on both stores."""
+        apple_credits = sorted(p.credits for p in APPLE_STOREKIT_PRODUCTS.values())
+        google_credits = sorted(p.credits for p in GOOGLE_PLAY_PRODUCTS.values())
+
+        assert apple_credits == google_credits
+
+
+class TestGetProduct:
+    """Tests for product lookup."""
+
+    def test_known_product(self):
+        """Known product IDs resolve to their credits."""
+        assert get_product("ai.ciris.mobile.credits_100_v1").credits == 99
+        assert get_credits_for_product("ai.ciris.mobile.credits_600_v1") == 599
+
+    def test_unknown_product(self):
+        """Unknown product IDs raise ValueError."""
+        with pytest.raises(ValueError, match="Unknown product ID"):
+            get_product("credits_100")
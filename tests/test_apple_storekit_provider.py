@@ -0,0 +1,419 @@
+"""
+Tests for Apple StoreKit Provider.
+
+Tests App Store Server API requests and JWS decoding.
+"""
+
+import base64
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import jwt
+import orjson
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.exceptions import PaymentProviderError, WebhookVerificationError
+from app.models.apple_storekit import AppleStoreKitConfig
+from app.services import apple_storekit_provider
+from app.services.apple_storekit_provider import AppleStoreKitProvider
+
+
+@pytest.fixture(scope="module")
+def private_key_pem() -> str:
+    """ES256 private key in PEM form, like an App Store Connect .p8 file."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+@pytest.fixture
+def config(private_key_pem: str) -> AppleStoreKitConfig:
+    """StoreKit config for the sandbox environment."""
+    return AppleStoreKitConfig(
+        key_id="KEY123",
+        issuer_id="issuer-uuid",
+        private_key=private_key_pem,
+        bundle_id="ai.ciris.mobile",
+        environment="sandbox",
+    )
+
+
+def _signed(payload: dict) -> str:
+    """Build an (unverified) JWS as Apple would return it."""
+    return jwt.encode(payload, "unused-secret", algorithm="HS256")
+
+
+def _transaction_payload(transaction_id: str = "2000000123") -> dict:
+    return {
+        "transactionId": transaction_id,
+        "originalTransactionId": transaction_id,
+        "productId": "ai.ciris.mobile.credits_100_v1",
+        "bundleId": "ai.ciris.mobile",
+        "purchaseDate": 1700000000000,
+        "originalPurchaseDate": 1700000000000,
+        "quantity": 1,
+        "type": "Consumable",
+        "environment": "Sandbox",
+        "storefront": "USA",
+        "storefrontId": "143441",
+    }
+
+
+class TestHttpClient:
+    """Tests for HTTP client handling."""
+
+    @pytest.mark.asyncio
+    async def test_injected_client_used(self, config):
+        """Requests go through the injected client with a bearer token."""
+        seen: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(
+                200, json={"signedTransactionInfo": _signed(_transaction_payload())}
+            )
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            transaction = await provider.get_transaction_info("2000000123")
+
+        assert transaction.transaction_id == "2000000123"
+        assert seen[0].url.host == "api.storekit-sandbox.itunes.apple.com"
+        assert seen[0].headers["Authorization"].startswith("Bearer ")
+
+    @pytest.mark.asyncio
+    async def test_shared_client_reused_across_providers(self, config):
+        """Providers without an injected client share one pooled client."""
+        try:
+            first = AppleStoreKitProvider(config).http_client
+            second = AppleStoreKitProvider(config).http_client
+            assert first is second
+        finally:
+            await apple_storekit_provider.close_http_client()
+
+    @pytest.mark.asyncio
+    async def test_not_found_raises(self, config):
+        """404 from Apple maps to PaymentProviderError."""
+        transport = httpx.MockTransport(lambda _request: httpx.Response(404))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            with pytest.raises(PaymentProviderError, match="Transaction not found"):
+                await provider.get_transaction_info("missing")
+
+    @pytest.mark.asyncio
+    async def test_malformed_body_raises(self, config):
+        """A non-JSON success body maps to PaymentProviderError."""
+        transport = httpx.MockTransport(lambda _request: httpx.Response(200, content=b"<html>"))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            with pytest.raises(PaymentProviderError, match="Invalid API response"):
+                await provider.get_transaction_info("2000000123")
+
+
+class TestTransactionHistory:
+    """Tests for paginated transaction history."""
+
+    @pytest.mark.asyncio
+    async def test_pages_followed_in_order(self, config):
+        """All pages are fetched via revision and returned in order."""
+        requested: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.params.get("revision", ""))
+            if "revision" not in request.url.params:
+                return httpx.Response(
+                    200,
+                    json={
+                        "signedTransactions": [_signed(_transaction_payload("1"))],
+                        "hasMore": True,
+                        "revision": "rev-2",
+                    },
+                )
+            return httpx.Response(
+                200,
+                json={
+                    "signedTransactions": [_signed(_transaction_payload("2"))],
+                    "hasMore": False,
+                },
+            )
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            history = await provider.get_transaction_history("1")
+
+        assert [t.transaction_id for t in history] == ["1", "2"]
+        assert requested == ["", "rev-2"]
+
+
+class TestRetries:
+    """Tests for transient error retries."""
+
+    @pytest.fixture(autouse=True)
+    def no_sleep(self):
+        with patch("app.services.apple_storekit_provider.asyncio.sleep", new=AsyncMock()) as sleep:
+            yield sleep
+
+    @pytest.mark.asyncio
+    async def test_get_retried_after_transient_error(self, config, no_sleep):
+        """GETs are retried on 503 and honor Retry-After."""
+        responses = iter(
+            [
+                httpx.Response(503, headers={"Retry-After": "2"}),
+                httpx.Response(
+                    200, json={"signedTransactionInfo": _signed(_transaction_payload())}
+                ),
+            ]
+        )
+        transport = httpx.MockTransport(lambda _request: next(responses))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            transaction = await provider.get_transaction_info("2000000123")
+
+        assert transaction.transaction_id == "2000000123"
+        no_sleep.assert_awaited_once_with(2.0)
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, config, no_sleep):
+        """Persistent 429s surface as PaymentProviderError."""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(429)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            with pytest.raises(PaymentProviderError, match="API error: 429"):
+                await provider.get_transaction_info("2000000123")
+
+        assert len(calls) == apple_storekit_provider._MAX_RETRIES + 1
+
+    @pytest.mark.asyncio
+    async def test_post_not_retried(self, config, no_sleep):
+        """Non-GET requests are not retried."""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(503)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            with pytest.raises(PaymentProviderError):
+                await provider.request_test_notification()
+
+        assert len(calls) == 1
+        no_sleep.assert_not_awaited()
+
+
+class TestDecodeJws:
+    """Tests for JWS decoding."""
+
+    def test_repeated_payload_decoded_once(self, config):
+        """Identical signed data is only parsed once."""
+        provider = AppleStoreKitProvider(config)
+        signed = _signed(_transaction_payload("2000000999"))
+        apple_storekit_provider._decode_jws_payload.cache_clear()
+
+        first = provider._decode_jws(signed)
+        second = provider._decode_jws(signed)
+
+        assert first == second
+
+    def test_cache_ignores_wall_clock_jumps(self, config):
+        """Token reuse follows the monotonic clock, not time.time()."""
+        apple_storekit_provider._api_tokens.pop(config, None)
+        provider = AppleStoreKitProvider(config)
+        first = provider._generate_jwt()
+
+        with patch("app.services.apple_storekit_provider.time.time", return_value=4102444800.0):
+            assert provider._generate_jwt() == first
+
+    @pytest.mark.asyncio
+    async def test_token_dropped_on_unauthorized(self, config):
+        """A 401 from Apple evicts the cached token."""
+        transport = httpx.MockTransport(lambda _request: httpx.Response(401))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            with pytest.raises(PaymentProviderError, match="Invalid API credentials"):
+                await provider.get_transaction_info("2000000123")
+
+        assert config not in apple_storekit_provider._api_tokens
+        info = apple_storekit_provider._decode_jws_payload.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
+
+    def test_invalid_jws_raises(self, config):
+        """Malformed JWS maps to PaymentProviderError."""
+        provider = AppleStoreKitProvider(config)
+
+        with pytest.raises(PaymentProviderError, match="Invalid JWS data"):
+            provider._decode_jws("not-a-jws")
+
+    @pytest.mark.parametrize("payload", ["!!!", base64.urlsafe_b64encode(b"[1]").decode()])
+    def test_non_object_payload_raises(self, config, payload):
+        """Payloads that are not base64 JSON objects map to PaymentProviderError."""
+        provider = AppleStoreKitProvider(config)
+
+        with pytest.raises(PaymentProviderError, match="Invalid JWS data"):
+            provider._decode_jws(f"header.{payload}.signature")
+
+
+class TestVerifyWebhook:
+    """Tests for App Store Server Notification parsing."""
+
+    @pytest.mark.asyncio
+    async def test_notification_with_transaction(self, config):
+        """Webhook body is parsed, including the nested transaction JWS."""
+        notification = {
+            "notificationType": "REFUND",
+            "notificationUUID": "uuid-1",
+            "version": "2.0",
+            "signedDate": 1700000000000,
+            "data": {
+                "environment": "Sandbox",
+                "signedTransactionInfo": _signed(_transaction_payload("2000000777")),
+            },
+        }
+        body = orjson.dumps({"signedPayload": _signed(notification)})
+
+        event = await AppleStoreKitProvider(config).verify_webhook(body)
+
+        assert event.is_refund()
+        assert event.environment == "Sandbox"
+        assert event.transaction_info is not None
+        assert event.transaction_info.transaction_id == "2000000777"
+
+    @pytest.mark.asyncio
+    async def test_notification_without_data(self, config):
+        """Notifications without a data object (e.g. TEST) use defaults."""
+        notification = {"notificationType": "TEST", "signedDate": 1700000000000}
+        body = orjson.dumps({"signedPayload": _signed(notification)})
+
+        event = await AppleStoreKitProvider(config).verify_webhook(body)
+
+        assert event.is_test()
+        assert event.environment == "Production"
+        assert event.transaction_info is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("include", [True, False])
+    async def test_renewal_info_optional(self, config, include):
+        """Renewal info is only decoded when requested."""
+        notification = {
+            "notificationType": "DID_RENEW",
+            "signedDate": 1700000000000,
+            "data": {
+                "signedRenewalInfo": _signed(
+                    {"originalTransactionId": "1", "productId": "sub", "autoRenewStatus": 1}
+                )
+            },
+        }
+        body = orjson.dumps({"signedPayload": _signed(notification)})
+
+        event = await AppleStoreKitProvider(config).verify_webhook(
+            body, include_renewal_info=include
+        )
+
+        assert (event.renewal_info is not None) is include
+        if include:
+            assert event.renewal_info.will_renew()
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_rejected(self, config):
+        """Non-JSON bodies raise WebhookVerificationError."""
+        with pytest.raises(WebhookVerificationError, match="Invalid JSON payload"):
+            await AppleStoreKitProvider(config).verify_webhook(b"not json")
+
+
+class TestParseTransactionInfo:
+    """Tests for transaction payload parsing."""
+
+    def test_timestamps_converted(self, config):
+        """Millisecond timestamps become aware UTC datetimes; absent optionals are None."""
+        payload = _transaction_payload()
+        payload["revocationDate"] = 1700000500000
+
+        info = AppleStoreKitProvider(config)._parse_transaction_info(payload)
+
+        assert info.purchase_date == datetime(2023, 11, 14, 22, 13, 20, tzinfo=UTC)
+        assert info.revocation_date == datetime(2023, 11, 14, 22, 21, 40, tzinfo=UTC)
+        assert info.expires_date is None
+        assert not info.is_valid()
+
+    def test_milliseconds_exact(self):
+        """Millisecond precision survives conversion without float rounding."""
+        converted = apple_storekit_provider._ms_to_datetime(1700000000123)
+
+        assert converted.microsecond == 123000
+        assert converted.tzinfo is UTC
+
+
+class TestGenerateJwt:
+    """Tests for App Store Server API token signing."""
+
+    @pytest.mark.parametrize("encoding", ["pem", "base64", "wrapped_base64"])
+    def test_pem_and_base64_keys_accepted(self, private_key_pem, encoding):
+        """Plain PEM and base64-encoded PEM keys (even line-wrapped) sign valid ES256 tokens."""
+        key = private_key_pem
+        if encoding != "pem":
+            key = base64.b64encode(private_key_pem.encode()).decode()
+        if encoding == "wrapped_base64":
+            # As output by the base64 CLI (76-column lines, trailing newline)
+            key = "\n".join(key[i : i + 76] for i in range(0, len(key), 76)) + "\n"
+        provider = AppleStoreKitProvider(
+            AppleStoreKitConfig(
+                key_id="KEY123",
+                issuer_id="issuer-uuid",
+                private_key=key,
+                bundle_id="ai.ciris.mobile",
+                environment="production",
+            )
+        )
+
+        token = provider._generate_jwt()
+
+        assert jwt.get_unverified_header(token) == {"alg": "ES256", "kid": "KEY123", "typ": "JWT"}
+        public_key = apple_storekit_provider._load_signing_key(key).public_key()
+        claims = jwt.decode(token, public_key, algorithms=["ES256"], audience="appstoreconnect-v1")
+        assert claims["iss"] == "issuer-uuid"
+        assert claims["bid"] == "ai.ciris.mobile"
+
+    def test_token_shared_across_providers(self, config):
+        """Providers for the same configuration reuse one signed token."""
+        apple_storekit_provider._api_tokens.pop(config, None)
+
+        first = AppleStoreKitProvider(config)._generate_jwt()
+        second = AppleStoreKitProvider(config)._generate_jwt()
+
+        assert first == second
+
+    def test_cache_ignores_wall_clock_jumps(self, config):
+        """Token reuse follows the monotonic clock, not time.time()."""
+        apple_storekit_provider._api_tokens.pop(config, None)
+        provider = AppleStoreKitProvider(config)
+        first = provider._generate_jwt()
+
+        with patch("app.services.apple_storekit_provider.time.time", return_value=4102444800.0):
+            assert provider._generate_jwt() == first
+
+    @pytest.mark.asyncio
+    async def test_token_dropped_on_unauthorized(self, config):
+        """A 401 from Apple evicts the cached token."""
+        transport = httpx.MockTransport(lambda _request: httpx.Response(401))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = AppleStoreKitProvider(config, http_client=client)
+            with pytest.raises(PaymentProviderError, match="Invalid API credentials"):
+                await provider.get_transaction_info("2000000123")
+
+        assert config not in apple_storekit_provider._api_tokens
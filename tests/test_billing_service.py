@@ -4,6 +4,7 @@ Tests for BillingService.
 Unit tests for billing service operations.
 """
 
+import asyncio
 from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
@@ -13,12 +14,18 @@ import pytest
 from app.db.models import Account, Charge
 from app.exceptions import (
     AccountNotFoundError,
+    DataIntegrityError,
     IdempotencyConflictError,
     InsufficientCreditsError,
 )
 from app.models.api import AccountStatus, ChargeMetadata, TransactionType
 from app.models.domain import AccountIdentity, ChargeIntent, CreditIntent
-from app.services.billing import BillingService
+from app.services.billing import (
+    _MAX_CREDIT_CHECK_BUFFER,
+    BillingService,
+    _credit_check_buffer,
+    flush_credit_checks,
+)
 
 
 def create_mock_account(
@@ -82,14 +89,13 @@ class TestCreditCheck:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             # Account doesn't exist, return mock account after creation
             mock_find.return_value = mock_account
 
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
-                # Mock settings at the config module level
-                with patch("app.config.settings") as mock_settings:
+            with patch.object(service, "_log_credit_check"):
+                with patch("app.services.billing.settings") as mock_settings:
                     mock_settings.price_per_purchase_minor = 199
                     mock_settings.paid_uses_per_purchase = 20
 
@@ -110,11 +116,11 @@ class TestCreditCheck:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             mock_find.return_value = mock_account
 
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
+            with patch.object(service, "_log_credit_check"):
                 result = await service.check_credit(test_account_identity)
 
         assert result.has_credit is True
@@ -132,11 +138,11 @@ class TestCreditCheck:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             mock_find.return_value = mock_account
 
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
+            with patch.object(service, "_log_credit_check"):
                 result = await service.check_credit(test_account_identity)
 
         assert result.has_credit is True
@@ -159,11 +165,11 @@ class TestCreditCheck:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             mock_find.return_value = mock_account
 
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
+            with patch.object(service, "_log_credit_check"):
                 result = await service.check_credit(test_account_identity)
 
         assert result.has_credit is False
@@ -180,17 +186,75 @@ class TestCreditCheck:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             mock_find.return_value = mock_account
 
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
+            with patch.object(service, "_log_credit_check"):
                 result = await service.check_credit(test_account_identity)
 
         assert result.has_credit is False
         assert result.reason is not None
         assert "suspended" in result.reason.lower()
 
+    async def test_credit_check_new_account_commits_once(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Account creation, inventories and daily reset share one commit."""
+        new_account = create_mock_account(test_account_identity, daily_free_uses_limit=2)
+        service = BillingService(db_session)
+
+        with (
+            patch.object(
+                service, "_find_account_row_for_check", new_callable=AsyncMock
+            ) as mock_find,
+            patch.object(
+                service, "_insert_account_if_absent", new_callable=AsyncMock
+            ) as mock_insert,
+        ):
+            mock_find.return_value = None
+            mock_insert.return_value = new_account
+            result = await service.check_credit(test_account_identity)
+
+        assert result.has_credit is True
+        # New accounts start with their first daily reset already scheduled
+        assert mock_insert.await_args.kwargs["daily_free_uses_reset_at"] > datetime.now(UTC)
+        # Inventories are only staged, then flushed by the commit
+        db_session.add_all.assert_called_once()
+        db_session.flush.assert_not_awaited()
+        db_session.commit.assert_awaited_once()
+
+    async def test_credit_check_existing_account_does_not_commit(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Checks that change nothing do not commit."""
+        mock_account = create_mock_account(
+            test_account_identity,
+            daily_free_uses_remaining=1,
+            daily_free_uses_reset_at=datetime.now(UTC) + timedelta(hours=12),
+        )
+        service = BillingService(db_session)
+
+        with patch.object(
+            service, "_find_account_row_for_check", new_callable=AsyncMock
+        ) as mock_find:
+            mock_find.return_value = mock_account
+            await service.check_credit(test_account_identity)
+
+        db_session.commit.assert_not_awaited()
+
+    async def test_find_account_row_for_check_selects_columns(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """The credit check reads a column projection rather than the Account entity."""
+        service = BillingService(db_session)
+
+        await service._find_account_row_for_check(test_account_identity)
+
+        stmt = db_session.execute.await_args.args[0]
+        assert "daily_free_uses_reset_at" in stmt.selected_columns
+        assert "customer_email" not in stmt.selected_columns
+
 
 class TestChargeCreation:
     """Tests for charge creation operations."""
@@ -331,6 +395,8 @@ class TestChargeCreation:
         # Paid credits should be decremented
         assert mock_account.paid_credits == 90
         assert mock_account.total_uses == 1
+        # Charge insert and account update go out in one flush
+        db_session.flush.assert_awaited_once()
         db_session.commit.assert_called()
 
     async def test_create_charge_account_not_found(
@@ -399,20 +465,24 @@ class TestChargeCreation:
 
         assert exc_info.value.balance == 50
         assert exc_info.value.required == 100
+        # Row lock is released as soon as the charge is rejected
+        db_session.rollback.assert_awaited_once()
 
     async def test_create_charge_idempotency_conflict(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
     ) -> None:
         """Test charge idempotency - duplicate key should raise error."""
-        existing_charge = MagicMock(spec=Charge)
-        existing_charge.id = uuid4()
+        existing_charge_id = uuid4()
 
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_charge_by_idempotency", new_callable=AsyncMock
-        ) as mock_idemp:
-            mock_idemp.return_value = existing_charge  # Existing charge found
+            service, "_lock_account_checking_idempotency", new_callable=AsyncMock
+        ) as mock_lock:
+            mock_lock.return_value = (
+                create_mock_account(test_account_identity),
+                existing_charge_id,
+            )
 
             intent = ChargeIntent(
                 account_identity=test_account_identity,
@@ -423,9 +493,36 @@ class TestChargeCreation:
                 idempotency_key="test-key-123",
             )
 
-            with pytest.raises(IdempotencyConflictError):
+            with pytest.raises(IdempotencyConflictError) as exc_info:
                 await service.create_charge(intent)
 
+        assert exc_info.value.existing_id == existing_charge_id
+        mock_lock.assert_awaited_once_with(test_account_identity, Charge, "test-key-123")
+        db_session.rollback.assert_awaited_once()
+        db_session.add.assert_not_called()
+
+    async def test_lock_checking_idempotency_is_one_query(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Idempotency lookup rides along with the account lock in a single statement."""
+        from sqlalchemy.dialects import postgresql
+
+        account = create_mock_account(test_account_identity)
+        existing_id = uuid4()
+        db_session.execute.return_value.one_or_none = MagicMock(return_value=(account, existing_id))
+        service = BillingService(db_session)
+
+        result = await service._lock_account_checking_idempotency(
+            test_account_identity, Charge, "test-key-123"
+        )
+
+        assert result == (account, existing_id)
+        db_session.execute.assert_awaited_once()
+        stmt = db_session.execute.await_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "FROM charges" in sql
+        assert sql.rstrip().endswith("FOR NO KEY UPDATE OF accounts")
+
 
 class TestCreditAddition:
     """Tests for credit addition operations."""
@@ -520,6 +617,31 @@ class TestCreditAddition:
                 with pytest.raises(AccountNotFoundError):
                     await service.add_credits(intent)
 
+    async def test_add_credits_currency_mismatch_releases_lock(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """A credit in another currency is rejected and the row lock released."""
+        service = BillingService(db_session)
+
+        with patch.object(service, "_lock_account_for_update", new_callable=AsyncMock) as mock_lock:
+            mock_lock.return_value = create_mock_account(test_account_identity)
+
+            intent = CreditIntent(
+                account_identity=test_account_identity,
+                amount_minor=500,
+                currency="EUR",
+                description="Test credit",
+                transaction_type=TransactionType.PURCHASE,
+                external_transaction_id=None,
+                idempotency_key=None,
+            )
+
+            with pytest.raises(DataIntegrityError, match="Currency mismatch"):
+                await service.add_credits(intent)
+
+        db_session.rollback.assert_awaited_once()
+        db_session.add.assert_not_called()
+
     async def test_add_credits_with_is_test_true(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
     ) -> None:
@@ -708,25 +830,14 @@ class TestAccountManagement:
 
         service = BillingService(db_session)
 
-        # Capture the account that's added
-        added_account = None
-
-        def capture_add(obj):
-            nonlocal added_account
-            if hasattr(obj, "oauth_provider"):
-                obj.id = mock_account.id
-                added_account = obj
-
-        db_session.add = MagicMock(side_effect=capture_add)
-        db_session.get = AsyncMock(return_value=mock_account)
-
-        with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
-        ) as mock_find:
+        with (
+            patch.object(service, "_find_account_by_identity", new_callable=AsyncMock) as mock_find,
+            patch.object(
+                service, "_insert_account_if_absent", new_callable=AsyncMock
+            ) as mock_insert,
+        ):
             mock_find.return_value = None  # Account doesn't exist
-
-            db_session.flush = AsyncMock()
-            db_session.commit = AsyncMock()
+            mock_insert.return_value = mock_account
 
             result = await service.get_or_create_account(
                 test_account_identity,
@@ -737,7 +848,8 @@ class TestAccountManagement:
 
         assert result.oauth_provider == test_account_identity.oauth_provider
         assert result.external_id == test_account_identity.external_id
-        db_session.add.assert_called()
+        mock_insert.assert_awaited_once()
+        db_session.commit.assert_awaited_once()
 
     async def test_get_or_create_account_returns_existing(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
@@ -797,93 +909,124 @@ class TestAccountManagement:
 class TestDisplayName:
     """Tests for display_name functionality."""
 
+    @staticmethod
+    def _update_sql(db_session: AsyncMock) -> str:
+        """Render the UPDATE issued by update_account_metadata."""
+        from sqlalchemy.dialects import postgresql
+
+        db_session.execute.assert_awaited_once()
+        stmt = db_session.execute.await_args.args[0]
+        return str(stmt.compile(dialect=postgresql.dialect()))
+
     async def test_update_account_metadata_sets_display_name(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
     ) -> None:
-        """Test that update_account_metadata sets display_name."""
-        mock_account = create_mock_account(test_account_identity, display_name=None)
-
+        """Test that update_account_metadata sets display_name in one UPDATE."""
         service = BillingService(db_session)
 
-        with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
-        ) as mock_find:
-            mock_find.return_value = mock_account
-
-            await service.update_account_metadata(
-                identity=test_account_identity,
-                display_name="John Doe",
-            )
+        await service.update_account_metadata(
+            identity=test_account_identity,
+            display_name="John Doe",
+        )
 
-        assert mock_account.display_name == "John Doe"
-        db_session.commit.assert_called()
+        sql = self._update_sql(db_session)
+        assert sql.startswith("UPDATE accounts SET display_name=")
+        assert "accounts.display_name IS DISTINCT FROM" in sql
+        db_session.commit.assert_awaited_once()
 
-    async def test_update_account_metadata_updates_display_name(
+    async def test_update_account_metadata_targets_oldest_duplicate(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
     ) -> None:
-        """Test that update_account_metadata updates existing display_name."""
-        mock_account = create_mock_account(test_account_identity, display_name="Old Name")
-
+        """With duplicate accounts only the oldest is updated, as before the single UPDATE."""
         service = BillingService(db_session)
 
-        with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
-        ) as mock_find:
-            mock_find.return_value = mock_account
-
-            await service.update_account_metadata(
-                identity=test_account_identity,
-                display_name="New Name",
-            )
+        await service.update_account_metadata(
+            identity=test_account_identity,
+            display_name="John Doe",
+        )
 
-        assert mock_account.display_name == "New Name"
-        db_session.commit.assert_called()
+        sql = self._update_sql(db_session)
+        assert "WHERE accounts.id = (SELECT accounts.id" in sql
+        assert "ORDER BY accounts.created_at ASC" in sql
+        assert "LIMIT" in sql
 
     async def test_update_account_metadata_no_change_when_same(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
     ) -> None:
-        """Test that update_account_metadata doesn't commit when name unchanged."""
-        mock_account = create_mock_account(test_account_identity, display_name="Same Name")
-
+        """Test that update_account_metadata doesn't commit when no row changed."""
+        db_session.execute.return_value.first = MagicMock(return_value=None)
         service = BillingService(db_session)
 
-        with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
-        ) as mock_find:
-            mock_find.return_value = mock_account
+        await service.update_account_metadata(
+            identity=test_account_identity,
+            display_name="Same Name",
+        )
 
+        # Should not commit when value is unchanged (or the account is missing)
+        db_session.commit.assert_not_called()
+
+    async def test_update_account_metadata_no_change_logs_at_debug(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """The no-change path (the common case) only logs at debug level."""
+        db_session.execute.return_value.first = MagicMock(return_value=None)
+        service = BillingService(db_session)
+
+        with patch("app.services.billing.logger") as mock_logger:
             await service.update_account_metadata(
                 identity=test_account_identity,
                 display_name="Same Name",
             )
 
-        # Should not commit when value is unchanged
+        mock_logger.debug.assert_called_once()
+        mock_logger.info.assert_not_called()
+
+    async def test_update_account_metadata_nothing_provided(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Test that update_account_metadata skips the query when no field is given."""
+        service = BillingService(db_session)
+
+        await service.update_account_metadata(identity=test_account_identity)
+
+        db_session.execute.assert_not_called()
         db_session.commit.assert_not_called()
 
     async def test_update_account_metadata_with_email_and_name(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
     ) -> None:
         """Test that update_account_metadata can update both email and name."""
-        mock_account = create_mock_account(
-            test_account_identity, customer_email=None, display_name=None
+        service = BillingService(db_session)
+
+        await service.update_account_metadata(
+            identity=test_account_identity,
+            customer_email="user@example.com",
+            display_name="Jane Doe",
         )
 
-        service = BillingService(db_session)
+        sql = self._update_sql(db_session)
+        assert "customer_email=" in sql
+        assert "display_name=" in sql
+        assert "user_role=" not in sql
+        db_session.commit.assert_awaited_once()
 
-        with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
-        ) as mock_find:
-            mock_find.return_value = mock_account
+    async def test_update_account_metadata_opt_in_stamped_only_on_change(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Opt-in timestamp and source are only overwritten when the opt-in changes."""
+        service = BillingService(db_session)
 
-            await service.update_account_metadata(
-                identity=test_account_identity,
-                customer_email="user@example.com",
-                display_name="Jane Doe",
-            )
+        await service.update_account_metadata(
+            identity=test_account_identity,
+            marketing_opt_in=True,
+            marketing_opt_in_source="web",
+        )
 
-        assert mock_account.customer_email == "user@example.com"
-        assert mock_account.display_name == "Jane Doe"
-        db_session.commit.assert_called()
+        sql = self._update_sql(db_session)
+        assert (
+            "marketing_opt_in_at=CASE WHEN (accounts.marketing_opt_in IS DISTINCT FROM true)" in sql
+        )
+        assert "ELSE accounts.marketing_opt_in_source END" in sql
 
     async def test_get_or_create_account_with_display_name(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
@@ -891,26 +1034,14 @@ class TestDisplayName:
         """Test account creation includes display_name."""
         service = BillingService(db_session)
 
-        # Track the account that gets added (ignore ProductInventory objects)
-        added_account = None
-
-        def capture_add(obj):
-            nonlocal added_account
-            # Only capture Account objects, not ProductInventory
-            if isinstance(obj, Account):
-                added_account = obj
-
-        db_session.add = MagicMock(side_effect=capture_add)
-
-        with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
-        ) as mock_find:
+        with (
+            patch.object(service, "_find_account_by_identity", new_callable=AsyncMock) as mock_find,
+            patch.object(
+                service, "_insert_account_if_absent", new_callable=AsyncMock
+            ) as mock_insert,
+        ):
             mock_find.return_value = None  # Account doesn't exist
-
-            db_session.flush = AsyncMock()
-            db_session.commit = AsyncMock()
-            # Mock session.get to return the added account after flush
-            db_session.get = AsyncMock(side_effect=lambda model, id: added_account)
+            mock_insert.return_value = create_mock_account(test_account_identity)
 
             await service.get_or_create_account(
                 test_account_identity,
@@ -921,11 +1052,10 @@ class TestDisplayName:
                 display_name="Test User",
             )
 
-        # Check that add was called with an account
-        assert added_account is not None
-        # The account should have the display_name set
-        assert added_account.display_name == "Test User"
-        assert added_account.customer_email == "user@example.com"
+        # The inserted row should have the display_name set
+        insert_values = mock_insert.await_args.kwargs
+        assert insert_values["display_name"] == "Test User"
+        assert insert_values["customer_email"] == "user@example.com"
 
 
 class TestDuplicateAccountHandling:
@@ -999,12 +1129,24 @@ class TestDuplicateAccountHandling:
         assert result is not None
         assert result.created_at == older_account.created_at
 
-    async def test_get_or_create_handles_integrity_error_race(
+    async def test_lock_account_takes_no_key_update_lock(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
     ) -> None:
-        """Test get_or_create_account handles IntegrityError from race condition."""
-        from sqlalchemy.exc import IntegrityError
+        """The account lock does not block foreign-key inserts referencing the account."""
+        from sqlalchemy.dialects import postgresql
 
+        service = BillingService(db_session)
+
+        await service._lock_account_for_update(test_account_identity)
+
+        stmt = db_session.execute.await_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert sql.rstrip().endswith("FOR NO KEY UPDATE OF accounts")
+
+    async def test_get_or_create_handles_insert_conflict_race(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Test get_or_create_account returns the row a concurrent request created."""
         existing_account = create_mock_account(test_account_identity, paid_credits=10)
 
         service = BillingService(db_session)
@@ -1016,20 +1158,172 @@ class TestDuplicateAccountHandling:
             find_call_count += 1
             if find_call_count == 1:
                 return None  # First call: no account exists
-            return existing_account  # After IntegrityError: account exists
-
-        # Flush raises IntegrityError (constraint violation from race)
-        db_session.flush = AsyncMock(
-            side_effect=IntegrityError("duplicate key", None, None)
-        )
-        db_session.rollback = AsyncMock()
-
-        with patch.object(service, "_find_account_by_identity", side_effect=mock_find):
+            return existing_account  # After the conflict: account exists
+
+        # ON CONFLICT DO NOTHING returned no row (concurrent create won)
+        with (
+            patch.object(service, "_find_account_by_identity", side_effect=mock_find),
+            patch.object(
+                service, "_insert_account_if_absent", new_callable=AsyncMock
+            ) as mock_insert,
+        ):
+            mock_insert.return_value = None
             result = await service.get_or_create_account(
                 test_account_identity,
                 initial_balance_minor=0,
             )
 
-        # Should return the existing account after handling the race
+        # Should return the existing account without rolling back the session
         assert result.paid_credits == 10
-        db_session.rollback.assert_called_once()
+        db_session.rollback.assert_not_called()
+        db_session.commit.assert_not_called()
+
+    async def test_insert_account_if_absent_uses_on_conflict(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Account creation is a single INSERT ... ON CONFLICT DO NOTHING RETURNING."""
+        from sqlalchemy.dialects import postgresql
+
+        result = await BillingService(db_session)._insert_account_if_absent(
+            test_account_identity, plan_name="free"
+        )
+
+        assert result is None  # Default mock result: conflict, no row returned
+        (stmt,) = db_session.execute.await_args.args
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (oauth_provider, external_id) DO NOTHING" in sql
+        assert "RETURNING" in sql
+
+
+class TestWriteVerification:
+    """Tests for optional post-write verification."""
+
+    async def test_skipped_by_default(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Without verify_writes, no read-back query is issued."""
+        account = create_mock_account(test_account_identity, paid_credits=5)
+
+        await BillingService(db_session)._verify_account_write(account, paid_credits=5)
+
+        db_session.refresh.assert_not_awaited()
+
+    async def test_mismatch_detected_when_enabled(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """With verify_writes, the row is re-read and mismatches raise."""
+        account = create_mock_account(test_account_identity, paid_credits=4)
+
+        with patch("app.config.settings.verify_writes", True):
+            with pytest.raises(DataIntegrityError, match="Paid credits mismatch"):
+                await BillingService(db_session)._verify_account_write(account, paid_credits=5)
+
+        db_session.refresh.assert_awaited_once_with(
+            account,
+            attribute_names=("paid_credits", "free_uses_remaining", "daily_free_uses_remaining"),
+        )
+
+
+class TestCreditCheckAuditBuffer:
+    """Tests for buffered credit check audit rows."""
+
+    @pytest.fixture(autouse=True)
+    def _empty_buffer(self):
+        _credit_check_buffer.clear()
+        yield
+        _credit_check_buffer.clear()
+
+    async def test_check_credit_buffers_audit_row(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """The audit row is buffered, not added to the request's session."""
+        mock_account = create_mock_account(
+            test_account_identity,
+            daily_free_uses_reset_at=datetime.now(UTC) + timedelta(hours=12),
+        )
+        service = BillingService(db_session)
+
+        with patch.object(
+            service, "_find_account_row_for_check", new_callable=AsyncMock
+        ) as mock_find:
+            mock_find.return_value = mock_account
+            await service.check_credit(test_account_identity)
+
+        (check,) = _credit_check_buffer
+        assert check.account_id == mock_account.id
+        assert check.created_at is not None
+        db_session.add.assert_not_called()
+        db_session.commit.assert_not_awaited()
+
+    async def test_full_buffer_drops_rows(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Audit rows are dropped rather than growing the buffer without bound."""
+        service = BillingService(db_session)
+
+        with patch("app.services.billing._MAX_CREDIT_CHECK_BUFFER", 1):
+            for _ in range(2):
+                service._log_credit_check(test_account_identity, None, None, datetime.now(UTC))
+
+        assert len(_credit_check_buffer) == 1
+
+    async def test_empty_buffer_is_noop(self) -> None:
+        """Nothing buffered means no commit."""
+        session = AsyncMock()
+
+        assert await flush_credit_checks(session) == 0
+        session.commit.assert_not_awaited()
+
+    async def test_flush_writes_all_rows_in_one_commit(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Buffered rows go out as one Core executemany INSERT, committed once, and cleared."""
+        service = BillingService(db_session)
+        for _ in range(3):
+            service._log_credit_check(test_account_identity, None, None, datetime.now(UTC))
+        session = AsyncMock()
+
+        assert await flush_credit_checks(session) == 3
+        stmt, rows = session.execute.await_args.args
+        assert stmt.table.name == "credit_checks"
+        assert len(rows) == 3
+        assert rows[0]["external_id"] == test_account_identity.external_id
+        session.add_all.assert_not_called()
+        session.commit.assert_awaited_once()
+        assert _credit_check_buffer == []
+
+    async def test_failed_flush_requeues_rows_first(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """Failed writes are requeued ahead of rows buffered meanwhile."""
+        service = BillingService(db_session)
+        service._log_credit_check(test_account_identity, None, None, datetime.now(UTC))
+        (old,) = _credit_check_buffer
+
+        async def fail() -> None:
+            service._log_credit_check(test_account_identity, None, None, datetime.now(UTC))
+            raise RuntimeError("db down")
+
+        session = MagicMock(execute=AsyncMock(), commit=fail)
+
+        with pytest.raises(RuntimeError):
+            await flush_credit_checks(session)
+
+        assert len(_credit_check_buffer) == 2
+        assert _credit_check_buffer[0] is old
+        assert len(_credit_check_buffer) <= _MAX_CREDIT_CHECK_BUFFER
+
+    async def test_cancelled_flush_requeues_rows(
+        self, db_session: AsyncMock, test_account_identity: AccountIdentity
+    ) -> None:
+        """A flush cancelled mid-write (e.g. at shutdown) puts its rows back."""
+        service = BillingService(db_session)
+        service._log_credit_check(test_account_identity, None, None, datetime.now(UTC))
+        (pending,) = _credit_check_buffer
+
+        session = MagicMock(execute=AsyncMock(side_effect=asyncio.CancelledError))
+
+        with pytest.raises(asyncio.CancelledError):
+            await flush_credit_checks(session)
+
+        assert _credit_check_buffer == [pending]
@@ -110,6 +110,25 @@ class TestDailyFreeUsesReset:
         # Should have UTC timezone
         assert reset_time.tzinfo == UTC
 
+    def test_helpers_use_given_now(self) -> None:
+        """An explicit request timestamp is used instead of the wall clock."""
+        now = datetime(2025, 3, 31, 23, 59, 59, tzinfo=UTC)
+
+        assert _should_reset_daily_uses(now, now) is True
+        assert _should_reset_daily_uses(now + timedelta(seconds=1), now) is False
+        assert _get_next_reset_time(now) == datetime(2025, 4, 1, tzinfo=UTC)
+
+    def test_next_reset_time_cached_per_day(self) -> None:
+        """The midnight boundary is reused within a day and recomputed after it."""
+        morning = datetime(2025, 3, 31, 8, tzinfo=UTC)
+        evening = datetime(2025, 3, 31, 20, tzinfo=UTC)
+
+        first = _get_next_reset_time(morning)
+        assert _get_next_reset_time(evening) is first
+        assert _get_next_reset_time(evening + timedelta(hours=4)) == datetime(
+            2025, 4, 2, tzinfo=UTC
+        )
+
 
 class TestCreditCheckDailyFreeUses:
     """Tests for credit check with daily free uses."""
@@ -131,10 +150,10 @@ class TestCreditCheckDailyFreeUses:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             mock_find.return_value = mock_account
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
+            with patch.object(service, "_log_credit_check"):
                 result = await service.check_credit(test_account_identity)
 
         assert result.has_credit is True
@@ -160,10 +179,10 @@ class TestCreditCheckDailyFreeUses:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             mock_find.return_value = mock_account
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
+            with patch.object(service, "_log_credit_check"):
                 db_session.flush = AsyncMock()
                 db_session.commit = AsyncMock()
 
@@ -172,9 +191,15 @@ class TestCreditCheckDailyFreeUses:
         # Should show full daily free uses after reset
         assert result.has_credit is True
         assert result.daily_free_uses_remaining == 2
-        # Account should have been updated
-        assert mock_account.daily_free_uses_remaining == 2
-        assert mock_account.daily_free_uses_reset_at is not None
+        # Account should have been updated, guarded on the reset time that was read
+        from sqlalchemy.dialects import postgresql
+
+        stmt = db_session.execute.await_args.args[0]
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        assert "accounts.daily_free_uses_reset_at IS NOT DISTINCT FROM" in str(compiled)
+        assert compiled.params["daily_free_uses_remaining"] == 2
+        assert compiled.params["daily_free_uses_reset_at"] > _utc_now()
+        db_session.commit.assert_awaited_once()
 
     async def test_credit_check_no_credit_when_all_exhausted(
         self, db_session: AsyncMock, test_account_identity: AccountIdentity
@@ -193,10 +218,10 @@ class TestCreditCheckDailyFreeUses:
         service = BillingService(db_session)
 
         with patch.object(
-            service, "_find_account_by_identity", new_callable=AsyncMock
+            service, "_find_account_row_for_check", new_callable=AsyncMock
         ) as mock_find:
             mock_find.return_value = mock_account
-            with patch.object(service, "_log_credit_check", new_callable=AsyncMock):
+            with patch.object(service, "_log_credit_check"):
                 result = await service.check_credit(test_account_identity)
 
         assert result.has_credit is False
@@ -497,26 +522,22 @@ class TestMultipleDailyUsesInDay:
         for i in range(3):
             mock_charge = create_mock_charge(mock_account.id)
             with patch.object(
-                service, "_find_charge_by_idempotency", new_callable=AsyncMock
-            ) as mock_idemp:
-                mock_idemp.return_value = None
-
-                with patch.object(
-                    service, "_lock_account_for_update", new_callable=AsyncMock
-                ) as mock_get:
-                    mock_get.return_value = mock_account
-                    db_session.get = AsyncMock(side_effect=[mock_charge, mock_account])
-
-                    intent = ChargeIntent(
-                        account_identity=test_account_identity,
-                        amount_minor=1,
-                        currency="USD",
-                        description=f"Test charge {i+1}",
-                        metadata=ChargeMetadata(),
-                        idempotency_key=f"key-{i}",
-                    )
+                service, "_lock_account_checking_idempotency", new_callable=AsyncMock
+            ) as mock_lock:
+                mock_lock.return_value = (mock_account, None)  # No existing charge
 
-                    await service.create_charge(intent)
+                db_session.get = AsyncMock(side_effect=[mock_charge, mock_account])
+
+                intent = ChargeIntent(
+                    account_identity=test_account_identity,
+                    amount_minor=1,
+                    currency="USD",
+                    description=f"Test charge {i+1}",
+                    metadata=ChargeMetadata(),
+                    idempotency_key=f"key-{i}",
+                )
+
+                await service.create_charge(intent)
 
         # First 2 should use daily free, 3rd should use paid
         assert mock_account.daily_free_uses_remaining == 0
@@ -286,6 +286,27 @@ class TestGetApiKey:
             assert result == expected_data
             service.validate_api_key.assert_called_once_with("cbk_test_validkey123")
 
+    @pytest.mark.asyncio
+    async def test_validation_timeout_raises_503(self):
+        """A stalled validation fails fast with 503."""
+        import asyncio
+
+        db_session = AsyncMock()
+
+        async def stall(_key):
+            await asyncio.sleep(1)
+
+        with (
+            patch("app.api.dependencies.APIKeyService") as MockService,
+            patch("app.api.dependencies.settings.api_key_validation_timeout_seconds", 0.01),
+        ):
+            MockService.return_value.validate_api_key = stall
+
+            with pytest.raises(HTTPException) as exc_info:
+                await get_api_key("cbk_test_slowkey123", db_session)
+
+        assert exc_info.value.status_code == 503
+
     @pytest.mark.asyncio
     async def test_invalid_key_raises_401(self):
         """Invalid API key raises 401."""
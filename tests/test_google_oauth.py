@@ -0,0 +1,243 @@
+"""
+Tests for Google OAuth Provider.
+
+Tests token exchange and user info lookup for admin login.
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.services import google_jwks, google_oauth
+from app.services.google_oauth import GoogleOAuthProvider
+
+
+@pytest.fixture(autouse=True)
+def reset_signing_keys():
+    """Each test starts without cached Google signing keys."""
+    google_jwks._jwks = None
+    google_jwks._jwks_lock = asyncio.Lock()
+    yield
+    google_jwks._jwks = None
+
+
+def _provider(client: httpx.AsyncClient | None = None) -> GoogleOAuthProvider:
+    return GoogleOAuthProvider(
+        client_id="client-id", client_secret="client-secret", http_client=client
+    )
+
+
+class TestHttpClient:
+    """Tests for HTTP client handling."""
+
+    @pytest.mark.asyncio
+    async def test_injected_client_used(self):
+        """Requests go through the injected client."""
+        seen: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            token = await _provider(client).exchange_code_for_token("code", "https://cb")
+
+        assert token.access_token == "token"
+        assert seen[0].url.host == "oauth2.googleapis.com"
+
+    @pytest.mark.asyncio
+    async def test_shared_client_reused_across_providers(self):
+        """Providers without an injected client share one pooled client."""
+        try:
+            first = _provider().http_client
+            second = _provider().http_client
+            assert first is second
+        finally:
+            await google_oauth.close_http_client()
+
+    @pytest.mark.asyncio
+    async def test_shared_client_recreated_after_close(self):
+        """Closing the shared client at shutdown does not break later providers."""
+        first = _provider().http_client
+        await google_oauth.close_http_client()
+        try:
+            assert first.is_closed
+            assert _provider().http_client is not first
+        finally:
+            await google_oauth.close_http_client()
+
+
+class TestAuthorizationUrl:
+    """Tests for the consent screen URL."""
+
+    def test_url_carries_all_params(self):
+        """Fixed and per-login params are all present and encoded."""
+        url = _provider().get_authorization_url("st&te", "https://billing.ciris.ai/cb?x=1")
+
+        parts = urlsplit(url)
+        assert f"{parts.scheme}://{parts.netloc}{parts.path}" == GoogleOAuthProvider.AUTH_URL
+        assert parse_qs(parts.query) == {
+            "client_id": ["client-id"],
+            "response_type": ["code"],
+            "scope": ["openid email profile"],
+            "access_type": ["offline"],
+            "prompt": ["select_account"],
+            "hd": ["ciris.ai"],
+            "redirect_uri": ["https://billing.ciris.ai/cb?x=1"],
+            "state": ["st&te"],
+        }
+
+
+class TestGetUserInfo:
+    """Tests for user info lookup."""
+
+    @pytest.mark.asyncio
+    async def test_ciris_user_returned(self):
+        """A @ciris.ai account maps to OAuthUser."""
+        transport = httpx.MockTransport(
+            lambda _request: httpx.Response(
+                200, json={"id": "123", "email": "admin@ciris.ai", "name": "Admin"}
+            )
+        )
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            user = await _provider(client).get_user_info("token")
+
+        assert user.id == "123"
+        assert user.email == "admin@ciris.ai"
+
+    @pytest.mark.asyncio
+    async def test_other_domain_rejected(self):
+        """Non-@ciris.ai accounts are rejected."""
+        transport = httpx.MockTransport(
+            lambda _request: httpx.Response(200, json={"id": "1", "email": "x@gmail.com"})
+        )
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            with pytest.raises(ValueError, match="Only @ciris.ai emails"):
+                await _provider(client).get_user_info("token")
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    """RSA key standing in for one of Google's ID token signing keys."""
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwks_body(signing_key, kid: str = "key-1") -> dict:
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(signing_key.public_key()))
+    return {"keys": [{**jwk, "kid": kid, "alg": "RS256", "use": "sig"}]}
+
+
+def _id_token(signing_key, kid: str = "key-1", **overrides) -> str:
+    now = int(time.time())
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": "client-id",
+        "sub": "1234567890",
+        "email": "admin@ciris.ai",
+        "email_verified": True,
+        "hd": "ciris.ai",
+        "name": "Admin",
+        "iat": now,
+        "exp": now + 3600,
+        **overrides,
+    }
+    return jwt.encode(claims, signing_key, algorithm="RS256", headers={"kid": kid})
+
+
+class TestVerifyIdToken:
+    """Tests for offline ID token validation."""
+
+    @staticmethod
+    def _jwks_transport(signing_key, calls: list[httpx.Request]) -> httpx.MockTransport:
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            assert request.url.path == "/oauth2/v3/certs"
+            return httpx.Response(200, json=_jwks_body(signing_key))
+
+        return httpx.MockTransport(handler)
+
+    @pytest.mark.asyncio
+    async def test_valid_token_returns_user(self, signing_key):
+        """Claims from a valid ID token map to OAuthUser."""
+        calls: list[httpx.Request] = []
+
+        async with httpx.AsyncClient(transport=self._jwks_transport(signing_key, calls)) as client:
+            user = await _provider(client).verify_id_token(_id_token(signing_key))
+
+        assert user.id == "1234567890"
+        assert user.email == "admin@ciris.ai"
+        assert user.name == "Admin"
+
+    @pytest.mark.asyncio
+    async def test_signing_keys_cached(self, signing_key):
+        """Google's JWKS is fetched once for repeated logins."""
+        calls: list[httpx.Request] = []
+
+        async with httpx.AsyncClient(transport=self._jwks_transport(signing_key, calls)) as client:
+            provider = _provider(client)
+            await provider.verify_id_token(_id_token(signing_key))
+            await provider.verify_id_token(_id_token(signing_key))
+
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_wrong_audience_rejected(self, signing_key):
+        """ID tokens issued to another client are rejected."""
+        calls: list[httpx.Request] = []
+        token = _id_token(signing_key, aud="someone-else")
+
+        async with httpx.AsyncClient(transport=self._jwks_transport(signing_key, calls)) as client:
+            with pytest.raises(ValueError, match="Invalid ID token"):
+                await _provider(client).verify_id_token(token)
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_rejected(self, signing_key):
+        """ID tokens signed with a key Google does not publish are rejected."""
+        calls: list[httpx.Request] = []
+        token = _id_token(signing_key, kid="unknown")
+
+        async with httpx.AsyncClient(transport=self._jwks_transport(signing_key, calls)) as client:
+            with pytest.raises(ValueError, match="Invalid ID token"):
+                await _provider(client).verify_id_token(token)
+
+    @pytest.mark.asyncio
+    async def test_other_domain_rejected_before_key_fetch(self, signing_key):
+        """Tokens without the ciris.ai hd claim are rejected without any network call."""
+        calls: list[httpx.Request] = []
+        token = _id_token(signing_key, email="x@gmail.com", hd=None)
+
+        async with httpx.AsyncClient(transport=self._jwks_transport(signing_key, calls)) as client:
+            with pytest.raises(ValueError, match="Only @ciris.ai accounts"):
+                await _provider(client).verify_id_token(token)
+
+        assert not calls
+
+    @pytest.mark.asyncio
+    async def test_email_outside_domain_rejected(self, signing_key):
+        """A ciris.ai hd claim does not admit an email under another domain."""
+        calls: list[httpx.Request] = []
+        token = _id_token(signing_key, email="x@gmail.com")
+
+        async with httpx.AsyncClient(transport=self._jwks_transport(signing_key, calls)) as client:
+            with pytest.raises(ValueError, match="Only @ciris.ai emails"):
+                await _provider(client).verify_id_token(token)
+
+    @pytest.mark.asyncio
+    async def test_exchange_returns_id_token(self):
+        """The token exchange passes Google's ID token through."""
+        transport = httpx.MockTransport(
+            lambda _request: httpx.Response(200, json={"access_token": "a", "id_token": "jwt"})
+        )
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            token = await _provider(client).exchange_code_for_token("code", "https://cb")
+
+        assert token.id_token == "jwt"
@@ -73,6 +73,17 @@ class TestGooglePlayPurchaseToken:
         with pytest.raises(AttributeError):
             token.token = "new_token"  # type: ignore[misc]
 
+    def test_slotted(self):
+        """Test that GooglePlayPurchaseToken has no per-instance __dict__."""
+        token = GooglePlayPurchaseToken(
+            token="test_token_12345",
+            product_id="credits_100",
+            package_name="ai.ciris.agent",
+        )
+
+        assert not hasattr(token, "__dict__")
+        assert GooglePlayPurchaseToken.__slots__ == ("token", "product_id", "package_name")
+
 
 class TestGooglePlayPurchaseVerification:
     """Tests for GooglePlayPurchaseVerification."""
@@ -223,6 +234,21 @@ class TestGooglePlayPurchaseVerification:
         with pytest.raises(AttributeError):
             verification.purchase_state = 1  # type: ignore[misc]
 
+    def test_slotted(self):
+        """Test that GooglePlayPurchaseVerification has no per-instance __dict__."""
+        verification = GooglePlayPurchaseVerification(
+            order_id="GPA.1234-5678-9012",
+            purchase_token="test_token_12345",
+            product_id="credits_100",
+            package_name="ai.ciris.agent",
+            purchase_time_millis=1700000000000,
+            purchase_state=0,
+            acknowledgement_state=0,
+            consumption_state=0,
+        )
+
+        assert not hasattr(verification, "__dict__")
+
 
 class TestGooglePlayWebhookEvent:
     """Tests for GooglePlayWebhookEvent."""
@@ -256,3 +282,17 @@ class TestGooglePlayWebhookEvent:
 
         with pytest.raises(AttributeError):
             event.event_type = "product_canceled"  # type: ignore[misc]
+
+    def test_slotted(self):
+        """Test that GooglePlayWebhookEvent has no per-instance __dict__."""
+        event = GooglePlayWebhookEvent(
+            event_id="msg_12345",
+            event_type="product_purchased",
+            purchase_token="test_token_12345",
+            product_id="credits_100",
+            package_name="ai.ciris.agent",
+            notification_type=1,
+            event_time_millis=1700000000000,
+        )
+
+        assert not hasattr(event, "__dict__")
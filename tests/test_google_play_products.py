@@ -90,6 +90,15 @@ class TestProductCatalog:
         assert GOOGLE_PLAY_PRODUCTS["credits_250"].credits == 249
         assert GOOGLE_PLAY_PRODUCTS["credits_600"].credits == 599
 
+    def test_catalog_pricing_is_ten_cents_per_credit(self):
+        """Only the $0.10/credit tiers are offered (no discounted duplicates)."""
+        assert {p.credits for p in GOOGLE_PLAY_PRODUCTS.values()} == {99, 249, 599}
+
+    def test_catalog_is_read_only(self):
+        """The catalog cannot be modified at runtime."""
+        with pytest.raises(TypeError):
+            GOOGLE_PLAY_PRODUCTS["credits_100"] = None  # type: ignore[index]
+
     def test_get_product_success(self):
         """Test getting existing product."""
         product = get_product("credits_100")
@@ -0,0 +1,400 @@
+"""
+Tests for Google Play Provider.
+
+Tests API client setup and Real-Time Developer Notification parsing.
+"""
+
+import asyncio
+import base64
+import json
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+
+import httpx
+import jwt
+import orjson
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.exceptions import PaymentProviderError, WebhookVerificationError
+from app.models.google_play import GooglePlayPurchaseToken
+from app.services import google_jwks, google_play_provider
+from app.services.google_play_provider import GooglePlayProvider
+
+
+@pytest.fixture(scope="module")
+def service_account_info():
+    """Service account credentials with a throwaway key."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return {
+        "type": "service_account",
+        "project_id": "ciris-test",
+        "private_key_id": "key-1",
+        "private_key": pem,
+        "client_email": "billing@ciris-test.iam.gserviceaccount.com",
+        "client_id": "1234567890",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_credentials():
+    """Each test starts without cached credentials."""
+    google_play_provider._credentials.clear()
+    yield
+    google_play_provider._credentials.clear()
+
+
+def _provider(service_account_info, client: httpx.AsyncClient) -> GooglePlayProvider:
+    """Provider with a still-valid bearer token, so no refresh is attempted."""
+    provider = GooglePlayProvider(service_account_info, "ai.ciris.agent", http_client=client)
+    provider.credentials.token = "bearer-token"
+    provider.credentials.expiry = datetime.now(UTC).replace(tzinfo=None) + timedelta(hours=1)
+    return provider
+
+
+_PURCHASE_TOKEN = GooglePlayPurchaseToken(
+    token="purchase_token_123", product_id="credits_100", package_name="ai.ciris.agent"
+)
+_PURCHASE_PATH = (
+    "/androidpublisher/v3/applications/ai.ciris.agent"
+    "/purchases/products/credits_100/tokens/purchase_token_123"
+)
+
+
+class TestCredentialsCache:
+    """Tests for per-account credentials reuse."""
+
+    def test_credentials_shared_across_providers(self, service_account_info):
+        """Providers for the same account reuse one set of credentials."""
+        first = GooglePlayProvider(service_account_info, "ai.ciris.agent")
+        second = GooglePlayProvider(dict(service_account_info), "ai.ciris.agent")
+
+        assert first.credentials is second.credentials
+
+    def test_other_account_gets_own_credentials(self, service_account_info):
+        """A different service account loads separate credentials."""
+        first = GooglePlayProvider(service_account_info, "ai.ciris.agent")
+        second = GooglePlayProvider(
+            {**service_account_info, "client_email": "other@ciris-test.iam.gserviceaccount.com"},
+            "ai.ciris.agent",
+        )
+
+        assert first.credentials is not second.credentials
+        assert len(google_play_provider._credentials) == 2
+
+    @pytest.mark.asyncio
+    async def test_shared_client_reused_across_providers(self, service_account_info):
+        """Providers without an injected client share one pooled client."""
+        try:
+            first = GooglePlayProvider(service_account_info, "ai.ciris.agent").http_client
+            second = GooglePlayProvider(service_account_info, "ai.ciris.agent").http_client
+            assert first is second
+        finally:
+            await google_play_provider.close_http_client()
+
+
+class TestPlayApi:
+    """Tests for Android Publisher API requests."""
+
+    @pytest.mark.asyncio
+    async def test_verify_purchase(self, service_account_info):
+        """verify_purchase GETs the purchase with the bearer token."""
+        seen: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(
+                200,
+                json={
+                    "orderId": "GPA.1",
+                    "purchaseTimeMillis": "1700000000000",
+                    "purchaseState": 0,
+                    "consumptionState": 0,
+                    "purchaseType": 0,
+                },
+            )
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            verification = await _provider(service_account_info, client).verify_purchase(
+                _PURCHASE_TOKEN
+            )
+
+        assert verification.order_id == "GPA.1"
+        assert verification.purchase_type == 0
+        assert seen[0].method == "GET"
+        assert seen[0].url.host == "androidpublisher.googleapis.com"
+        assert seen[0].url.path == _PURCHASE_PATH
+        assert seen[0].headers["Authorization"] == "Bearer bearer-token"
+
+    @pytest.mark.asyncio
+    async def test_verify_not_found(self, service_account_info):
+        """404 from Google maps to PaymentProviderError."""
+        transport = httpx.MockTransport(lambda _request: httpx.Response(404, text="not found"))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            with pytest.raises(PaymentProviderError, match="Purchase not found"):
+                await _provider(service_account_info, client).verify_purchase(_PURCHASE_TOKEN)
+
+    @pytest.mark.asyncio
+    async def test_consume_purchase(self, service_account_info):
+        """consume_purchase POSTs to the :consume method."""
+        seen: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(204)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await _provider(service_account_info, client).consume_purchase(
+                "purchase_token_123", "credits_100"
+            )
+
+        assert seen[0].method == "POST"
+        assert seen[0].url.path == f"{_PURCHASE_PATH}:consume"
+
+    @pytest.mark.asyncio
+    async def test_acknowledge_failure_raises(self, service_account_info):
+        """Acknowledgement errors map to PaymentProviderError."""
+        transport = httpx.MockTransport(lambda _request: httpx.Response(400, text="bad"))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            with pytest.raises(PaymentProviderError, match="Acknowledgement failed: bad"):
+                await _provider(service_account_info, client).acknowledge_purchase(
+                    "purchase_token_123", "credits_100"
+                )
+
+
+class TestBearerToken:
+    """Tests for service account token reuse."""
+
+    @staticmethod
+    def _expired_provider(service_account_info, client, refreshes: list[int]):
+        provider = _provider(service_account_info, client)
+        provider.credentials.expiry = datetime.now(UTC).replace(tzinfo=None) - timedelta(1)
+
+        def refresh(_request):
+            refreshes.append(threading.get_ident())
+            provider.credentials.token = "refreshed-token"
+            provider.credentials.expiry = datetime.now(UTC).replace(tzinfo=None) + timedelta(1)
+
+        provider.credentials.refresh = refresh
+        return provider
+
+    @pytest.mark.asyncio
+    async def test_valid_token_not_refreshed(self, service_account_info):
+        """A still-valid token is reused without a refresh."""
+        transport = httpx.MockTransport(lambda _request: httpx.Response(204))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = _provider(service_account_info, client)
+            provider.credentials.refresh = lambda _request: pytest.fail("unexpected refresh")
+            await provider.consume_purchase("purchase_token_123", "credits_100")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_refresh(self, service_account_info):
+        """Requests that find the token stale refresh it once, off the event loop."""
+        refreshes: list[int] = []
+        seen: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(204)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = self._expired_provider(service_account_info, client, refreshes)
+            other = GooglePlayProvider(service_account_info, "ai.ciris.agent", http_client=client)
+            await asyncio.gather(
+                *(
+                    p.consume_purchase("purchase_token_123", "credits_100")
+                    for p in [provider, other] * 3
+                )
+            )
+
+        assert len(refreshes) == 1
+        assert refreshes[0] != threading.get_ident()
+        assert {r.headers["Authorization"] for r in seen} == {"Bearer refreshed-token"}
+
+
+class TestVerifyWebhook:
+    """Tests for Real-Time Developer Notification parsing."""
+
+    @staticmethod
+    def _payload(notification_type: int) -> bytes:
+        notification = {
+            "version": "1.0",
+            "packageName": "ai.ciris.agent",
+            "eventTimeMillis": "1700000000000",
+            "oneTimeProductNotification": {
+                "version": "1.0",
+                "notificationType": notification_type,
+                "purchaseToken": "purchase_token_123",
+                "sku": "credits_100",
+            },
+        }
+        data = base64.b64encode(orjson.dumps(notification)).decode()
+        return orjson.dumps({"message": {"data": data, "messageId": "msg-1"}})
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("notification_type", "event_type"),
+        [(1, "product_purchased"), (2, "product_canceled"), (7, "unknown_7")],
+    )
+    async def test_event_types(self, service_account_info, notification_type, event_type):
+        """Notification types map to event type strings."""
+        provider = GooglePlayProvider(service_account_info, "ai.ciris.agent")
+
+        event = await provider.verify_webhook(self._payload(notification_type))
+
+        assert event.event_type == event_type
+        assert event.event_id == "msg-1"
+        assert event.purchase_token == "purchase_token_123"
+        assert event.product_id == "credits_100"
+        assert event.event_time_millis == 1700000000000
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_rejected(self, service_account_info):
+        """Malformed payloads raise WebhookVerificationError."""
+        provider = GooglePlayProvider(service_account_info, "ai.ciris.agent")
+
+        with pytest.raises(WebhookVerificationError, match="Invalid JSON payload"):
+            await provider.verify_webhook(b"{not json")
+
+    @pytest.mark.asyncio
+    async def test_invalid_notification_json_rejected(self, service_account_info):
+        """A message whose decoded data is not JSON raises WebhookVerificationError."""
+        provider = GooglePlayProvider(service_account_info, "ai.ciris.agent")
+        payload = orjson.dumps({"message": {"data": base64.b64encode(b"\xff{").decode()}})
+
+        with pytest.raises(WebhookVerificationError, match="Invalid JSON payload"):
+            await provider.verify_webhook(payload)
+
+
+class TestPushAuthentication:
+    """Tests for Pub/Sub push JWT verification."""
+
+    AUDIENCE = "https://billing.ciris.ai/v1/billing/webhooks/google-play"
+    SENDER = "pubsub-push@ciris-test.iam.gserviceaccount.com"
+
+    @pytest.fixture(autouse=True)
+    def clear_jwks(self):
+        """Each test fetches Google's keys afresh."""
+        google_jwks._jwks = None
+        google_jwks._jwks_lock = asyncio.Lock()
+        yield
+        google_jwks._jwks = None
+
+    @pytest.fixture(scope="class")
+    def google_key(self):
+        """RSA key standing in for one of Google's signing keys."""
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    @staticmethod
+    def _jwks_transport(google_key, calls: list[httpx.Request]) -> httpx.MockTransport:
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(google_key.public_key()))
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            await asyncio.sleep(0)  # Let concurrent verifications pile up on the lock
+            return httpx.Response(200, json={"keys": [{**jwk, "kid": "key-1", "alg": "RS256"}]})
+
+        return httpx.MockTransport(handler)
+
+    def _authorization(self, google_key, kid: str = "key-1", **overrides) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": self.AUDIENCE,
+            "email": self.SENDER,
+            "email_verified": True,
+            "iat": now,
+            "exp": now + 3600,
+            **overrides,
+        }
+        token = jwt.encode(claims, google_key, algorithm="RS256", headers={"kid": kid})
+        return f"Bearer {token}"
+
+    async def _verify(self, service_account_info, google_key, authorization, calls=None):
+        calls = [] if calls is None else calls
+        transport = self._jwks_transport(google_key, calls)
+        async with httpx.AsyncClient(transport=transport) as client:
+            provider = GooglePlayProvider(
+                service_account_info, "ai.ciris.agent", http_client=client
+            )
+            return await provider.verify_webhook(
+                TestVerifyWebhook._payload(1),
+                authorization=authorization,
+                audience=self.AUDIENCE,
+                service_account_email=self.SENDER,
+            )
+
+    @pytest.mark.asyncio
+    async def test_valid_token_accepted(self, service_account_info, google_key):
+        """A push signed by Google for our audience and sender is parsed."""
+        calls: list[httpx.Request] = []
+
+        for _ in range(2):
+            event = await self._verify(
+                service_account_info, google_key, self._authorization(google_key), calls
+            )
+
+        assert event.event_type == "product_purchased"
+        assert len(calls) == 1  # Keys are cached between webhooks
+
+    @pytest.mark.asyncio
+    async def test_missing_token_rejected(self, service_account_info, google_key):
+        """Pushes without a bearer token are rejected when an audience is configured."""
+        with pytest.raises(WebhookVerificationError, match="Missing Pub/Sub"):
+            await self._verify(service_account_info, google_key, None)
+
+    @pytest.mark.asyncio
+    async def test_wrong_audience_rejected(self, service_account_info, google_key):
+        """Tokens minted for another endpoint are rejected."""
+        authorization = self._authorization(google_key, aud="https://elsewhere.example")
+
+        with pytest.raises(WebhookVerificationError, match="Invalid Pub/Sub"):
+            await self._verify(service_account_info, google_key, authorization)
+
+    @pytest.mark.asyncio
+    async def test_unexpected_sender_rejected(self, service_account_info, google_key):
+        """Tokens from another service account are rejected."""
+        authorization = self._authorization(google_key, email="someone@example.com")
+
+        with pytest.raises(WebhookVerificationError, match="configured service account"):
+            await self._verify(service_account_info, google_key, authorization)
+
+    @pytest.mark.asyncio
+    async def test_unknown_kids_cannot_force_refetches(self, service_account_info, google_key):
+        """Tokens naming random kids share one JWKS fetch, then are rejected from cache."""
+        calls: list[httpx.Request] = []
+
+        results = await asyncio.gather(
+            *(
+                self._verify(
+                    service_account_info,
+                    google_key,
+                    self._authorization(google_key, kid=f"random-{i}"),
+                    calls,
+                )
+                for i in range(20)
+            ),
+            return_exceptions=True,
+        )
+        with pytest.raises(WebhookVerificationError, match="Invalid Pub/Sub"):
+            await self._verify(
+                service_account_info, google_key, self._authorization(google_key, kid="x"), calls
+            )
+        event = await self._verify(
+            service_account_info, google_key, self._authorization(google_key), calls
+        )
+
+        assert all(isinstance(r, WebhookVerificationError) for r in results)
+        assert event.event_type == "product_purchased"
+        assert len(calls) == 1
@@ -262,6 +262,19 @@ class TestProductInventoryService:
         db_session.add.assert_called_once()
         db_session.flush.assert_called_once()
 
+    def test_add_initial_inventories_stages_every_product(self, db_session, mock_account):
+        """add_initial_inventories stages one inventory per product without querying."""
+        db_session.add_all = MagicMock()
+
+        ProductInventoryService(db_session).add_initial_inventories(mock_account.id)
+
+        (inventories,) = db_session.add_all.call_args.args
+        assert [i.product_type for i in inventories] == list(PRODUCT_CONFIGS)
+        assert all(i.account_id == mock_account.id for i in inventories)
+        assert inventories[0].free_remaining == PRODUCT_CONFIGS["web_search"].free_initial
+        db_session.execute.assert_not_called()
+        db_session.flush.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_get_or_create_inventory_unknown_product_raises(self, db_session, mock_account):
         """get_or_create_inventory raises for unknown product type."""
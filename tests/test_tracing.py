@@ -0,0 +1,205 @@
+"""
+Tests for tracing setup.
+
+Guards the span processor choice so synchronous export cannot slip into production.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+
+from app.config import ConfigurationError
+from app.observability.tracing import (
+    _AttributeFilteringProcessor,
+    _build_span_processor,
+    _otlp_compression,
+)
+
+
+class TestBuildSpanProcessor:
+    """Tests for _build_span_processor."""
+
+    def test_batch_is_default(self):
+        """Default configuration builds a BatchSpanProcessor."""
+        processor = _build_span_processor(MagicMock())
+        try:
+            assert isinstance(processor, BatchSpanProcessor)
+        finally:
+            processor.shutdown()
+
+    def test_simple_allowed_outside_production(self):
+        """Simple export is allowed (with a warning) outside production."""
+        with (
+            patch("app.observability.tracing.settings.otel_processor_kind", "simple"),
+            patch("app.observability.tracing.settings.environment", "development"),
+        ):
+            processor = _build_span_processor(MagicMock())
+
+        assert isinstance(processor, SimpleSpanProcessor)
+
+    def test_simple_rejected_in_production(self):
+        """Simple export is refused in production."""
+        with (
+            patch("app.observability.tracing.settings.otel_processor_kind", "simple"),
+            patch("app.observability.tracing.settings.environment", "production"),
+        ):
+            with pytest.raises(ConfigurationError):
+                _build_span_processor(MagicMock())
+
+    def test_unknown_kind_rejected(self):
+        """Unknown processor kinds fail fast."""
+        with patch("app.observability.tracing.settings.otel_processor_kind", "sync"):
+            with pytest.raises(ConfigurationError):
+                _build_span_processor(MagicMock())
+
+
+class TestOtlpCompression:
+    """Tests for _otlp_compression."""
+
+    def test_gzip_is_default(self):
+        """Exports are gzip-compressed by default."""
+        from grpc import Compression
+
+        assert _otlp_compression() == Compression.Gzip
+
+    def test_unknown_codec_rejected(self):
+        """Unknown codecs fail fast."""
+        with patch("app.observability.tracing.settings.otlp_compression", "brotli"):
+            with pytest.raises(ConfigurationError):
+                _otlp_compression()
+
+
+class TestTraceOperation:
+    """Tests for the trace_operation context manager."""
+
+    @pytest.fixture
+    def exporter(self):
+        """Route the operations tracer to an in-memory exporter."""
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        with patch(
+            "app.observability.tracing._ops_tracer",
+            return_value=provider.get_tracer("app.operations"),
+        ):
+            yield exporter
+
+    def test_span_is_current_with_attributes(self, exporter):
+        """Span is current inside the block and carries filtered attributes."""
+        from opentelemetry import trace
+
+        from app.observability.tracing import trace_operation
+
+        with trace_operation("charge_creation", amount=100, account=object, skip=None) as span:
+            assert trace.get_current_span() is span
+
+        (finished,) = exporter.get_finished_spans()
+        assert finished.name == "charge_creation"
+        assert finished.attributes["amount"] == 100
+        assert finished.attributes["account"] == str(object)
+        assert "skip" not in finished.attributes
+
+    def test_container_attributes_rendered_as_json(self, exporter):
+        """Dicts and lists become JSON; unserializable containers fall back to str()."""
+        from app.observability.tracing import trace_operation
+
+        opaque = [object()]
+        with trace_operation("op", meta={"a": 1}, ids=[1, 2], opaque=opaque):
+            pass
+
+        (finished,) = exporter.get_finished_spans()
+        assert finished.attributes["meta"] == '{"a":1}'
+        assert finished.attributes["ids"] == "[1,2]"
+        assert finished.attributes["opaque"] == str(opaque)
+
+    def test_exception_marks_span_error(self, exporter):
+        """Exceptions set error status and are recorded once."""
+        from opentelemetry.trace import StatusCode
+
+        from app.observability.tracing import trace_operation
+
+        with pytest.raises(ValueError):
+            with trace_operation("failing_operation"):
+                raise ValueError("boom")
+
+        (finished,) = exporter.get_finished_spans()
+        assert finished.status.status_code == StatusCode.ERROR
+        assert len(finished.events) == 1
+
+
+class TestAttributeFilteringProcessor:
+    """Tests for _AttributeFilteringProcessor."""
+
+    @pytest.fixture
+    def exporter_and_tracer(self):
+        """Tracer whose spans go through the filter into an in-memory exporter."""
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(
+            _AttributeFilteringProcessor(SimpleSpanProcessor(exporter), ("code.",))
+        )
+        return exporter, provider.get_tracer("test")
+
+    def test_matching_attributes_dropped(self, exporter_and_tracer):
+        """Attributes with a dropped prefix do not reach the exporter."""
+        exporter, tracer = exporter_and_tracer
+
+        with tracer.start_as_current_span(
+            "op", attributes={"code.filepath": "/app/x.py", "code.lineno": 10, "amount": 5}
+        ):
+            pass
+
+        (finished,) = exporter.get_finished_spans()
+        assert dict(finished.attributes) == {"amount": 5}
+        assert finished.name == "op"
+
+    def test_other_spans_passed_through(self):
+        """Spans without matching attributes are handed on unchanged."""
+        inner = MagicMock()
+        span = MagicMock(attributes={"amount": 5})
+
+        _AttributeFilteringProcessor(inner, ("code.",)).on_end(span)
+
+        inner.on_end.assert_called_once_with(span)
+
+
+class TestTraced:
+    """Tests for the traced decorator."""
+
+    async def test_wraps_coroutine_in_span(self):
+        """Decorated coroutines run inside a named span and return their result."""
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+
+        from app.observability.tracing import traced
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+        @traced("db.example")
+        async def lookup(value: int) -> int:
+            return value * 2
+
+        with patch(
+            "app.observability.tracing._ops_tracer",
+            return_value=provider.get_tracer("app.operations"),
+        ):
+            assert await lookup(21) == 42
+
+        (finished,) = exporter.get_finished_spans()
+        assert finished.name == "db.example"
+        assert lookup.__name__ == "lookup"